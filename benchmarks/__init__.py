@@ -0,0 +1 @@
+"""Benchmarks for the eduhub package; run each one with python -m benchmarks.<name>"""
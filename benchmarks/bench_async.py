@@ -0,0 +1,82 @@
+"""Async (Motor) vs sync (PyMongo + threads) read throughput
+
+    python -m benchmarks.bench_async --clients 100 1000 10000 --requests 20000
+
+Each simulated client issues the same mix of Task 3.2/4.1 reads:
+active students, courses by category, enrolled students of a course and
+upcoming assignments. The sync path gives every client a thread, capped at
+--max-threads because 10k OS threads is not a realistic deployment. The async
+path runs every client as a task on one event loop, with AsyncRepository
+capping in-flight operations at the pool size.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import time
+
+from eduhub import repository
+from eduhub.aio import AsyncRepository, close_async_clients, get_async_db
+from eduhub.connection import get_db
+
+
+def _workload(course_id):
+    return [
+        ("find_active_students", ()),
+        ("courses_by_category", ("Programming",)),
+        ("enrolled_students", (course_id,)),
+        ("upcoming_assignments", (7,)),
+    ]
+
+
+def run_sync(db, clients, requests, course_id, max_threads):
+    calls = list(itertools.islice(itertools.cycle(_workload(course_id)), requests))
+    workers = min(clients, max_threads)
+
+    def call(item):
+        name, args = item
+        return getattr(repository, name)(*args, db=db)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(call, calls):
+            pass
+    return requests / (time.perf_counter() - start), workers
+
+
+async def run_async(db_name, clients, requests, course_id, max_concurrency):
+    repo = AsyncRepository(get_async_db(db_name), max_concurrency=max_concurrency)
+    calls = iter(itertools.islice(itertools.cycle(_workload(course_id)), requests))
+
+    async def client():
+        for name, args in calls:
+            await getattr(repo, name)(*args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=20_000, help="total requests per run")
+    parser.add_argument("--max-threads", type=int, default=1000)
+    parser.add_argument("--max-concurrency", type=int, default=None, help="async in-flight cap (default pool size)")
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    course = db.courses.find_one({}, {"courseId": 1})
+    course_id = course["courseId"] if course else None
+
+    print(f"{'clients':>8} {'sync req/s':>12} {'threads':>8} {'async req/s':>12} {'speedup':>8}")
+    for clients in args.clients:
+        sync_rps, threads = run_sync(db, clients, args.requests, course_id, args.max_threads)
+        async_rps = asyncio.run(run_async(args.db, clients, args.requests, course_id, args.max_concurrency))
+        close_async_clients()
+        print(f"{clients:>8} {sync_rps:>12,.0f} {threads:>8} {async_rps:>12,.0f} {async_rps / sync_rps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
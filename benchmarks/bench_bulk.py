@@ -0,0 +1,82 @@
+"""Per-document writes vs BulkWriter throughput
+
+    python -m benchmarks.bench_bulk --ops 50000 --db eduhub_bench
+
+Writes the same synthetic enrollments three ways into a scratch database
+(which is dropped first): one insert_one per document, one insert_one plus
+one update_one per document (enroll then grade), and the same operations
+through a BulkWriter. Reports ops/sec for each.
+"""
+import argparse
+from datetime import datetime
+import time
+
+from eduhub.bulk import BulkWriter
+from eduhub.connection import get_db
+from eduhub.datagen import SyntheticDataset
+
+
+def _documents(count):
+    dataset = SyntheticDataset(users=max(2, count // 3 + 1), courses=1000, as_of=datetime(2026, 1, 1))
+    documents = []
+    for document in dataset.iter_enrollments(0, dataset.users):
+        documents.append(document)
+        if len(documents) == count:
+            break
+    return documents
+
+
+def _progress_update(document):
+    return {"enrollmentId": document["enrollmentId"]}, {"$set": {"progress": 100, "status": "completed"}}
+
+
+def per_document(db, documents):
+    start = time.perf_counter()
+    for document in documents:
+        db.enrollments.insert_one(dict(document))
+        db.enrollments.update_one(*_progress_update(document))
+    return time.perf_counter() - start
+
+
+def bulk(db, documents, batch_size, max_pending):
+    start = time.perf_counter()
+    # The per-document path writes raw documents too, so skip the summaries
+    with BulkWriter(db, batch_size=batch_size, max_pending=max_pending, account=False) as writer:
+        for document in documents:
+            writer.insert_one("enrollments", dict(document))
+        # Updates go in after the inserts are durable, as graders would see them
+        writer.flush()
+        for document in documents:
+            writer.update_one("enrollments", *_progress_update(document))
+    elapsed = time.perf_counter() - start
+    if writer.failures:
+        print(f" {len(writer.failures)} failed operations, first: {writer.failures[0]}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=50_000, help="documents to insert (and update)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-pending", type=int, default=10_000)
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    documents = _documents(args.ops)
+    operations = 2 * len(documents)
+
+    db.enrollments.drop()
+    db.enrollments.create_index("enrollmentId", unique=True)
+    elapsed = per_document(db, documents)
+    print(f"insert_one/update_one: {operations / elapsed:>12,.0f} ops/sec ({elapsed:.2f}s)")
+
+    db.enrollments.drop()
+    db.enrollments.create_index("enrollmentId", unique=True)
+    bulk_elapsed = bulk(db, documents, args.batch_size, args.max_pending)
+    print(f"BulkWriter:            {operations / bulk_elapsed:>12,.0f} ops/sec ({bulk_elapsed:.2f}s)")
+    print(f"speedup:               {elapsed / bulk_elapsed:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
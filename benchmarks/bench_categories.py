@@ -0,0 +1,105 @@
+"""Nested-$lookup popular_categories vs the single-pass rewrite
+
+    python -m benchmarks.bench_categories --enrollments 10M --categories 100 --workers 8
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it) and times three versions of "most popular course
+categories":
+
+- nested: the original pipeline, one sub-pipeline over every enrollment per
+  category (O(categories x enrollments) joins; at 10M enrollments this single
+  run can take hours, --skip-nested leaves it out)
+- pipeline: analytics.popular_categories_pipeline, one pass over enrollments
+- cache: analytics.popular_categories with a warm ReferenceCache
+"""
+import argparse
+from datetime import datetime
+
+from eduhub import analytics, datagen, indexes
+from eduhub.benchmark import summarize, time_callable
+from eduhub.cache import ReferenceCache
+from eduhub.connection import get_db
+
+
+def nested_pipeline():
+    return [
+        {"$group": {"_id": "$category", "courseCount": {"$sum": 1}, "averagePrice": {"$avg": "$price"}}},
+        {
+            "$lookup": {
+                "from": "enrollments",
+                "let": {"category": "$_id"},
+                "pipeline": [
+                    {"$lookup": {"from": "courses", "localField": "courseId", "foreignField": "courseId", "as": "course"}},
+                    {"$unwind": "$course"},
+                    {"$match": {"$expr": {"$eq": ["$course.category", "$$category"]}}}
+                ],
+                "as": "enrollments"
+            }
+        },
+        {
+            "$project": {
+                "category": "$_id",
+                "courseCount": 1,
+                "averagePrice": {"$round": ["$averagePrice", 2]},
+                "totalEnrollments": {"$size": "$enrollments"}
+            }
+        },
+        {"$sort": {"totalEnrollments": -1}}
+    ]
+
+
+def _totals(rows):
+    return {row["category"]: row["totalEnrollments"] for row in rows}
+
+
+def _report(label, samples, rows):
+    stats = summarize(samples, len(rows))
+    print(f" {label:<10} p50 {stats['p50_ms']:>12.2f} ms  p95 {stats['p95_ms']:>12.2f} ms  ({len(rows)} categories)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--enrollments", default="10M", help="approximate enrollment count, e.g. 10M")
+    parser.add_argument("--courses", default="50k")
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-nested", action="store_true", help="do not run the original nested pipeline")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        per_student = 3.0
+        dataset = datagen.SyntheticDataset(
+            users=int(datagen.parse_count(args.enrollments) / per_student),
+            courses=datagen.parse_count(args.courses),
+            enrollments_per_student=per_student,
+            submissions_per_student=0,
+            categories=args.categories,
+            as_of=datetime(2026, 1, 1),
+        )
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    enrollments = db.enrollments.estimated_document_count()
+    print(f" {enrollments:,} enrollments, {len(db.courses.distinct('category'))} categories")
+
+    samples, single = time_callable(lambda: analytics.popular_categories(db), 1, args.repeat)
+    fast = _report("pipeline", samples, single)
+    cache = ReferenceCache(db, max_bytes=512 * 1024 * 1024)
+    samples, cached = time_callable(lambda: analytics.popular_categories(db, cache=cache), 1, args.repeat)
+    _report("cache", samples, cached)
+    assert _totals(single) == _totals(cached), "cache and pipeline disagree"
+
+    if not args.skip_nested:
+        samples, nested = time_callable(lambda: list(db.courses.aggregate(nested_pipeline())), 0, 1)
+        slow = _report("nested", samples, nested)
+        assert _totals(nested) == _totals(single), "rewrite changed the results"
+        print(f" speedup: {slow['p50_ms'] / fast['p50_ms']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Columnar in-memory metrics vs the aggregation pipelines
+
+    python -m benchmarks.bench_columnar --users 200k --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it) and builds an eduhub.columnar.ColumnarStore from it,
+reporting load time and column memory, and how long a worker takes to
+warm up from an eduhub.columnar_file snapshot instead. It then:
+
+- checks that student_performance, top_students and engagement_metrics
+  computed from the columns match the eduhub.analytics pipelines (averages
+  and rates within --tolerance), exiting with status 1 on any mismatch
+- times each metric as a pipeline and from the columns, then the columnar
+  metrics under a few filter combinations the pipelines do not offer
+"""
+import argparse
+from datetime import datetime
+import os
+import sys
+import tempfile
+import time
+
+from eduhub import analytics, columnar_file, datagen, indexes
+from eduhub.benchmark import summarize, time_callable
+from eduhub.columnar import ColumnarStore
+from eduhub.connection import get_db
+
+
+VALUE_FIELDS = ["totalSubmissions", "gradedSubmissions", "averageGrade", "completionRate",
+                "totalEnrollments", "activeRate", "dropRate", "averageProgress"]
+
+
+def _differs(expected, actual, tolerance):
+    if expected is None or actual is None:
+        return expected is not actual
+    return abs(expected - actual) > tolerance
+
+
+def compare_rows(name, expected, actual, tolerance):
+    """Print and count the rows that differ between two result lists, matched by _id"""
+    expected = {row["_id"]: row for row in expected}
+    actual = {row["_id"]: row for row in actual}
+    mismatches = 0
+    for key in expected.keys() | actual.keys():
+        left, right = expected.get(key), actual.get(key)
+        if left is None or right is None:
+            mismatches += 1
+            print(f"   {name} {key!r}: only in {'pipeline' if right is None else 'columnar'}")
+            continue
+        for field in VALUE_FIELDS:
+            if field in left and _differs(left[field], right.get(field), tolerance):
+                mismatches += 1
+                print(f"   {name} {key!r} {field}: pipeline {left[field]} columnar {right.get(field)}")
+    print(f" {name:<22} {len(expected):>9,} rows  {mismatches} mismatches")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="200k")
+    parser.add_argument("--courses", default="2k")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    store = ColumnarStore.load(db)
+    print(f" load: {len(store.submission_student):,} submissions, {len(store.enrollment_student):,} enrollments "
+          f"in {time.perf_counter() - start:.1f}s, {store.memory_bytes() / (1024 * 1024):,.1f} MB of columns")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "columnar.col")
+        start = time.perf_counter()
+        columnar_file.save(path, db, store=store)
+        print(f" snapshot file: written in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(path) / (1024 * 1024):,.1f} MB")
+        start = time.perf_counter()
+        mapped = columnar_file.load(path, db)
+        print(f" warm-up from the snapshot file: {time.perf_counter() - start:.3f}s")
+        if mapped.student_performance() != store.student_performance():
+            print(" snapshot file results differ from the scanned store")
+            sys.exit(1)
+
+    metrics = [
+        ("student_performance", lambda: analytics.student_performance(db), store.student_performance),
+        ("top_students", lambda: analytics.top_students(args.top, db=db), lambda: store.top_students(args.top)),
+        ("engagement_metrics", lambda: [analytics.engagement_metrics(db)], lambda: [store.engagement_metrics()]),
+    ]
+    mismatches = 0
+    for name, pipeline, columnar in metrics:
+        mismatches += compare_rows(name, pipeline(), columnar(), args.tolerance)
+
+    print(f" {'metric':<22} {'pipeline p50':>14} {'columnar p50':>14} {'speedup':>9}")
+    for name, pipeline, columnar in metrics:
+        pipeline_stats = summarize(time_callable(pipeline, 1, args.repeat)[0], 0)
+        columnar_stats = summarize(time_callable(columnar, 1, args.repeat)[0], 0)
+        print(f" {name:<22} {pipeline_stats['p50_ms']:>11.2f} ms {columnar_stats['p50_ms']:>11.2f} ms "
+              f"{pipeline_stats['p50_ms'] / columnar_stats['p50_ms']:>8.1f}x")
+
+    courses = store.courses.values[:10]
+    filtered = [
+        ("top_students, 10 courses", lambda: store.top_students(args.top, course_ids=courses)),
+        ("top_students, 2025 graded", lambda: store.top_students(args.top, status="graded",
+                                                                  since=datetime(2025, 1, 1),
+                                                                  until=datetime(2026, 1, 1))),
+        ("student_performance, late", lambda: store.student_performance(status="late")),
+        ("engagement, 10 courses", lambda: store.engagement_metrics(course_ids=courses)),
+        ("engagement, since 2025", lambda: store.engagement_metrics(since=datetime(2025, 1, 1))),
+    ]
+    for name, fn in filtered:
+        stats = summarize(time_callable(fn, 1, args.repeat)[0], 0)
+        print(f" {name:<30} p50 {stats['p50_ms']:>8.2f} ms  p95 {stats['p95_ms']:>8.2f} ms")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Streaming Arrow/Parquet export vs materialize-then-DataFrame
+
+    python -m benchmarks.bench_export --enrollments 10M --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it) and exports the row-level "enrollments" export,
+reporting rows/sec and peak RSS. Each method runs in a fresh process so its
+peak RSS is its own:
+
+- streaming: eduhub.export, one RecordBatch per cursor batch
+- pandas (--compare-pandas): list(cursor) -> DataFrame -> to_parquet, the
+  way the old script handled results
+"""
+import argparse
+from datetime import datetime
+from multiprocessing import get_context
+import os
+import tempfile
+import time
+
+from eduhub import datagen, export
+from eduhub.connection import get_db
+
+
+def _streaming(db_name, path, batch_size):
+    return export.export("enrollments", path, db=get_db(db_name), batch_size=batch_size)
+
+
+def _pandas(db_name, path, batch_size):
+    import pandas
+
+    spec = export.EXPORTS["enrollments"]
+    start = time.perf_counter()
+    rows = list(get_db(db_name)[spec.collection].aggregate(spec.build(), allowDiskUse=True, batchSize=batch_size))
+    pandas.DataFrame(rows).to_parquet(path, compression="zstd")
+    elapsed = time.perf_counter() - start
+    return {"rows": len(rows), "seconds": elapsed, "rows_per_sec": len(rows) / elapsed, "peak_rss_mb": export.peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--enrollments", default="10M", help="approximate enrollment count, e.g. 10M")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--compare-pandas", action="store_true", help="also run the materializing pandas export")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        per_student = 3.0
+        dataset = datagen.SyntheticDataset(
+            users=int(datagen.parse_count(args.enrollments) / per_student),
+            courses=10_000,
+            enrollments_per_student=per_student,
+            submissions_per_student=0,
+            as_of=datetime(2026, 1, 1),
+        )
+        datagen.generate(dataset, get_db(args.db), workers=args.workers, drop=True)
+
+    methods = [("streaming", _streaming)]
+    if args.compare_pandas:
+        methods.append(("pandas", _pandas))
+    with tempfile.TemporaryDirectory() as directory:
+        for label, method in methods:
+            path = os.path.join(directory, f"{label}.parquet")
+            with get_context("spawn").Pool(1) as pool:
+                stats = pool.apply(method, (args.db, path, args.batch_size))
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f" {label:<10} {stats['rows']:>12,} rows  {stats['rows_per_sec']:>10,.0f} rows/sec  "
+                  f"peak RSS {stats['peak_rss_mb']:>8,.0f} MB  file {size_mb:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
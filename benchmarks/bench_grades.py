@@ -0,0 +1,163 @@
+"""Grade analytics: bucket counts and index ranges against full aggregations
+
+    python -m benchmarks.bench_grades --users 10M --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it); the default 10M users submit about 50M times.
+It rebuilds the grade histograms and course averages of eduhub.grades,
+then, on the --sample most submitted assignments and courses:
+
+- times percentile_rank, percentiles and student_rank (p50) against the
+  aggregation answering the same question over the submissions
+- checks that both give the same answer
+
+Finally it times repository.grade_submission, which keeps the histograms
+up to date. Exits with status 1 on any mismatch.
+"""
+import argparse
+from datetime import datetime
+import math
+import sys
+import time
+
+from eduhub import datagen, grades, indexes, repository
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+def course_filter(db, course_id):
+    assignments = [doc["assignmentId"] for doc in db.assignments.find({"courseId": course_id}, {"_id": 0, "assignmentId": 1})]
+    return {"assignmentId": {"$in": assignments}}
+
+
+def aggregate_rank(db, query, grade):
+    """(below, equal, count) of a grade with one $group over the submissions"""
+    rows = list(db.submissions.aggregate([
+        {"$match": dict(query, grade={"$type": "number"})},
+        {
+            "$group": {
+                "_id": None,
+                "below": {"$sum": {"$cond": [{"$lt": ["$grade", grade]}, 1, 0]}},
+                "equal": {"$sum": {"$cond": [{"$eq": ["$grade", grade]}, 1, 0]}},
+                "count": {"$sum": 1}
+            }
+        }
+    ], allowDiskUse=True))
+    return (rows[0]["below"], rows[0]["equal"], rows[0]["count"]) if rows else (0, 0, 0)
+
+
+def aggregate_percentiles(db, query, percentiles=grades.PERCENTILES):
+    """{percentile: grade} (nearest rank) by sorting the grades"""
+    grades_sorted = [doc["grade"] for doc in db.submissions.aggregate([
+        {"$match": dict(query, grade={"$type": "number"})},
+        {"$sort": {"grade": 1}},
+        {"$project": {"_id": 0, "grade": 1}}
+    ], allowDiskUse=True)]
+    if not grades_sorted:
+        return {}
+    return {p: grades_sorted[max(1, math.ceil(p / 100 * len(grades_sorted))) - 1] for p in percentiles}
+
+
+def aggregate_student_rank(db, student_id, course_id):
+    """(rank, students) of a student's average grade in a course, averaging every student"""
+    averages = {doc["_id"]: doc["average"] for doc in db.submissions.aggregate([
+        {"$match": dict(course_filter(db, course_id), grade={"$type": "number"})},
+        {"$group": {"_id": "$studentId", "average": {"$avg": "$grade"}}}
+    ], allowDiskUse=True)}
+    mine = averages[student_id]
+    # Averages summed in another order can differ in the last bits
+    return sum(1 for average in averages.values() if average > mine + 1e-9) + 1, len(averages)
+
+
+def report(name, fast, slow):
+    fast, slow = summarize(fast, 0), summarize(slow, 0)
+    print(f" {name:<18} {fast['p50_ms']:>9.2f} ms {slow['p50_ms']:>11.1f} ms {slow['p50_ms'] / fast['p50_ms']:>9.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="10M")
+    parser.add_argument("--courses", default="20k")
+    parser.add_argument("--sample", type=int, default=5, help="assignments, courses and students compared")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--writes", type=int, default=1000, help="grade_submission calls timed")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    result = grades.rebuild(db)
+    print(f" rebuild: {db.submissions.estimated_document_count():,} submissions in {time.perf_counter() - start:.1f}s; "
+          f"{result['histograms']:,} histograms, {result['students']:,} course averages")
+
+    def largest(scope):
+        return [doc["key"] for doc in db[grades.BUCKETS_COLLECTION].find({"scope": scope}, {"key": 1})
+                .sort("count", -1).limit(args.sample)]
+
+    mismatches = 0
+    timings = {"percentile_rank": ([], []), "percentiles": ([], []), "student_rank": ([], [])}
+    targets = [({"assignment_id": key}, {"assignmentId": key}) for key in largest("assignment")]
+    targets += [({"course_id": key}, course_filter(db, key)) for key in largest("course")]
+    for scope, query in targets:
+        median = grades.percentiles(percentiles=(50,), db=db, **scope).get(50)
+        if median is None:
+            continue
+        fast, slow = timings["percentile_rank"]
+        fast += time_callable(lambda: grades.percentile_rank(median, db=db, **scope), 1, args.repeat)[0]
+        slow += time_callable(lambda: aggregate_rank(db, query, median), 0, args.repeat)[0]
+        rank = grades.percentile_rank(median, db=db, **scope)
+        if (rank["below"], rank["equal"], rank["count"]) != aggregate_rank(db, query, median):
+            mismatches += 1
+            print(f"   percentile_rank {scope}: {rank} vs {aggregate_rank(db, query, median)}")
+
+        fast, slow = timings["percentiles"]
+        fast += time_callable(lambda: grades.percentiles(db=db, **scope), 1, args.repeat)[0]
+        slow += time_callable(lambda: aggregate_percentiles(db, query), 0, args.repeat)[0]
+        if grades.percentiles(db=db, **scope) != aggregate_percentiles(db, query):
+            mismatches += 1
+            print(f"   percentiles {scope}: {grades.percentiles(db=db, **scope)} vs {aggregate_percentiles(db, query)}")
+
+    for course_id in largest("course_average"):
+        fast, slow = timings["student_rank"]
+        for doc in db[grades.COURSE_GRADES_COLLECTION].find({"courseId": course_id}).limit(args.sample):
+            student_id = doc["studentId"]
+            fast += time_callable(lambda: grades.student_rank(student_id, course_id, db), 1, args.repeat)[0]
+            slow += time_callable(lambda: aggregate_student_rank(db, student_id, course_id), 0, 1)[0]
+            rank = grades.student_rank(student_id, course_id, db)
+            expected = aggregate_student_rank(db, student_id, course_id)
+            if (rank["rank"], rank["students"]) != expected:
+                mismatches += 1
+                print(f"   student_rank {student_id} in {course_id}: {rank['rank']} of {rank['students']} vs {expected}")
+
+    print(f" {'query':<18} {'eduhub.grades':>12} {'aggregation':>14} {'speedup':>10}")
+    for name, (fast, slow) in timings.items():
+        if fast:
+            report(name, fast, slow)
+
+    sample = list(db.submissions.find({"grade": {"$type": "number"}}, {"_id": 0, "submissionId": 1, "grade": 1})
+                  .limit(args.writes))
+    start = time.perf_counter()
+    for submission in sample:
+        # Regrade, then put the grade back so the data is unchanged
+        regrade = submission["grade"] - 1 if submission["grade"] >= 1 else submission["grade"] + 1
+        repository.grade_submission(submission["submissionId"], regrade, "Reviewed", db)
+        repository.grade_submission(submission["submissionId"], submission["grade"], "Reviewed", db)
+    elapsed = time.perf_counter() - start
+    print(f" grade_submission: {elapsed / max(2 * len(sample), 1) * 1000:.2f} ms per call")
+    print(f" {mismatches} mismatches")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
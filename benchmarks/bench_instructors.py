@@ -0,0 +1,139 @@
+"""Instructor analytics: the $push/$lookup fan-out against per-course counts
+
+    python -m benchmarks.bench_instructors --users 1M --courses 20k --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it) and hands --heavy courses to one instructor, so one
+instructor owns most of the enrollments. It then:
+
+- runs the original Task 4.2 pipeline, whose $lookup joins every enrollment
+  of an instructor's courses into one document; on a large dataset it
+  fails on the 16MB limit, which is reported instead of a time
+- times eduhub.instructor_analytics from course_stats and from the
+  enrollments, checking totalStudents against the enrollments collection
+- times the exact and the approximate (HyperLogLog) distinct students and
+  reports the largest relative error of the estimate
+
+Exits with status 1 if totalStudents is wrong for any instructor, or if
+the estimate is off by more than --max-error.
+"""
+import argparse
+from datetime import datetime
+import sys
+
+from eduhub import course_stats, datagen, indexes, instructor_analytics
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+# The original pipeline, kept here as the baseline
+PUSH_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$instructorId",
+            "totalCourses": {"$sum": 1},
+            "publishedCourses": {"$sum": {"$cond": ["$isPublished", 1, 0]}},
+            "totalRevenue": {"$sum": "$price"},
+            "courseIds": {"$push": "$courseId"}
+        }
+    },
+    {"$lookup": {"from": "users", "localField": "_id", "foreignField": "userId", "as": "instructor"}},
+    {"$unwind": "$instructor"},
+    {"$lookup": {"from": "enrollments", "localField": "courseIds", "foreignField": "courseId", "as": "enrollments"}},
+    {
+        "$project": {
+            "instructorName": {"$concat": ["$instructor.firstName", " ", "$instructor.lastName"]},
+            "totalCourses": 1,
+            "publishedCourses": 1,
+            "totalStudents": {"$size": "$enrollments"},
+            "potentialRevenue": "$totalRevenue"
+        }
+    },
+    {"$sort": {"totalStudents": -1}}
+]
+
+
+def expected_totals(db):
+    """Enrollments per instructor, from the enrollments collection"""
+    instructors = {course["courseId"]: course["instructorId"]
+                   for course in db.courses.find({}, {"_id": 0, "courseId": 1, "instructorId": 1})}
+    totals = {}
+    for row in db.enrollments.aggregate([{"$group": {"_id": "$courseId", "count": {"$sum": 1}}}]):
+        instructor = instructors.get(row["_id"])
+        if instructor is not None:
+            totals[instructor] = totals.get(instructor, 0) + row["count"]
+    return totals
+
+
+def report(name, samples):
+    stats = summarize(samples, 0)
+    print(f" {name:<32} p50 {stats['p50_ms']:>9.0f} ms")
+
+
+def main():
+    from pymongo.errors import OperationFailure
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1M")
+    parser.add_argument("--courses", default="20k")
+    parser.add_argument("--heavy", type=int, default=10_000, help="courses given to one instructor")
+    parser.add_argument("--precision", type=int, default=12)
+    parser.add_argument("--max-error", type=float, default=0.05, help="largest accepted relative error")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+        heavy = [course["_id"] for course in db.courses.find({}, {"_id": 1}).limit(args.heavy)]
+        db.courses.update_many({"_id": {"$in": heavy}}, {"$set": {"instructorId": datagen.synthetic_id("USER_", 0)}})
+        course_stats.reconcile_course_stats(db)
+
+    expected = expected_totals(db)
+    print(f" {db.courses.count_documents({}):,} courses, {db.enrollments.estimated_document_count():,} enrollments, "
+          f"top instructor {max(expected.values(), default=0):,} enrollments")
+
+    try:
+        report("$push/$lookup pipeline", time_callable(lambda: list(db.courses.aggregate(PUSH_PIPELINE)),
+                                                       0, args.repeat)[0])
+    except OperationFailure as e:
+        print(f" {'$push/$lookup pipeline':<32} failed: {e}")
+
+    wrong = 0
+    for source in instructor_analytics.SOURCES:
+        report(f"source={source}", time_callable(
+            lambda: instructor_analytics.instructor_analytics(db, source=source), 0, args.repeat)[0])
+        for row in instructor_analytics.instructor_analytics(db, source=source):
+            if row["totalStudents"] != expected.get(row["_id"], 0):
+                wrong += 1
+                print(f"   {source} {row['_id']}: totalStudents {row['totalStudents']} "
+                      f"vs {expected.get(row['_id'], 0)}")
+
+    report("distinct exact", time_callable(
+        lambda: instructor_analytics.instructor_analytics(db, distinct="exact"), 0, args.repeat)[0])
+    report("distinct approximate", time_callable(
+        lambda: instructor_analytics.instructor_analytics(db, distinct="approximate", precision=args.precision),
+        0, args.repeat)[0])
+    exact = {row["_id"]: row["distinctStudents"]
+             for row in instructor_analytics.instructor_analytics(db, distinct="exact")}
+    approximate = {row["_id"]: row["distinctStudents"]
+                   for row in instructor_analytics.instructor_analytics(db, distinct="approximate",
+                                                                        precision=args.precision)}
+    errors = [abs(approximate.get(key, 0) - count) / count for key, count in exact.items() if count]
+    worst = max(errors, default=0.0)
+    print(f" distinct students: worst relative error {worst:.2%} over {len(errors):,} instructors "
+          f"(standard error {1.04 / (1 << args.precision) ** 0.5:.2%})")
+
+    if wrong or worst > args.max_error:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
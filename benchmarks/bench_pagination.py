@@ -0,0 +1,73 @@
+"""Deep-page latency: keyset pagination vs skip/limit
+
+    python -m benchmarks.bench_pagination --users 1M --pages 1 10 100 1000 10000 --db eduhub_bench
+
+Pages through "users who joined since" (sorted by dateJoined, newest first)
+on a synthetic dataset (dropped and loaded first; --skip-load reuses it).
+For each requested page number it times fetching that page with
+skip/limit and with a keyset token. The tokens come from walking the pages
+beforehand, outside the timings.
+"""
+import argparse
+from datetime import datetime
+
+from eduhub import datagen, indexes, pagination
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+SORT = [("dateJoined", -1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1M")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users), courses=100,
+                                           enrollments_per_student=0, submissions_per_student=0,
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    query = {"dateJoined": {"$gte": datetime(2000, 1, 1)}}
+    wanted = sorted(set(args.pages))
+    tokens = {1: None}
+    page_number, token = 1, None
+    # Walk the pages once to collect the token of every requested page
+    while page_number < wanted[-1]:
+        page = pagination.paginate(db.users, query, SORT, args.page_size, token, {"_id": 1, "dateJoined": 1})
+        if page.next_token is None:
+            break
+        token = page.next_token
+        page_number += 1
+        tokens[page_number] = token
+
+    print(f" {'page':>8} {'skip/limit p50':>16} {'keyset p50':>12} {'speedup':>9}")
+    for number in wanted:
+        if number not in tokens:
+            print(f" {number:>8} beyond the last page")
+            continue
+        skip = (number - 1) * args.page_size
+        samples, _ = time_callable(
+            lambda: list(db.users.find(query).sort(pagination.normalize_sort(SORT)).skip(skip).limit(args.page_size)),
+            2, args.repeat)
+        skipped = summarize(samples, args.page_size)
+        samples, _ = time_callable(
+            lambda: pagination.paginate(db.users, query, SORT, args.page_size, tokens[number]),
+            2, args.repeat)
+        keyset = summarize(samples, args.page_size)
+        print(f" {number:>8} {skipped['p50_ms']:>13.2f} ms {keyset['p50_ms']:>9.2f} ms "
+              f"{skipped['p50_ms'] / keyset['p50_ms']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Partitioned aggregation: wall-clock speedup over 1-16 partitions
+
+    python -m benchmarks.bench_partitioned --users 1M --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it), then for student_performance, completion_by_course
+and instructor_analytics:
+
+- checks that eduhub.partitioned gives the same rows as the single
+  aggregation at every partition count (numbers within --tolerance),
+  exiting with status 1 on any mismatch
+- times the single aggregation and the partitioned runs, and prints the
+  p50 wall-clock time and speedup per partition count
+"""
+import argparse
+from datetime import datetime
+import sys
+
+from eduhub import analytics, datagen, indexes
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+REPORTS = [
+    ("student_performance", analytics.student_performance),
+    ("completion_by_course", analytics.completion_by_course),
+    ("instructor_analytics", analytics.instructor_analytics),
+]
+
+
+def _same(expected, actual, tolerance):
+    if isinstance(expected, float) or isinstance(actual, float):
+        return expected is not None and actual is not None and abs(expected - actual) <= tolerance
+    return expected == actual
+
+
+def count_mismatches(name, partitions, expected, actual, tolerance):
+    expected = {row["_id"]: row for row in expected}
+    actual = {row["_id"]: row for row in actual}
+    mismatches = len(expected.keys() ^ actual.keys())
+    for key in expected.keys() & actual.keys():
+        for field, value in expected[key].items():
+            if not _same(value, actual[key].get(field), tolerance):
+                mismatches += 1
+                print(f"   {name} x{partitions} {key!r} {field}: {value} vs {actual[key].get(field)}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1M")
+    parser.add_argument("--courses", default="5k")
+    parser.add_argument("--partitions", default="1,2,4,8,16", help="comma-separated partition counts")
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+    counts = [int(count) for count in args.partitions.split(",")]
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    mismatches = 0
+    print(f" {'report':<22} {'partitions':>10} {'p50':>11} {'speedup':>9}")
+    for name, report in REPORTS:
+        single = summarize(time_callable(lambda: report(db), 1, args.repeat)[0], 0)
+        print(f" {name:<22} {'single':>10} {single['p50_ms']:>8.0f} ms {1:>8.2f}x")
+        expected = report(db)
+        for partitions in counts:
+            stats = summarize(time_callable(lambda: report(db, partitions=partitions), 1, args.repeat)[0], 0)
+            mismatches += count_mismatches(name, partitions, expected, report(db, partitions=partitions),
+                                           args.tolerance)
+            print(f" {name:<22} {partitions:>10} {stats['p50_ms']:>8.0f} ms "
+                  f"{single['p50_ms'] / stats['p50_ms']:>8.2f}x")
+
+    print(f" {mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
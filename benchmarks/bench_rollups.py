@@ -0,0 +1,96 @@
+"""Full-scan monthly trend pipelines vs reads from enrollment_rollups
+
+    python -m benchmarks.bench_rollups --enrollments 10M --workers 8 --db eduhub_bench
+
+Loads a synthetic dataset with about the requested number of enrollments
+into a scratch database (dropped first; --skip-load reuses it), times a
+rollup backfill, then compares:
+
+- monthly trends: analytics.monthly_trends_pipeline vs rollups.monthly_trends
+- last 12 months by category: a group/lookup/group pipeline over enrollments
+  vs rollups.monthly_trends_by_category
+"""
+import argparse
+from datetime import datetime
+import time
+
+from eduhub import analytics, datagen, indexes, rollups
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+AS_OF = datetime(2026, 1, 1)
+
+
+def category_trends_pipeline(since):
+    return [
+        {"$match": {"enrollmentDate": {"$gte": since}}},
+        {
+            "$group": {
+                "_id": {"course": "$courseId", "year": {"$year": "$enrollmentDate"}, "month": {"$month": "$enrollmentDate"}},
+                "count": {"$sum": 1}
+            }
+        },
+        {"$lookup": {"from": "courses", "localField": "_id.course", "foreignField": "courseId", "as": "course"}},
+        {"$unwind": "$course"},
+        {
+            "$group": {
+                "_id": {"category": "$course.category", "year": "$_id.year", "month": "$_id.month"},
+                "count": {"$sum": "$count"}
+            }
+        },
+        {"$sort": {"_id.category": 1, "_id.year": 1, "_id.month": 1}}
+    ]
+
+
+def _report(label, samples, rows):
+    stats = summarize(samples, rows)
+    print(f" {label:<34} p50 {stats['p50_ms']:>10.2f} ms  p95 {stats['p95_ms']:>10.2f} ms  ({rows} rows)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--enrollments", default="10M", help="approximate enrollment count, e.g. 10M")
+    parser.add_argument("--courses", default="50k")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        per_student = 3.0
+        dataset = datagen.SyntheticDataset(
+            users=int(datagen.parse_count(args.enrollments) / per_student),
+            courses=datagen.parse_count(args.courses),
+            enrollments_per_student=per_student,
+            submissions_per_student=0,
+            as_of=AS_OF,
+        )
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    result = rollups.backfill(db=db)
+    print(f" backfill: {result['documents']:,} rollups in {time.perf_counter() - start:.1f}s")
+
+    since = datetime(AS_OF.year - 1, AS_OF.month, 1)
+    print(f" {db.enrollments.estimated_document_count():,} enrollments")
+
+    samples, rows = time_callable(lambda: list(db.enrollments.aggregate(analytics.monthly_trends_pipeline())), 1, args.repeat)
+    scan = _report("monthly trends (full scan)", samples, len(rows))
+    samples, rows = time_callable(lambda: rollups.monthly_trends(db=db), 1, args.repeat)
+    rolled = _report("monthly trends (rollups)", samples, len(rows))
+    print(f" speedup: {scan['p50_ms'] / rolled['p50_ms']:.0f}x")
+
+    samples, rows = time_callable(lambda: list(db.enrollments.aggregate(category_trends_pipeline(since))), 1, args.repeat)
+    scan = _report("12 months by category (full scan)", samples, len(rows))
+    samples, rows = time_callable(lambda: rollups.monthly_trends_by_category(12, now=AS_OF, db=db), 1, args.repeat)
+    rolled = _report("12 months by category (rollups)", samples, sum(len(v) for v in rows.values()))
+    print(f" speedup: {scan['p50_ms'] / rolled['p50_ms']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Course search: regex scan vs $text vs the in-process inverted index
+
+    python -m benchmarks.bench_search --courses 1M --db eduhub_bench
+
+Loads a synthetic catalog into a scratch database (dropped first;
+--skip-load reuses it) and builds an eduhub.search.CourseSearchIndex,
+reporting build time. It then:
+
+- checks that the index finds the same courses as the case-insensitive
+  regex for each query word, exiting with status 1 on any difference
+- times each query as a regex scan, a $text search and an index search,
+  with and without category/level/price filters
+"""
+import argparse
+from datetime import datetime
+import re
+import sys
+import time
+
+from eduhub import datagen, indexes, search
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+QUERIES = ["python", "data", "pyth", "ython", "web design"]
+
+
+def regex_search(db, text, limit, **filters):
+    query = dict(search._filters(**filters))
+    words = search.tokenize(text)
+    if words:
+        query["$and"] = [{"title": {"$regex": re.escape(word), "$options": "i"}} for word in words]
+    cursor = db.courses.find(query, search.SEARCH_PROJECTION)
+    return list(cursor.limit(limit) if limit else cursor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1k")
+    parser.add_argument("--courses", default="1M")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    index = search.CourseSearchIndex(db).build()
+    print(f" index build: {len(index):,} courses, {len(index.vocabulary):,} words "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    mismatches = 0
+    for text in QUERIES:
+        expected = {course["courseId"] for course in regex_search(db, text, None)}
+        actual = {course["courseId"] for course in index.search(text, limit=None)}
+        # Prefix and infix matching can only find more, never fewer, than the word regex
+        missing = expected - actual
+        mismatches += bool(missing)
+        print(f" {text!r:<14} regex {len(expected):>9,}  index {len(actual):>9,}  missing {len(missing):,}")
+
+    category = db.courses.find_one({}, {"category": 1}).get("category")
+    filters = [("no filter", {}),
+               (f"{category}, <= 50", {"category": category, "max_price": 50}),
+               ("beginner, published", {"level": "beginner", "published": True})]
+    print(f" {'query':<14} {'filter':<28} {'regex p50':>12} {'$text p50':>12} {'index p50':>12}")
+    for text in QUERIES:
+        for name, kwargs in filters:
+            timings = [
+                summarize(time_callable(lambda: regex_search(db, text, args.limit, **kwargs), 1, args.repeat)[0], 0),
+                summarize(time_callable(lambda: search.text_search(text, limit=args.limit, db=db, **kwargs),
+                                        1, args.repeat)[0], 0),
+                summarize(time_callable(lambda: index.search(text, limit=args.limit, **kwargs), 1, args.repeat)[0], 0),
+            ]
+            print(f" {text!r:<14} {name:<28} " + " ".join(f"{t['p50_ms']:>9.3f} ms" for t in timings))
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
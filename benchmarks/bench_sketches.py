@@ -0,0 +1,102 @@
+"""Approximate dashboard analytics: latency and error against the exact pipelines
+
+    python -m benchmarks.bench_sketches --users 1M --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it), rebuilds the sketches of eduhub.approximate and
+reports their stored size. It then:
+
+- times engagement_metrics, popular_categories and monthly_trends exact
+  and approximate (p50) and prints the speedup
+- runs approximate.check() and prints the worst error of every kind of
+  number next to its documented bound, exiting with status 1 if any
+  comparison is out of bounds
+- times recording an enrollment into an in-memory SketchSet, the work
+  SketchMaintainer adds to every write
+"""
+import argparse
+from datetime import datetime
+import sys
+import time
+
+from eduhub import analytics, approximate, datagen, indexes
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+REPORTS = ["engagement_metrics", "popular_categories", "monthly_trends"]
+
+
+def kind(metric):
+    """Group check() metrics by what they measure"""
+    parts = metric.split(".")
+    if metric.startswith("top_"):
+        return parts[0]
+    if parts[-1].startswith("p") and parts[-1][1:].isdigit():
+        return f"{parts[0]}.percentiles"
+    return f"{parts[0]}.{parts[-1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1M")
+    parser.add_argument("--courses", default="5k")
+    parser.add_argument("--precision", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--records", type=int, default=100_000, help="enrollments recorded in memory")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    result = approximate.rebuild(db, precision=args.precision)
+    size = sum(len(doc.get("data") or b"") for doc in db[approximate.COLLECTION].find({}, {"data": 1}))
+    print(f" rebuild: {result['enrollments']:,} enrollments, {result['grades']:,} grades in "
+          f"{time.perf_counter() - start:.1f}s; {result['documents']:,} documents, {size / 1024:,.0f} KB of sketches")
+
+    print(f" {'report':<22} {'exact':>11} {'approximate':>13} {'speedup':>9}")
+    for name in REPORTS:
+        report = getattr(analytics, name)
+        exact = summarize(time_callable(lambda: report(db), 1, args.repeat)[0], 0)
+        approx = summarize(time_callable(lambda: report(db, approximate=True), 1, args.repeat)[0], 0)
+        print(f" {name:<22} {exact['p50_ms']:>8.1f} ms {approx['p50_ms']:>10.1f} ms "
+              f"{exact['p50_ms'] / approx['p50_ms']:>8.1f}x")
+
+    rows = approximate.check(db, precision=args.precision, verbose=False)
+    worst = {}
+    for row in rows:
+        group = kind(row["metric"])
+        if group not in worst or row["error"] > worst[group]["error"]:
+            worst[group] = row
+    print(f" {'numbers':<36} {'worst error':>12} {'bound':>12}")
+    for group, row in sorted(worst.items()):
+        print(f" {group:<36} {row['error']:>12.4g} {row['bound']:>12.4g}  {'' if row['ok'] else 'OUT OF BOUNDS'}")
+    failed = [row for row in rows if not row["ok"]]
+    print(f" {len(rows):,} comparisons, {len(failed):,} outside their bound")
+
+    courses = {course["courseId"]: course
+               for course in db.courses.find({}, {"_id": 0, "courseId": 1, "category": 1, "tags": 1})}
+    sample = list(db.enrollments.find({}, {"_id": 0}).limit(args.records))
+    pending = approximate.SketchSet(precision=args.precision)
+    start = time.perf_counter()
+    for enrollment in sample:
+        pending.enrollment(enrollment, courses.get(enrollment.get("courseId")))
+    elapsed = time.perf_counter() - start
+    print(f" recording: {elapsed / max(len(sample), 1) * 1e6:.1f} us per enrollment, "
+          f"{len(pending.sketches):,} sketches pending")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Course $lookup vs embedded course snapshots for the enrollment reports
+
+    python -m benchmarks.bench_snapshots --enrollments 1M --threads 16 --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it), embeds course snapshots in every enrollment, then
+for enrollment_stats, completion_by_course and active_enrollments_by_category
+reports single-run latency and the throughput of --threads concurrent
+clients, with and without the courses $lookup.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import time
+
+from eduhub import analytics, datagen, indexes, snapshots
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+REPORTS = [
+    ("enrollment_stats", analytics.enrollment_stats_pipeline),
+    ("completion_by_course", analytics.completion_by_course_pipeline),
+    ("active_enrollments_by_category", analytics.active_enrollments_by_category_pipeline),
+]
+
+
+def throughput(fn, threads, seconds):
+    """Completed calls per second with threads clients calling fn back to back"""
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        calls = 0
+        while time.perf_counter() < deadline:
+            fn()
+            calls += 1
+        return calls
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        calls = sum(pool.map(lambda _: client(), range(threads)))
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--enrollments", default="1M", help="approximate enrollment count, e.g. 1M")
+    parser.add_argument("--courses", default="10k")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each throughput run")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        per_student = 3.0
+        dataset = datagen.SyntheticDataset(
+            users=int(datagen.parse_count(args.enrollments) / per_student),
+            courses=datagen.parse_count(args.courses),
+            enrollments_per_student=per_student,
+            submissions_per_student=0,
+            as_of=datetime(2026, 1, 1),
+        )
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+    start = time.perf_counter()
+    updated = snapshots.backfill(db)
+    print(f" snapshot backfill: {updated:,} enrollments in {time.perf_counter() - start:.1f}s")
+    print(f" {db.enrollments.estimated_document_count():,} enrollments")
+
+    for name, builder in REPORTS:
+        for label, mode in [("$lookup", False), ("snapshots", True)]:
+            pipeline = builder(snapshots=mode)
+
+            def run():
+                return list(db.enrollments.aggregate(pipeline))
+
+            samples, rows = time_callable(run, 1, args.repeat)
+            stats = summarize(samples, len(rows))
+            rate = throughput(run, args.threads, args.seconds)
+            print(f" {name:<32} {label:<10} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  "
+                  f"{rate:>8.1f} runs/sec at {args.threads} threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Typeahead memory footprint and per-keystroke latency
+
+    python -m benchmarks.bench_typeahead --courses 100k --db eduhub_bench
+
+Loads a synthetic dataset into a scratch database (dropped first;
+--skip-load reuses it) and builds an eduhub.typeahead.Typeahead from it,
+reporting build time and the memory it holds (traced with tracemalloc, a
+second build) per 100k titles. It then:
+
+- types --sample course titles and tags one character at a time and
+  reports the latency of every keystroke (p50/p95/p99/max)
+- checks the completions of those prefixes against a linear scan of the
+  keys, exiting with status 1 on any difference
+- times the incremental updates: one enrollment, and a course re-indexed
+  after a tag was added
+"""
+import argparse
+from datetime import datetime
+import random
+import sys
+import time
+import tracemalloc
+
+from eduhub import datagen, indexes, typeahead
+from eduhub.benchmark import summarize, time_callable
+from eduhub.connection import get_db
+
+
+def scan(index, prefix, limit):
+    """Completions of prefix by scanning every key: the reference the trie is checked against"""
+    prefix = typeahead.normalize(prefix)
+    ids = {cid for key, cid in zip(index.keys, index.refs) if key.startswith(prefix)}
+    return sorted(ids, key=index._rank)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="20k")
+    parser.add_argument("--courses", default="100k")
+    parser.add_argument("--sample", type=int, default=500, help="titles and tags typed")
+    parser.add_argument("--check", type=int, default=200, help="prefixes checked against a scan")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--db", default="eduhub_bench")
+    args = parser.parse_args()
+
+    db = get_db(args.db)
+    if not args.skip_load:
+        dataset = datagen.SyntheticDataset(users=datagen.parse_count(args.users),
+                                           courses=datagen.parse_count(args.courses),
+                                           as_of=datetime(2026, 1, 1))
+        datagen.generate(dataset, db, workers=args.workers, drop=True)
+        indexes.create_indexes(db)
+
+    start = time.perf_counter()
+    index = typeahead.Typeahead(db).build()
+    print(f" build: {len(index):,} completions, {len(index.keys):,} keys, {len(index.top):,} cached prefixes "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    tracemalloc.start()
+    traced = typeahead.Typeahead(db).build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    titles = sum(1 for title_id, _ in traced.course_entries.values() if title_id is not None)
+    del traced
+    print(f" memory: {held / (1024 * 1024):,.1f} MB for {titles:,} titles, "
+          f"{held / max(titles, 1) * 100_000 / (1024 * 1024):,.1f} MB per 100k titles")
+
+    rng = random.Random(42)
+    words = [text for text in index.texts if text is not None]
+    typed = rng.sample(words, min(args.sample, len(words)))
+    prefixes = [text[:n] for text in typed for n in range(1, len(text) + 1)]
+    samples = []
+    for prefix in prefixes:
+        began = time.perf_counter_ns()
+        index.complete(prefix)
+        samples.append(time.perf_counter_ns() - began)
+    stats = summarize(samples, 0)
+    print(f" keystrokes: {len(samples):,}  p50 {stats['p50_ms'] * 1000:,.1f} us  p95 {stats['p95_ms'] * 1000:,.1f} us  "
+          f"p99 {stats['p99_ms'] * 1000:,.1f} us  max {stats['max_ms'] * 1000:,.1f} us")
+
+    mismatches = 0
+    for prefix in rng.sample(prefixes, min(args.check, len(prefixes))):
+        expected = [index.texts[cid] for cid in scan(index, prefix, index.k)]
+        if [row["text"] for row in index.complete(prefix)] != expected:
+            mismatches += 1
+            print(f"   {prefix!r}: trie and scan differ")
+    print(f" checked {min(args.check, len(prefixes))} prefixes against a scan: {mismatches} mismatches")
+
+    course_ids = list(index.course_entries)
+    course_id = rng.choice(course_ids)
+    enroll = summarize(time_callable(lambda: index.record_enrollments(course_id, 1), 1, args.repeat)[0], 0)
+    course = db.courses.find_one({"courseId": course_id}, typeahead.TYPEAHEAD_PROJECTION)
+    course["tags"] = list(course.get("tags") or []) + ["bench-typeahead"]
+    upsert = summarize(time_callable(lambda: index.upsert(course), 1, args.repeat)[0], 0)
+    print(f" record_enrollments p50 {enroll['p50_ms'] * 1000:,.1f} us  upsert p50 {upsert['p50_ms'] * 1000:,.1f} us")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""EduHub MongoDB data access library
+
+Importing this package does no I/O and does not import pymongo; the shared
+client is created on first use. Modules:
+
+- connection: shared, pooled MongoClient and connection settings
+- schemas: collection names, document schemas and validators
+- seed: sample data population and relationship checks
+- repository: CRUD operations and read queries
+- analytics: aggregation pipelines
+- indexes: index definitions
+- ids: collision-free, time-sortable business IDs
+- datagen: deterministic synthetic data generator (python -m eduhub seed)
+- bulk: buffered bulk writes with back-pressure
+- benchmark: query benchmark suite (python -m eduhub bench)
+- aio: asyncio (Motor) versions of the read queries
+- hooks: in-process change events emitted by the write paths
+- cache: read-through cache for course and user lookups
+- course_stats: incrementally maintained per-course enrollment statistics
+- rollups: day/month enrollment rollups per course and category
+- snapshots: optional course snapshots embedded in enrollments
+- pagination: keyset pagination with opaque continuation tokens
+- export: streaming Parquet/CSV/Arrow export of analytics results
+- columnar: in-memory NumPy columns for grade and progress metrics
+- columnar_file: memory-mapped snapshot files of the columnar store
+- query_shapes: command listener recording query shapes, frequency and latency
+- index_advisor: ESR index proposals and unused/redundant index checks
+- migrations: declarative collection, validator and index migrations
+- search: course search with $text ranking or an in-process inverted index
+- typeahead: top-k title and tag completions ranked by enrollments
+- integrity: streaming anti-join reference checks with quarantine
+- partitioned: $group pipelines run over key ranges in parallel, partial groups merged
+- sketches: HyperLogLog, count-min/top-k and t-digest sketches with a compact binary form
+- instructor_analytics: instructor totals from per-course counts, optional distinct students
+- approximate: dashboard analytics from sketches maintained from writes (python -m eduhub sketches)
+- grades: grade histograms, percentiles and student ranks (python -m eduhub grades)
+- changes: change stream consumer feeding hooks (python -m eduhub watch)
+"""
+from .connection import close_client, configure, get_client, get_db
+
+__all__ = ["close_client", "configure", "get_client", "get_db"]
@@ -0,0 +1,157 @@
+"""asyncio data access for the read paths (Tasks 3.2 and 4.1), built on Motor
+
+Mirrors the blocking queries in eduhub.repository, using the same filter
+and pipeline builders, so an async gateway can serve them without tying up
+a thread per request. The Motor client reads the same pool settings as the
+sync client (eduhub.connection.configure / EDUHUB_* variables); one client is
+kept per event loop, and those of closed loops are closed when the next
+one is created.
+
+    repo = AsyncRepository(max_concurrency=200)
+    students = await repo.find_active_students()
+    async for student in repo.iter_active_students():
+        ...
+"""
+import asyncio
+import threading
+
+from . import repository
+from .connection import get_settings
+
+
+# Event loop -> Motor client; a client refers to its loop, so weak keys would not free either
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_async_client():
+    """Return the Motor client of the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            _close_clients(closed_loops_only=True)
+            options = get_settings()
+            uri = options.pop("uri")
+            options.pop("database")
+            client = AsyncIOMotorClient(uri, **options)
+            _clients[loop] = client
+    return client
+
+
+def get_async_db(name=None):
+    """Return the EduHub database handle from the loop's Motor client"""
+    return get_async_client()[name or get_settings()["database"]]
+
+
+def close_async_clients():
+    """Close every Motor client created by get_async_client()"""
+    with _lock:
+        _close_clients()
+
+
+def _close_clients(closed_loops_only=False):
+    for loop in [loop for loop in _clients if loop.is_closed() or not closed_loops_only]:
+        _clients.pop(loop).close()
+
+
+class AsyncRepository:
+    """Async read queries with a cap on in-flight database operations
+
+    max_concurrency defaults to the pool size: requests beyond it wait on a
+    semaphore instead of queueing inside the driver's connection pool.
+    """
+
+    def __init__(self, db=None, max_concurrency=None, batch_size=500):
+        self._db = db
+        self._max_concurrency = max_concurrency or get_settings()["maxPoolSize"]
+        self._semaphore = None
+        self.batch_size = batch_size
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_async_db()
+        return self._db
+
+    @property
+    def semaphore(self):
+        # Created lazily so the semaphore belongs to the loop that uses it
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def _find(self, collection, filter, limit=0):
+        async with self.semaphore:
+            cursor = self.db[collection].find(filter, limit=limit, batch_size=self.batch_size)
+            return await cursor.to_list(length=None)
+
+    async def _aggregate(self, collection, pipeline):
+        async with self.semaphore:
+            cursor = self.db[collection].aggregate(pipeline, batchSize=self.batch_size)
+            return await cursor.to_list(length=None)
+
+    async def _stream(self, cursor):
+        # A slot is held for each batch fetched, not for the life of the
+        # stream, so a consumer that stops early holds none
+        try:
+            while True:
+                async with self.semaphore:
+                    batch = await cursor.to_list(length=self.batch_size)
+                if not batch:
+                    return
+                for document in batch:
+                    yield document
+        finally:
+            await cursor.close()
+
+    #TASK 3.2: READ OPERATIONS
+
+    async def find_active_students(self):
+        """Find all active students"""
+        return await self._find("users", repository.active_students_filter())
+
+    def iter_active_students(self):
+        """Stream active students batch by batch"""
+        return self._stream(self.db.users.find(repository.active_students_filter(), batch_size=self.batch_size))
+
+    async def courses_with_instructor(self, limit=3):
+        """Retrieve course details joined with instructor information"""
+        return await self._aggregate("courses", repository.courses_with_instructor_pipeline(limit))
+
+    async def courses_by_category(self, category):
+        """Get all courses in a specific category"""
+        return await self._find("courses", {"category": category})
+
+    def iter_courses_by_category(self, category):
+        """Stream the courses of a category batch by batch"""
+        return self._stream(self.db.courses.find({"category": category}, batch_size=self.batch_size))
+
+    async def enrolled_students(self, course_id):
+        """Find enrollments for a course joined with the enrolled student"""
+        return await self._aggregate("enrollments", repository.enrolled_students_pipeline(course_id))
+
+    def iter_enrolled_students(self, course_id):
+        """Stream the enrolled students of a course batch by batch"""
+        cursor = self.db.enrollments.aggregate(repository.enrolled_students_pipeline(course_id), batchSize=self.batch_size)
+        return self._stream(cursor)
+
+    #TASK 4.1: COMPLEX QUERIES
+
+    async def courses_in_price_range(self, low, high):
+        """Find courses with price between low and high (inclusive)"""
+        return await self._find("courses", {"price": {"$gte": low, "$lte": high}})
+
+    async def users_joined_since(self, since):
+        """Get users who joined on or after the given date"""
+        return await self._find("users", {"dateJoined": {"$gte": since}})
+
+    async def courses_with_tags(self, tags):
+        """Find courses that have any of the given tags"""
+        return await self._find("courses", {"tags": {"$in": list(tags)}})
+
+    async def upcoming_assignments(self, days=7):
+        """Retrieve assignments due within the next number of days"""
+        return await self._find("assignments", repository.upcoming_assignments_filter(days))
@@ -0,0 +1,477 @@
+"""Aggregation pipelines (Tasks 4.2 and 5.2)
+
+Each report has a *_pipeline() builder, so the pipelines can be inspected or
+benchmarked on their own, and a runner that executes it against the database.
+"""
+from . import instructor_analytics as instructors
+from . import partitioned
+from .connection import resolve_db
+from .snapshots import resolve as snapshots_mode
+
+
+def _rate(part, total):
+    """Percentage of part over total, rounded to 2 places"""
+    return {
+        "$round": [
+            {"$multiply": [
+                {"$divide": [part, total]},
+                100
+            ]}, 2
+        ]
+    }
+
+
+def _snapshot_match(snapshots):
+    """Like $unwind after the $lookup: skip enrollments without a course snapshot"""
+    return [{"$match": {"course": {"$type": "object"}}}] if snapshots else []
+
+
+def _aggregate(db, collection, pipeline, partitions=None):
+    """Run pipeline, split over key ranges by eduhub.partitioned when partitions is given"""
+    if partitions:
+        return partitioned.run(collection, pipeline, db, partitions)
+    return list(resolve_db(db)[collection].aggregate(pipeline))
+
+
+def _round(value, places=2):
+    return None if value is None else round(value, places)
+
+
+def _join_courses(groups, cache):
+    """Pair per-course $group results with cached courses, dropping unknown IDs like $unwind"""
+    groups = list(groups)
+    courses = cache.get_courses(group["_id"] for group in groups)
+    for group in groups:
+        if group["_id"] in courses:
+            yield group, courses[group["_id"]]
+
+
+#TASK 4.2: AGGREGATION PIPELINE
+
+# 1. Course Enrollment Statistics
+def enrollment_stats_pipeline(snapshots=False):
+    group = {
+        "_id": "$courseId",
+        "totalEnrollments": {"$sum": 1},
+        "activeEnrollments": {
+            "$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}
+        },
+        "completedEnrollments": {
+            "$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+        },
+        "averageProgress": {"$avg": "$progress"}
+    }
+    if snapshots:
+        # Course details come from the snapshot embedded in each enrollment
+        group["course"] = {"$first": "$course"}
+        join = []
+    else:
+        # Join with courses to get course details
+        join = [
+            {
+                "$lookup": {
+                    "from": "courses",
+                    "localField": "_id",
+                    "foreignField": "courseId",
+                    "as": "course"
+                }
+            },
+            {"$unwind": "$course"}
+        ]
+    return _snapshot_match(snapshots) + [
+        # Group by course to count enrollments
+        {"$group": group}
+    ] + join + [
+        # Project final results
+        {
+            "$project": {
+                "courseTitle": "$course.title",
+                "category": "$course.category",
+                "totalEnrollments": 1,
+                "activeEnrollments": 1,
+                "completedEnrollments": 1,
+                "averageProgress": {"$round": ["$averageProgress", 2]}
+            }
+        },
+        {"$sort": {"totalEnrollments": -1}}
+    ]
+
+
+def enrollment_stats(db=None, cache=None, snapshots=None):
+    """Enrollment counts and average progress per course
+
+    With a ReferenceCache only the $group runs on the server and the course
+    details are joined client-side from the cache. In snapshot mode (see
+    eduhub.snapshots) they are read from the enrollments themselves.
+    """
+    if cache is None:
+        pipeline = enrollment_stats_pipeline(snapshots_mode(snapshots))
+        return list(resolve_db(db).enrollments.aggregate(pipeline))
+    pipeline = enrollment_stats_pipeline()
+    results = []
+    for group, course in _join_courses(resolve_db(db).enrollments.aggregate(pipeline[:1]), cache):
+        group.update({
+            "courseTitle": course.get("title"),
+            "category": course.get("category"),
+            "averageProgress": _round(group["averageProgress"]),
+        })
+        results.append(group)
+    results.sort(key=lambda row: row["totalEnrollments"], reverse=True)
+    return results
+
+
+# 2. Student Performance Analysis
+def student_performance_pipeline():
+    return [
+        # Group by student to calculate performance metrics
+        {
+            "$group": {
+                "_id": "$studentId",
+                "totalSubmissions": {"$sum": 1},
+                "averageGrade": {"$avg": "$grade"},
+                "gradedSubmissions": {
+                    "$sum": {"$cond": [{"$ne": ["$grade", None]}, 1, 0]}
+                }
+            }
+        },
+        # Join with users to get student details
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "userId",
+                "as": "student"
+            }
+        },
+        {"$unwind": "$student"},
+        # Filter only students
+        {"$match": {"student.role": "student"}},
+        # Project final results
+        {
+            "$project": {
+                "studentName": {"$concat": ["$student.firstName", " ", "$student.lastName"]},
+                "totalSubmissions": 1,
+                "gradedSubmissions": 1,
+                "averageGrade": {"$round": ["$averageGrade", 2]},
+                "completionRate": _rate("$gradedSubmissions", "$totalSubmissions")
+            }
+        },
+        {"$sort": {"averageGrade": -1}}
+    ]
+
+
+def student_performance(db=None, partitions=None):
+    """Submission counts, average grade and completion rate per student"""
+    return _aggregate(db, "submissions", student_performance_pipeline(), partitions)
+
+
+# Completion rate by course
+def completion_by_course_pipeline(snapshots=False):
+    group = {
+        "_id": "$courseId",
+        "totalEnrollments": {"$sum": 1},
+        "completedEnrollments": {
+            "$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+        }
+    }
+    if snapshots:
+        group["course"] = {"$first": "$course"}
+        join = []
+    else:
+        join = [
+            {
+                "$lookup": {
+                    "from": "courses",
+                    "localField": "_id",
+                    "foreignField": "courseId",
+                    "as": "course"
+                }
+            },
+            {"$unwind": "$course"}
+        ]
+    return _snapshot_match(snapshots) + [{"$group": group}] + join + [
+        {
+            "$project": {
+                "courseTitle": "$course.title",
+                "completionRate": _rate("$completedEnrollments", "$totalEnrollments")
+            }
+        },
+        {"$sort": {"completionRate": -1}}
+    ]
+
+
+def completion_by_course(db=None, cache=None, snapshots=None, partitions=None):
+    """Completion rate per course, optionally joined from a ReferenceCache or snapshots"""
+    if cache is None:
+        pipeline = completion_by_course_pipeline(snapshots_mode(snapshots))
+        return _aggregate(db, "enrollments", pipeline, partitions)
+    pipeline = completion_by_course_pipeline()
+    results = []
+    for group, course in _join_courses(_aggregate(db, "enrollments", pipeline[:1], partitions), cache):
+        results.append({
+            "_id": group["_id"],
+            "courseTitle": course.get("title"),
+            "completionRate": _round(group["completedEnrollments"] / group["totalEnrollments"] * 100),
+        })
+    results.sort(key=lambda row: row["completionRate"], reverse=True)
+    return results
+
+
+# Top-performing students
+def top_students_pipeline(limit=3, min_submissions=2):
+    return [
+        {"$match": {"grade": {"$ne": None}}},
+        {
+            "$group": {
+                "_id": "$studentId",
+                "averageGrade": {"$avg": "$grade"},
+                "totalSubmissions": {"$sum": 1}
+            }
+        },
+        {"$match": {"totalSubmissions": {"$gte": min_submissions}}},
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "userId",
+                "as": "student"
+            }
+        },
+        {"$unwind": "$student"},
+        {
+            "$project": {
+                "studentName": {"$concat": ["$student.firstName", " ", "$student.lastName"]},
+                "averageGrade": {"$round": ["$averageGrade", 2]}
+            }
+        },
+        {"$sort": {"averageGrade": -1}},
+        {"$limit": limit}
+    ]
+
+
+def top_students(limit=3, min_submissions=2, db=None):
+    """Students with the highest average grade"""
+    return list(resolve_db(db).submissions.aggregate(top_students_pipeline(limit, min_submissions)))
+
+
+# 3. Instructor Analytics
+def instructor_analytics_pipeline(source="course_stats"):
+    """Enrollments counted per course, then summed per instructor (see eduhub.instructor_analytics)"""
+    return instructors.instructor_analytics_pipeline(source)
+
+
+def instructor_analytics(db=None, partitions=None, source="course_stats", distinct=None):
+    """Course, publication, student and revenue totals per instructor"""
+    return instructors.instructor_analytics(db, source=source, distinct=distinct, partitions=partitions)
+
+
+# 4. Advanced Analytics
+
+# Monthly enrollment trends
+def monthly_trends_pipeline():
+    return [
+        {
+            "$group": {
+                "_id": {
+                    "year": {"$year": "$enrollmentDate"},
+                    "month": {"$month": "$enrollmentDate"}
+                },
+                "enrollmentCount": {"$sum": 1}
+            }
+        },
+        # Sort while _id still holds year and month as numbers
+        {"$sort": {"_id.year": 1, "_id.month": 1}},
+        {
+            "$project": {
+                "period": {"$concat": [
+                    {"$toString": "$_id.year"}, "-",
+                    {"$toString": "$_id.month"}
+                ]},
+                "enrollmentCount": 1
+            }
+        }
+    ]
+
+
+def monthly_trends(db=None, approximate=False):
+    """Enrollment counts per calendar month (eduhub.rollups reads them pre-aggregated)
+
+    approximate=True reads them, and distinct students per month, from
+    eduhub.approximate's sketches instead.
+    """
+    if approximate:
+        from . import approximate as sketched
+
+        return sketched.monthly_trends(db)
+    return list(resolve_db(db).enrollments.aggregate(monthly_trends_pipeline()))
+
+
+# Most popular course categories
+def course_categories_pipeline():
+    return [
+        {
+            "$group": {
+                "_id": "$category",
+                "courseCount": {"$sum": 1},
+                "averagePrice": {"$avg": "$price"}
+            }
+        }
+    ]
+
+
+def popular_categories_pipeline():
+    # Runs on enrollments: one pass to count per course, then courses are
+    # joined once per course (not per enrollment) to find their category
+    return [
+        {"$group": {"_id": "$courseId", "enrollments": {"$sum": 1}}},
+        {
+            "$lookup": {
+                "from": "courses",
+                "localField": "_id",
+                "foreignField": "courseId",
+                "as": "course"
+            }
+        },
+        {"$unwind": "$course"},
+        {"$group": {"_id": "$course.category", "totalEnrollments": {"$sum": "$enrollments"}}},
+        # Add course count and price per category, including categories
+        # that have no enrollments yet
+        {
+            "$unionWith": {
+                "coll": "courses",
+                "pipeline": course_categories_pipeline()
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id",
+                "courseCount": {"$sum": "$courseCount"},
+                "averagePrice": {"$max": "$averagePrice"},
+                "totalEnrollments": {"$sum": "$totalEnrollments"}
+            }
+        },
+        {
+            "$project": {
+                "category": "$_id",
+                "courseCount": 1,
+                "averagePrice": {"$round": ["$averagePrice", 2]},
+                "totalEnrollments": 1
+            }
+        },
+        {"$sort": {"totalEnrollments": -1}}
+    ]
+
+
+def popular_categories(db=None, cache=None, approximate=False):
+    """Course count, average price and enrollments per category
+
+    With a ReferenceCache the enrollment counts per course are mapped to
+    categories client-side, so courses are never joined on the server.
+    approximate=True reads the enrollments, and distinct students per
+    category, from eduhub.approximate's sketches instead.
+    """
+    if approximate:
+        from . import approximate as sketched
+
+        return sketched.popular_categories(db)
+    db = resolve_db(db)
+    if cache is None:
+        return list(db.enrollments.aggregate(popular_categories_pipeline()))
+    per_course = list(db.enrollments.aggregate(popular_categories_pipeline()[:1]))
+    courses = cache.get_courses(row["_id"] for row in per_course)
+    enrollments = {}
+    for row in per_course:
+        course = courses.get(row["_id"])
+        if course is not None:
+            category = course.get("category")
+            enrollments[category] = enrollments.get(category, 0) + row["enrollments"]
+    results = []
+    for group in db.courses.aggregate(course_categories_pipeline()):
+        results.append({
+            "_id": group["_id"],
+            "courseCount": group["courseCount"],
+            "averagePrice": _round(group["averagePrice"]),
+            "category": group["_id"],
+            "totalEnrollments": enrollments.get(group["_id"], 0),
+        })
+    results.sort(key=lambda row: row["totalEnrollments"], reverse=True)
+    return results
+
+
+# Student engagement metrics
+def engagement_metrics_pipeline():
+    return [
+        {
+            "$group": {
+                "_id": None,
+                "totalEnrollments": {"$sum": 1},
+                "activeEnrollments": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}
+                },
+                "completedEnrollments": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+                },
+                "droppedEnrollments": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "dropped"]}, 1, 0]}
+                },
+                "averageProgress": {"$avg": "$progress"}
+            }
+        },
+        {
+            "$project": {
+                "totalEnrollments": 1,
+                "activeRate": _rate("$activeEnrollments", "$totalEnrollments"),
+                "completionRate": _rate("$completedEnrollments", "$totalEnrollments"),
+                "dropRate": _rate("$droppedEnrollments", "$totalEnrollments"),
+                "averageProgress": {"$round": ["$averageProgress", 2]}
+            }
+        }
+    ]
+
+
+def engagement_metrics(db=None, approximate=False):
+    """Overall active, completion and drop rates and average progress
+
+    approximate=True reads them, with distinct students and progress
+    percentiles, from eduhub.approximate's sketches instead of scanning.
+    """
+    if approximate:
+        from . import approximate as sketched
+
+        return sketched.engagement_metrics(db)
+    results = list(resolve_db(db).enrollments.aggregate(engagement_metrics_pipeline()))
+    return results[0] if results else None
+
+
+#TASK 5.2: QUERY OPTIMISATION
+
+# Active enrollments per course category
+def active_enrollments_by_category_pipeline(snapshots=False):
+    if snapshots:
+        join = [{"$match": {"course": {"$type": "object"}}}]
+    else:
+        join = [
+            {
+                "$lookup": {
+                    "from": "courses",
+                    "localField": "courseId",
+                    "foreignField": "courseId",
+                    "as": "course"
+                }
+            },
+            {"$unwind": "$course"}
+        ]
+    return [{"$match": {"status": "active"}}] + join + [
+        {
+            "$group": {
+                "_id": "$course.category",
+                "activeEnrollments": {"$sum": 1}
+            }
+        }
+    ]
+
+
+def active_enrollments_by_category(db=None, snapshots=None):
+    """Count of active enrollments per course category"""
+    pipeline = active_enrollments_by_category_pipeline(snapshots_mode(snapshots))
+    return list(resolve_db(db).enrollments.aggregate(pipeline))
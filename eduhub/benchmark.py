@@ -0,0 +1,309 @@
+"""Query benchmark harness (Tasks 3.2, 4.1, 4.2 and 5.2)
+
+Every registered query is run warmup times untimed, then repeat times timed
+with perf_counter_ns. The report gives p50/p95/p99 latency, docs/sec and
+the executionStats explain of the query: winning plan, index used, keys and
+documents examined. Results are saved as JSON, and two runs can be compared
+so that a latency regression fails the run:
+
+    python -m eduhub bench run --out before.json
+    python -m eduhub bench run --out after.json
+    python -m eduhub bench compare before.json after.json --threshold 0.2
+"""
+from datetime import datetime
+from datetime import timedelta
+import json
+import math
+import platform
+import time
+
+from . import analytics
+from . import repository
+from .connection import resolve_db
+
+
+#  Timing and statistics
+
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile (0-100) of an already sorted list"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lower = math.floor(k)
+    upper = math.ceil(k)
+    if lower == upper:
+        return sorted_values[int(k)]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def time_callable(fn, warmup=3, repeat=20):
+    """Run fn warmup + repeat times; return (timings in ns, result of the last run)"""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        result = fn()
+        samples.append(time.perf_counter_ns() - start)
+    return samples, result
+
+
+def summarize(samples_ns, docs_per_run):
+    """Latency percentiles in ms and throughput for a list of ns timings"""
+    ordered = sorted(samples_ns)
+    mean_ns = sum(ordered) / len(ordered)
+    p50 = percentile(ordered, 50)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0] / 1e6,
+        "mean_ms": mean_ns / 1e6,
+        "p50_ms": p50 / 1e6,
+        "p95_ms": percentile(ordered, 95) / 1e6,
+        "p99_ms": percentile(ordered, 99) / 1e6,
+        "max_ms": ordered[-1] / 1e6,
+        "docs_returned": docs_per_run,
+        "docs_per_sec": docs_per_run / (p50 / 1e9) if p50 else None,
+    }
+
+
+#  Explain parsing
+
+def _plan_stages(plan):
+    """Depth-first list of the stages of a winning plan"""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        # Slot based engine nests the classic-looking plan under queryPlan
+        if "queryPlan" in node:
+            stack.append(node["queryPlan"])
+            continue
+        if "stage" in node:
+            stages.append(node)
+        if "inputStage" in node:
+            stack.append(node["inputStage"])
+        stack.extend(reversed(node.get("inputStages", [])))
+    return stages
+
+
+def _find_key(node, key):
+    """Find the first value of key anywhere in a nested explain document"""
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def explain_summary(explain):
+    """Extract winning plan, index usage and examined counts from explain output
+
+    Handles find and aggregate explains, classic and slot based engines.
+    For aggregations the numbers describe the initial cursor stage, which is
+    where collection scans and index scans happen.
+    """
+    planner = _find_key(explain, "queryPlanner") or {}
+    winning = planner.get("winningPlan", {})
+    stages = _plan_stages(winning)
+    stats = _find_key(explain, "executionStats") or {}
+    indexes = [stage["indexName"] for stage in stages if "indexName" in stage]
+    return {
+        "winning_plan": " <- ".join(stage["stage"] for stage in stages) or None,
+        "index_used": indexes[0] if indexes else None,
+        "indexes": indexes,
+        "collection_scan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+        "n_returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+def explain_find(db, collection, filter, projection=None, sort=None, limit=0):
+    """Run the find command under explain with executionStats verbosity"""
+    command = {"find": collection, "filter": filter}
+    if projection:
+        command["projection"] = projection
+    if sort:
+        command["sort"] = sort
+    if limit:
+        command["limit"] = limit
+    return db.command({"explain": command, "verbosity": "executionStats"})
+
+
+def explain_aggregate(db, collection, pipeline):
+    """Run the aggregate command under explain with executionStats verbosity"""
+    command = {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+    return db.command({"explain": command, "verbosity": "executionStats"})
+
+
+#  Query registry
+
+class BenchmarkQuery:
+    """One query of the suite; build(db, params) returns a filter or a pipeline"""
+
+    def __init__(self, name, task, collection, kind, build):
+        self.name = name
+        self.task = task
+        self.collection = collection
+        self.kind = kind
+        self.build = build
+
+    def runner(self, db, params):
+        collection = db[self.collection]
+        spec = self.build(db, params)
+        if self.kind == "find":
+            return lambda: list(collection.find(spec))
+        return lambda: list(collection.aggregate(spec))
+
+    def explain(self, db, params):
+        spec = self.build(db, params)
+        if self.kind == "find":
+            return explain_find(db, self.collection, spec)
+        return explain_aggregate(db, self.collection, spec)
+
+
+def sample_params(db):
+    """Pick real IDs and dates from the database to parameterize the queries"""
+    course = db.courses.find_one({}, {"courseId": 1}) or {}
+    student = db.users.find_one({"role": "student"}, {"userId": 1}) or {}
+    now = datetime.now()
+    return {
+        "course_id": course.get("courseId"),
+        "student_id": student.get("userId"),
+        "now": now,
+        "six_months_ago": now - timedelta(days=180),
+        "next_week": now + timedelta(days=7),
+    }
+
+
+def _pipeline(builder):
+    return lambda db, params: builder()
+
+
+QUERIES = [
+    # Task 3.2: read operations
+    BenchmarkQuery("active_students", "3.2", "users", "find", lambda db, p: repository.active_students_filter()),
+    BenchmarkQuery("course_with_instructor", "3.2", "courses", "aggregate",
+                   _pipeline(repository.courses_with_instructor_pipeline)),
+    BenchmarkQuery("programming_courses", "3.2", "courses", "find",
+                   lambda db, p: {"category": "Programming"}),
+    BenchmarkQuery("enrolled_students", "3.2", "enrollments", "aggregate",
+                   lambda db, p: repository.enrolled_students_pipeline(p["course_id"])),
+    BenchmarkQuery("title_search", "3.2", "courses", "find",
+                   lambda db, p: {"title": {"$regex": "Python", "$options": "i"}}),
+    BenchmarkQuery("title_text_search", "3.2", "courses", "find",
+                   lambda db, p: {"$text": {"$search": "Python"}}),
+    # Task 4.1: complex queries
+    BenchmarkQuery("price_range_courses", "4.1", "courses", "find",
+                   lambda db, p: {"price": {"$gte": 50, "$lte": 200}}),
+    BenchmarkQuery("recent_users", "4.1", "users", "find",
+                   lambda db, p: {"dateJoined": {"$gte": p["six_months_ago"]}}),
+    BenchmarkQuery("tagged_courses", "4.1", "courses", "find",
+                   lambda db, p: {"tags": {"$in": ["online", "certificate", "hands-on"]}}),
+    BenchmarkQuery("upcoming_assignments", "4.1", "assignments", "find",
+                   lambda db, p: {"dueDate": {"$gte": p["now"], "$lte": p["next_week"]}}),
+    # Task 4.2: aggregation pipelines
+    BenchmarkQuery("enrollment_stats", "4.2", "enrollments", "aggregate", _pipeline(analytics.enrollment_stats_pipeline)),
+    BenchmarkQuery("student_performance", "4.2", "submissions", "aggregate", _pipeline(analytics.student_performance_pipeline)),
+    BenchmarkQuery("completion_by_course", "4.2", "enrollments", "aggregate", _pipeline(analytics.completion_by_course_pipeline)),
+    BenchmarkQuery("top_students", "4.2", "submissions", "aggregate", _pipeline(analytics.top_students_pipeline)),
+    BenchmarkQuery("instructor_analytics", "4.2", "courses", "aggregate", _pipeline(analytics.instructor_analytics_pipeline)),
+    BenchmarkQuery("monthly_trends", "4.2", "enrollments", "aggregate", _pipeline(analytics.monthly_trends_pipeline)),
+    BenchmarkQuery("popular_categories", "4.2", "enrollments", "aggregate", _pipeline(analytics.popular_categories_pipeline)),
+    BenchmarkQuery("engagement_metrics", "4.2", "enrollments", "aggregate", _pipeline(analytics.engagement_metrics_pipeline)),
+    BenchmarkQuery("course_stats_lookup", "4.2", "course_stats", "find",
+                   lambda db, p: {"_id": p["course_id"]}),
+    # Task 5.2: query optimisation
+    BenchmarkQuery("email_lookup", "5.2", "users", "find",
+                   lambda db, p: {"email": "john.smith@eduhub.com"}),
+    BenchmarkQuery("course_search", "5.2", "courses", "find",
+                   lambda db, p: {"category": "Programming", "isPublished": True}),
+    BenchmarkQuery("enrollment_lookup", "5.2", "enrollments", "find",
+                   lambda db, p: {"studentId": p["student_id"], "status": "active"}),
+    BenchmarkQuery("active_enrollments_by_category", "5.2", "enrollments", "aggregate",
+                   _pipeline(analytics.active_enrollments_by_category_pipeline)),
+    # Course snapshot mode: the same reports without the courses $lookup
+    BenchmarkQuery("enrollment_stats_snapshots", "4.2", "enrollments", "aggregate",
+                   lambda db, p: analytics.enrollment_stats_pipeline(snapshots=True)),
+    BenchmarkQuery("completion_by_course_snapshots", "4.2", "enrollments", "aggregate",
+                   lambda db, p: analytics.completion_by_course_pipeline(snapshots=True)),
+    BenchmarkQuery("active_enrollments_by_category_snapshots", "5.2", "enrollments", "aggregate",
+                   lambda db, p: analytics.active_enrollments_by_category_pipeline(snapshots=True)),
+]
+
+
+def benchmark_query(query, db, params, warmup=3, repeat=20):
+    """Time and explain one query"""
+    samples, result = time_callable(query.runner(db, params), warmup, repeat)
+    report = {"task": query.task, "collection": query.collection, "kind": query.kind}
+    report.update(summarize(samples, len(result)))
+    report["explain"] = explain_summary(query.explain(db, params))
+    return report
+
+
+def run_suite(db=None, names=None, warmup=3, repeat=20, queries=None, verbose=True):
+    """Benchmark the registered queries (or only those in names)"""
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    params = sample_params(db)
+    selected = [q for q in (queries or QUERIES) if not names or q.name in names]
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "database": db.name,
+            "server_version": db.client.server_info().get("version"),
+            "python": platform.python_version(),
+            "warmup": warmup,
+            "repeat": repeat,
+            "counts": {name: db[name].estimated_document_count() for name in sorted({q.collection for q in selected})},
+        },
+        "queries": {},
+    }
+    for query in selected:
+        report = benchmark_query(query, db, params, warmup, repeat)
+        results["queries"][query.name] = report
+        plan = report["explain"]
+        log(f" {query.name:<32} p50 {report['p50_ms']:9.2f} ms  p95 {report['p95_ms']:9.2f} ms  "
+            f"p99 {report['p99_ms']:9.2f} ms  {report['docs_returned']:>8} docs  "
+            f"keys {plan['keys_examined']}  docs {plan['docs_examined']}  index {plan['index_used'] or '-'}")
+    return results
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.2, metric="p95_ms", min_delta_ms=1.0):
+    """List queries whose metric got worse by more than threshold (a fraction)
+
+    Differences below min_delta_ms are ignored so sub-millisecond jitter on
+    tiny queries cannot fail a run.
+    """
+    rows = []
+    for name, new in current["queries"].items():
+        old = baseline["queries"].get(name)
+        if old is None:
+            continue
+        before, after = old[metric], new[metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before >= min_delta_ms
+        rows.append({"query": name, "before": before, "after": after, "change": change, "regressed": regressed})
+    return rows
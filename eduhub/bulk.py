@@ -0,0 +1,265 @@
+"""Buffered bulk writes with back-pressure for bursty enrollment/grading traffic
+
+Producers hand InsertOne/UpdateOne/DeleteOne operations to a BulkWriter. A
+background thread buffers them per collection and writes each buffer with
+bulk_write(ordered=False) once it reaches batch_size or has been waiting for
+flush_interval seconds. The hand-off queue is bounded, so when the database
+falls behind, producers block instead of piling up operations in memory.
+
+Failed operations are reported one by one to on_error. The callback may
+return a replacement operation, which is queued again. For example, it can
+retry a duplicate key insert with a fresh ID:
+
+    def retry_duplicates(failure):
+        if failure.code == 11000 and failure.attempt < 3:
+            doc = dict(failure.document, enrollmentId=new_id("ENROLL_"))
+            doc.pop("_id", None)
+            return InsertOne(doc)
+
+    with BulkWriter(on_error=retry_duplicates) as writer:
+        for event in events:
+            writer.insert_one("enrollments", event)
+
+Enrollments inserted through the writer are counted like
+repository.enroll_student counts them: after each batch, course_stats and
+enrollment_rollups get one upsert per course and bucket, and an
+enrollment_changed event is emitted per document. Deletes and updates of
+enrollments cannot be counted (the writer never sees the documents); they
+are tallied in stats["unaccounted"] and need repository.delete_enrollment /
+update_enrollment_progress, or a reconcile and backfill afterwards:
+
+    python -m eduhub stats reconcile
+    python -m eduhub rollups backfill
+"""
+import queue
+import threading
+import time
+
+from . import course_stats
+from . import hooks
+from . import rollups
+from . import summaries
+from .connection import resolve_db
+
+
+DUPLICATE_KEY = 11000
+
+_FLUSH = object()
+_STOP = object()
+# How often blocked producers check that the background thread is still running
+_POLL_INTERVAL = 0.5
+
+
+class WriteFailure:
+    """One operation that the server rejected"""
+
+    def __init__(self, collection, operation, code, message, attempt):
+        self.collection = collection
+        self.operation = operation
+        self.code = code
+        self.message = message
+        self.attempt = attempt
+
+    @property
+    def document(self):
+        """The document of a failed InsertOne, None for other operations"""
+        return getattr(self.operation, "_doc", None)
+
+    @property
+    def is_duplicate_key(self):
+        return self.code == DUPLICATE_KEY
+
+    def __repr__(self):
+        return f"WriteFailure({self.collection!r}, code={self.code}, message={self.message!r})"
+
+
+class BulkWriter:
+    """Per-collection write buffer flushed by size or time on a background thread"""
+
+    def __init__(self, db=None, batch_size=1000, flush_interval=1.0, max_pending=10_000, on_error=None, max_attempts=5,
+                 account=True):
+        self.db = resolve_db(db)
+        # False leaves course_stats, rollups and hooks alone, for loads followed by a reconcile
+        self.account = account
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.max_attempts = max_attempts
+        self.failures = []
+        self.stats = {"operations": 0, "batches": 0, "errors": 0, "retries": 0, "unaccounted": 0}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._buffers = {}
+        self._oldest = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="eduhub-bulk-writer", daemon=True)
+        self._thread.start()
+
+    # Producer API
+
+    def add(self, collection, operation):
+        """Queue a pymongo write model; blocks while max_pending ops are waiting"""
+        if self._closed:
+            raise RuntimeError("BulkWriter is closed")
+        self._put((collection, operation, 1))
+
+    def insert_one(self, collection, document):
+        from pymongo import InsertOne
+
+        self.add(collection, InsertOne(document))
+
+    def update_one(self, collection, filter, update, upsert=False):
+        from pymongo import UpdateOne
+
+        self.add(collection, UpdateOne(filter, update, upsert=upsert))
+
+    def delete_one(self, collection, filter):
+        from pymongo import DeleteOne
+
+        self.add(collection, DeleteOne(filter))
+
+    def flush(self, timeout=None):
+        """Block until every operation queued so far has been written
+
+        Raises TimeoutError after timeout seconds, and RuntimeError if the
+        background thread has stopped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        self._put((_FLUSH, done, 0), deadline)
+        while not done.wait(_POLL_INTERVAL):
+            self._check_alive()
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"BulkWriter flush did not finish in {timeout}s")
+
+    def close(self):
+        """Flush remaining operations and stop the background thread"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put((_STOP, None, 0))
+        self._thread.join()
+
+    def _check_alive(self):
+        if not self._thread.is_alive():
+            raise RuntimeError("BulkWriter background thread has stopped")
+
+    def _put(self, item, deadline=None):
+        """Queue item, blocking while the queue is full but not on a dead thread"""
+        while True:
+            self._check_alive()
+            wait = _POLL_INTERVAL if deadline is None else min(_POLL_INTERVAL, deadline - time.monotonic())
+            if wait <= 0:
+                raise TimeoutError("BulkWriter queue stayed full")
+            try:
+                self._queue.put(item, timeout=wait)
+                return
+            except queue.Full:
+                continue
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Background thread
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+            try:
+                collection, operation, attempt = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush_all()
+                continue
+
+            if collection is _STOP:
+                self._flush_all()
+                return
+            if collection is _FLUSH:
+                self._flush_all()
+                operation.set()
+                continue
+
+            buffer = self._buffers.setdefault(collection, [])
+            buffer.append((operation, attempt))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(buffer) >= self.batch_size:
+                self._flush_collection(collection)
+            elif time.monotonic() - self._oldest >= self.flush_interval:
+                self._flush_all()
+
+    def _flush_all(self):
+        # Retries produced by on_error are written in the same flush
+        while any(self._buffers.values()):
+            for collection in list(self._buffers):
+                self._flush_collection(collection)
+        self._buffers.clear()
+        self._oldest = None
+
+    def _flush_collection(self, collection):
+        from pymongo.errors import BulkWriteError
+
+        buffer = self._buffers.pop(collection, None)
+        if not buffer:
+            return
+        if not self._buffers:
+            self._oldest = None
+        operations = [operation for operation, _ in buffer]
+        try:
+            self.db[collection].bulk_write(operations, ordered=False)
+            errors = []
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+        except Exception as e:
+            # Whole batch failed (network, timeout...): report every operation
+            errors = [{"index": i, "code": None, "errmsg": str(e)} for i in range(len(operations))]
+
+        self.stats["batches"] += 1
+        self.stats["operations"] += len(operations) - len(errors)
+        if self.account and collection == "enrollments":
+            failed = {error["index"] for error in errors}
+            self._account([operation for i, operation in enumerate(operations) if i not in failed])
+        for error in errors:
+            operation, attempt = buffer[error["index"]]
+            self._handle_failure(WriteFailure(collection, operation, error.get("code"), error.get("errmsg"), attempt))
+
+    def _account(self, operations):
+        """Count written enrollment inserts in the summaries and tell the hooks"""
+        from pymongo import InsertOne
+
+        inserted = [operation._doc for operation in operations if isinstance(operation, InsertOne)]
+        self.stats["unaccounted"] += len(operations) - len(inserted)
+        if not inserted:
+            return
+        try:
+            if summaries.inline():
+                course_stats.record_inserts(inserted, self.db)
+                rollups.record_inserts(inserted, self.db)
+        except Exception:
+            # The enrollments are written; reconcile and backfill repair the summaries
+            self.stats["unaccounted"] += len(inserted)
+        for enrollment in inserted:
+            hooks.emit("enrollment_changed", course_id=enrollment.get("courseId"), delta=1, enrollment=enrollment,
+                       source=hooks.REPOSITORY)
+
+    def _handle_failure(self, failure):
+        self.stats["errors"] += 1
+        replacement = None
+        if self.on_error is not None:
+            try:
+                replacement = self.on_error(failure)
+            except Exception as e:
+                failure.message = f"{failure.message}; on_error raised {type(e).__name__}: {e}"
+        if replacement is not None and failure.attempt < self.max_attempts:
+            self.stats["retries"] += 1
+            self._buffers.setdefault(failure.collection, []).append((replacement, failure.attempt + 1))
+            # Written by the next timed flush, like a new operation
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        else:
+            self.failures.append(failure)
@@ -0,0 +1,241 @@
+"""Read-through cache for the course catalog and user lookups
+
+Courses and users are small, hot and rarely change, yet nearly every
+pipeline $lookups them. ReferenceCache keeps compact projections of both in
+process, with a TTL and LRU eviction bounded by total byte size. Misses are
+fetched in one $in query per batch. The repository update paths (publish,
+add tags, profile update, soft delete) emit hooks events, and the cache drops
+the affected entries when they arrive. Run an eduhub.changes consumer in the
+process to also see writes made elsewhere.
+
+    cache = get_reference_cache()
+    course = cache.get_course("COURSE_...")
+    instructors = cache.get_users(["USER_...", "USER_..."])
+    print(cache.stats())
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from . import hooks
+from .connection import resolve_db
+
+
+COURSE_PROJECTION = {"_id": 0, "courseId": 1, "title": 1, "category": 1, "level": 1, "instructorId": 1, "price": 1, "tags": 1, "isPublished": 1}
+USER_PROJECTION = {"_id": 0, "userId": 1, "firstName": 1, "lastName": 1, "email": 1, "role": 1, "isActive": 1}
+
+# Cached marker for IDs that do not exist, so they are not refetched every time
+_MISSING = object()
+_NOT_CACHED = object()
+
+
+def document_size(document):
+    """Approximate memory cost of a cached value, using its BSON size"""
+    if document is _MISSING or document is None:
+        return 16
+    import bson
+
+    return len(bson.encode(document))
+
+
+class TTLCache:
+    """Thread-safe LRU cache bounded by byte size, with a time to live per entry"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=300.0, sizeof=document_size, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+        self.bytes = 0
+        # Bumped by every invalidation; see set()
+        self.generation = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return default
+            value, size, expires = entry
+            if expires <= self.clock():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store value; skipped if generation is given and an invalidation happened since
+
+        Read-through callers pass the generation they saw before querying the
+        database, so a value read before an invalidation is never cached after it.
+        """
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self.clock() + self.ttl)
+            self.bytes += size
+            # Evict least recently used entries until back under budget
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.counters["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._entries:
+                self._remove(key)
+                self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        stats = dict(self.counters)
+        stats.update({
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.counters["hits"] / lookups if lookups else None,
+        })
+        return stats
+
+
+class ReferenceCache:
+    """Course and user projections cached in front of the database"""
+
+    def __init__(self, db=None, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        self._db = db
+        self.courses = TTLCache(max_bytes // 2, ttl)
+        self.users = TTLCache(max_bytes // 2, ttl)
+        self._installed = False
+
+    @property
+    def db(self):
+        return resolve_db(self._db)
+
+    def get_course(self, course_id):
+        return self.get_courses([course_id]).get(course_id)
+
+    def get_courses(self, course_ids):
+        """Return {courseId: projection} for the IDs that exist"""
+        return self._get_many(self.courses, "courses", "courseId", COURSE_PROJECTION, course_ids)
+
+    def get_user(self, user_id):
+        return self.get_users([user_id]).get(user_id)
+
+    def get_users(self, user_ids):
+        """Return {userId: projection} for the IDs that exist"""
+        return self._get_many(self.users, "users", "userId", USER_PROJECTION, user_ids)
+
+    def _get_many(self, cache, collection, key_field, projection, keys):
+        found = {}
+        missing = []
+        for key in set(keys):
+            value = cache.get(key, _NOT_CACHED)
+            if value is _NOT_CACHED:
+                missing.append(key)
+            elif value is not _MISSING:
+                found[key] = value
+        if missing:
+            generation = cache.generation
+            fetched = {doc[key_field]: doc for doc in self.db[collection].find({key_field: {"$in": missing}}, projection)}
+            for key in missing:
+                value = fetched.get(key, _MISSING)
+                cache.set(key, value, generation)
+                if value is not _MISSING:
+                    found[key] = value
+        return found
+
+    # Invalidation hooks
+
+    def invalidate_course(self, course_id):
+        self.courses.invalidate(course_id)
+
+    def invalidate_user(self, user_id):
+        self.users.invalidate(user_id)
+
+    def install(self):
+        """Subscribe to the repository's change events"""
+        if not self._installed:
+            hooks.register("course_changed", self._on_course_changed)
+            hooks.register("user_changed", self._on_user_changed)
+            hooks.register("resync", self._on_resync)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        hooks.unregister("course_changed", self._on_course_changed)
+        hooks.unregister("user_changed", self._on_user_changed)
+        hooks.unregister("resync", self._on_resync)
+        self._installed = False
+
+    def _on_course_changed(self, course_id, **_):
+        if course_id is None:
+            self.courses.clear()
+        else:
+            self.invalidate_course(course_id)
+
+    def _on_user_changed(self, user_id, **_):
+        if user_id is None:
+            self.users.clear()
+        else:
+            self.invalidate_user(user_id)
+
+    def _on_resync(self, collections, **_):
+        if "courses" in collections:
+            self.courses.clear()
+        if "users" in collections:
+            self.users.clear()
+
+    def stats(self):
+        return {"courses": self.courses.stats(), "users": self.users.stats()}
+
+
+_reference_cache = None
+_reference_lock = threading.Lock()
+
+
+def get_reference_cache():
+    """Return the process-wide reference cache, subscribed to change events"""
+    global _reference_cache
+    if _reference_cache is None:
+        with _reference_lock:
+            if _reference_cache is None:
+                _reference_cache = ReferenceCache().install()
+    return _reference_cache
+
+
+def reference_cache_for(db=None):
+    """The process-wide cache if db is the default database, otherwise a cache reading from db
+
+    The cache for another database is not subscribed to change events and
+    lives as long as the caller keeps it.
+    """
+    from .connection import get_db
+
+    if db is None or db == get_db():
+        return get_reference_cache()
+    return ReferenceCache(db)
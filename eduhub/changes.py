@@ -0,0 +1,226 @@
+"""Change stream consumer that fans database changes out to eduhub.hooks
+
+Writes made by other processes (or straight through the shell) never reach
+the in-process hooks. ChangeStreamConsumer watches users, courses,
+enrollments and submissions and re-emits every change as hooks events:
+
+- "change": collection, change (the raw change event), for every event
+- "course_changed" / "user_changed": course_id / user_id, for courses and users
+- "enrollment_changed": course_id, delta, enrollment, for inserted (+1) and
+  deleted (-1) enrollments
+- "enrollment_updated": before, after, for updated enrollments (before only
+  with pre-images)
+- "submission_graded": submission_id, grade, for updates that set a grade
+- "resync": collections, when events may have been lost and derived data
+  has to be rebuilt (history lost, database dropped, collection dropped)
+
+All of them with source=hooks.CHANGE_STREAM, and all but resync with
+change_id, the _id of the change event (its resume token).
+
+The resume token is saved in the changeStreamCheckpoints collection after
+the handlers of each event have run, so a restarted consumer continues
+exactly where it stopped. A crash between a handler and the save replays
+that single event, so handlers must be idempotent. Change streams need a
+replica set; a local single-node one is enough:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0
+    mongosh --eval "rs.initiate()"
+    python -m eduhub watch
+"""
+import functools
+import threading
+import time
+from datetime import datetime
+
+from . import hooks
+from .connection import resolve_db
+
+
+WATCHED_COLLECTIONS = ["users", "courses", "enrollments", "submissions"]
+CHECKPOINT_COLLECTION = "changeStreamCheckpoints"
+
+# Business key of the documents whose changes are forwarded as *_changed events
+KEY_EVENTS = {
+    "courses": ("courseId", "course_changed", "course_id"),
+    "users": ("userId", "user_changed", "user_id"),
+}
+
+CHANGE_STREAM_HISTORY_LOST = 286
+CHANGE_STREAM_FATAL_ERROR = 280
+
+
+class TokenStore:
+    """Resume tokens kept in a collection, one document per consumer name"""
+
+    def __init__(self, db=None, collection=CHECKPOINT_COLLECTION):
+        self._db = db
+        self.collection = collection
+
+    def load(self, name):
+        doc = resolve_db(self._db)[self.collection].find_one({"_id": name})
+        return doc["resumeToken"] if doc else None
+
+    def save(self, name, token):
+        resolve_db(self._db)[self.collection].update_one(
+            {"_id": name},
+            {"$set": {"resumeToken": token, "updatedAt": datetime.now()}},
+            upsert=True
+        )
+
+    def clear(self, name):
+        resolve_db(self._db)[self.collection].delete_one({"_id": name})
+
+
+class ChangeStreamConsumer:
+    """Watch the EduHub collections and emit hooks events for every change
+
+    run() blocks until stop() is called (or max_events were handled); start()
+    runs it on a daemon thread instead. Connection errors are retried with
+    backoff, resuming from the last handled event.
+    """
+
+    def __init__(self, db=None, name="default", collections=None, token_store=None,
+                 full_document_before_change=None, max_await_ms=1000, idle_checkpoint_interval=10.0,
+                 verbose=False):
+        self._db = db
+        self.name = name
+        self.collections = list(collections or WATCHED_COLLECTIONS)
+        self.token_store = token_store or TokenStore(db)
+        # "whenAvailable" on MongoDB 6.0+ with changeStreamPreAndPostImages
+        # enabled, so deletes still carry the business key
+        self.full_document_before_change = full_document_before_change
+        self.max_await_ms = max_await_ms
+        self.idle_checkpoint_interval = idle_checkpoint_interval
+        self.log = print if verbose else (lambda *args, **kwargs: None)
+        self.stats = {"events": 0, "handler_errors": 0, "checkpoints": 0, "reconnects": 0, "resyncs": 0, "errors": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def db(self):
+        return resolve_db(self._db)
+
+    def pipeline(self):
+        return [{"$match": {"ns.coll": {"$in": self.collections}}}]
+
+    def _watch(self, token):
+        options = {"full_document": "updateLookup", "max_await_time_ms": self.max_await_ms}
+        if self.full_document_before_change:
+            options["full_document_before_change"] = self.full_document_before_change
+        if token is not None:
+            # start_after (not resume_after) also resumes past an invalidate event
+            options["start_after"] = token
+        return self.db.watch(self.pipeline(), **options)
+
+    # Running
+
+    def run(self, max_events=None):
+        """Consume changes until stop() is called or max_events were handled"""
+        from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+
+        self._stop.clear()
+        token = self.token_store.load(self.name)
+        handled = 0
+        backoff = 0.5
+        self.log(f" Watching {', '.join(self.collections)} ({'resuming' if token else 'from now'})")
+        while not self._stop.is_set():
+            try:
+                with self._watch(token) as stream:
+                    backoff = 0.5
+                    last_checkpoint = time.monotonic()
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            # Keep the saved token fresh on quiet collections so
+                            # it does not fall off the end of the oplog
+                            if time.monotonic() - last_checkpoint >= self.idle_checkpoint_interval:
+                                if stream.resume_token is not None and stream.resume_token != token:
+                                    token = stream.resume_token
+                                    self._checkpoint(token)
+                                last_checkpoint = time.monotonic()
+                            continue
+                        self._dispatch(change)
+                        token = stream.resume_token
+                        self._checkpoint(token)
+                        last_checkpoint = time.monotonic()
+                        handled += 1
+                        if max_events is not None and handled >= max_events:
+                            self._stop.set()
+            except ConnectionFailure as e:
+                self.stats["reconnects"] += 1
+                self.log(f" Change stream connection lost ({e}); retrying in {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except PyMongoError as e:
+                if isinstance(e, OperationFailure) and e.code in (CHANGE_STREAM_HISTORY_LOST, CHANGE_STREAM_FATAL_ERROR):
+                    # The saved token is older than the oplog: events were missed
+                    self.log(f" Cannot resume change stream ({e}); resyncing")
+                    token = None
+                    self.token_store.clear(self.name)
+                    self._resync(self.collections)
+                    continue
+                # Anything else (a primary stepping down, a killed cursor...)
+                # is retried from the last handled event
+                self.stats["errors"] += 1
+                self.log(f" Change stream failed ({e}); retrying in {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+        return handled
+
+    def start(self):
+        """Run the consumer on a daemon thread"""
+        self._thread = threading.Thread(target=self.run, name=f"eduhub-changes-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Ask run() to return; it notices within max_await_ms"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Event handling
+
+    def _checkpoint(self, token):
+        self.token_store.save(self.name, token)
+        self.stats["checkpoints"] += 1
+
+    def _dispatch(self, change):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        self.stats["events"] += 1
+
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self._resync([collection] if collection in self.collections else self.collections)
+            return
+
+        emit = functools.partial(self._emit, change_id=change.get("_id"))
+        emit("change", collection=collection, change=change)
+        if collection in KEY_EVENTS:
+            field, event, argument = KEY_EVENTS[collection]
+            document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+            # None when the key is unknown (a delete without pre-images):
+            # handlers then have to drop everything they hold for the collection
+            emit(event, **{argument: document.get(field)})
+        elif collection == "enrollments" and operation in ("insert", "delete"):
+            document = change.get("fullDocument") or change.get("fullDocumentBeforeChange")
+            emit("enrollment_changed", course_id=(document or {}).get("courseId"),
+                 delta=1 if operation == "insert" else -1, enrollment=document)
+        elif collection == "enrollments" and operation in ("update", "replace"):
+            emit("enrollment_updated", before=change.get("fullDocumentBeforeChange"),
+                 after=change.get("fullDocument"))
+        elif collection == "submissions" and operation == "update":
+            updated = change.get("updateDescription", {}).get("updatedFields", {})
+            if "grade" in updated:
+                document = change.get("fullDocument") or {}
+                emit("submission_graded", submission_id=document.get("submissionId"), grade=updated["grade"])
+
+    def _resync(self, collections):
+        self.stats["resyncs"] += 1
+        self._emit("resync", collections=list(collections))
+
+    def _emit(self, event, **payload):
+        for handler, error in hooks.emit(event, source=hooks.CHANGE_STREAM, **payload):
+            self.stats["handler_errors"] += 1
+            self.log(f" Handler {getattr(handler, '__name__', handler)!r} failed on {event}: {error}")
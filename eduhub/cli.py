@@ -0,0 +1,569 @@
+"""Command line entry point: python -m eduhub <command> [options]"""
+import argparse
+from datetime import datetime
+import time
+
+
+def _seed(args):
+    from . import datagen
+    from .connection import get_db
+
+    dataset = datagen.SyntheticDataset(
+        users=datagen.parse_count(args.users),
+        courses=datagen.parse_count(args.courses),
+        enrollments_per_student=args.enrollments_per_student,
+        lessons_per_course=args.lessons_per_course,
+        assignments_per_course=args.assignments_per_course,
+        submissions_per_student=args.submissions_per_student,
+        instructor_ratio=args.instructor_ratio,
+        categories=args.categories,
+        zipf_s=args.zipf_s,
+        pareto_alpha=args.pareto_alpha,
+        seed=args.seed,
+        as_of=datetime.strptime(args.as_of, "%Y-%m-%d") if args.as_of else None,
+    )
+    datagen.generate(dataset, get_db(args.db), workers=args.workers, batch_size=args.batch_size, drop=args.drop)
+
+
+def _bench_run(args):
+    from . import benchmark
+    from .connection import get_db
+
+    recorder = None
+    if args.record_shapes:
+        from .query_shapes import QueryShapeRecorder
+
+        recorder = QueryShapeRecorder().install()
+    results = benchmark.run_suite(get_db(args.db), names=args.query, warmup=args.warmup, repeat=args.repeat)
+    if args.out:
+        benchmark.save_results(results, args.out)
+        print(f" Saved results to {args.out}")
+    if recorder is not None:
+        recorder.save(args.record_shapes)
+        print(f" Saved {len(recorder.shapes)} query shapes to {args.record_shapes}")
+
+
+def _bench_compare(args):
+    from . import benchmark
+
+    rows = benchmark.compare(benchmark.load_results(args.baseline), benchmark.load_results(args.current),
+                             threshold=args.threshold, metric=args.metric)
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(f" {row['query']:<32} {row['before']:9.2f} -> {row['after']:9.2f} ms  {row['change']:+7.1%}  {flag}")
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f" {len(regressions)} regression(s) above {args.threshold:.0%}")
+        raise SystemExit(1)
+
+
+def _watch(args):
+    from . import hooks
+    from .changes import ChangeStreamConsumer
+    from .connection import get_db
+
+    def print_change(collection, change, **_):
+        key = change.get("documentKey", {}).get("_id")
+        print(f" {change['operationType']:<8} {collection}.{key}")
+
+    if not args.quiet:
+        hooks.register("change", print_change)
+    db = get_db(args.db)
+    maintainer = sketcher = summarizer = None
+    if args.snapshots:
+        from .snapshots import SnapshotMaintainer
+
+        maintainer = SnapshotMaintainer(db).start()
+    if args.sketches:
+        from .approximate import SketchMaintainer
+
+        sketcher = SketchMaintainer(db, source=hooks.CHANGE_STREAM).start()
+    if args.summaries:
+        from .summaries import SummaryMaintainer
+
+        summarizer = SummaryMaintainer(db).install()
+    consumer = ChangeStreamConsumer(db, name=args.name, collections=args.collection, verbose=True,
+                                    full_document_before_change="whenAvailable" if args.pre_images else None)
+    try:
+        consumer.run(max_events=args.max_events)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if maintainer is not None:
+            maintainer.stop()
+            print(f" snapshots: {maintainer.stats}")
+        if sketcher is not None:
+            sketcher.stop()
+            print(f" sketches: {sketcher.stats}")
+        if summarizer is not None:
+            summarizer.uninstall()
+            print(f" summaries: {summarizer.stats}")
+    print(f" {consumer.stats}")
+
+
+def _stats_reconcile(args):
+    from . import course_stats
+    from .connection import get_db
+
+    result = course_stats.reconcile_course_stats(get_db(args.db))
+    print(f" Reconciled {result['courses']} courses, removed {result['removed']} stale")
+
+
+def _stats_top(args):
+    from . import course_stats
+    from .cache import ReferenceCache
+    from .connection import get_db
+
+    db = get_db(args.db)
+    for row in course_stats.top_courses(args.limit, db, cache=ReferenceCache(db)):
+        print(f" {row['courseTitle'] or row['_id']}: {row['totalEnrollments']} enrollments, "
+              f"{row['averageProgress']}% avg progress")
+
+
+def _snapshots_backfill(args):
+    from . import snapshots
+    from .connection import get_db
+
+    print(f" Updated {snapshots.backfill(get_db(args.db), batch_size=args.batch_size)} enrollments")
+
+
+def _export(args):
+    from . import export
+    from .connection import get_db
+
+    stats = export.export(args.name, args.path, format=args.format, db=get_db(args.db),
+                          batch_size=args.batch_size, verbose=args.verbose)
+    print(f" Wrote {stats['rows']:,} rows to {stats['path']} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_sec'] or 0:,.0f} rows/sec, peak RSS {stats['peak_rss_mb'] or 0:.0f} MB)")
+
+
+def _integrity_check(args):
+    import json
+
+    from . import integrity
+    from .connection import get_db
+
+    out = open(args.out, "w") if args.out else None
+    on_orphan = (lambda orphan: out.write(json.dumps(orphan, default=str) + "\n")) if out else None
+    try:
+        counts = integrity.check(get_db(args.db), collections=args.collection, action=args.action,
+                                 method=args.method, workers=args.workers, batch_size=args.batch_size,
+                                 on_orphan=on_orphan)
+    finally:
+        if out:
+            out.close()
+    print(f" {sum(counts.values()):,} orphans in {len(counts)} references")
+    if any(counts.values()) and not args.action:
+        raise SystemExit(1)
+
+
+def _integrity_restore(args):
+    from . import integrity
+    from .connection import get_db
+
+    print(f" Restored {integrity.restore(args.collection, get_db(args.db)):,} documents")
+
+
+def _typeahead(args):
+    from .connection import get_db
+    from .typeahead import Typeahead
+
+    start = time.perf_counter()
+    index = Typeahead(get_db(args.db), k=args.limit).build()
+    print(f" Built {len(index):,} completions in {time.perf_counter() - start:.1f}s")
+    for prefix in args.prefix:
+        start = time.perf_counter()
+        completions = index.complete(prefix)
+        print(f" {prefix!r} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+        for completion in completions:
+            print(f"   {completion['text']} [{completion['kind']}]: {completion['enrollments']:,} enrollments")
+
+
+def _columnar_save(args):
+    from . import columnar_file
+    from .connection import get_db
+
+    start = time.perf_counter()
+    header = columnar_file.save(args.path, get_db(args.db), batch_size=args.batch_size)
+    rows = sum(spec["length"] for name, spec in header["arrays"].items() if name.endswith("_row_id"))
+    print(f" Wrote {rows:,} rows to {args.path} in {time.perf_counter() - start:.1f}s"
+          f"{'' if header['resumeToken'] else ' (no replica set: it cannot be caught up on load)'}")
+
+
+def _columnar_load(args):
+    from . import columnar_file
+    from .connection import get_db
+
+    start = time.perf_counter()
+    store = columnar_file.load(args.path, get_db(args.db), catch_up_changes=not args.no_catch_up, verbose=True)
+    print(f" Ready in {time.perf_counter() - start:.3f}s: {len(store.submission_row_id):,} submissions, "
+          f"{len(store.enrollment_row_id):,} enrollments")
+
+
+def _indexes_advise(args):
+    from . import index_advisor
+    from .connection import get_db
+
+    plan = index_advisor.advise_from_file(args.shapes, get_db(args.db), min_count=args.min_count)
+    print(index_advisor.format_plan(plan))
+    if args.out:
+        index_advisor.save_plan(plan, args.out)
+        print(f" Saved the plan to {args.out}; set \"apply\" on the actions to take, then run indexes apply")
+
+
+def _indexes_apply(args):
+    from . import index_advisor
+    from .connection import get_db
+
+    plan = index_advisor.load_plan(args.plan)
+    if args.dry_run:
+        print(index_advisor.format_plan(plan))
+        return
+    index_advisor.apply_plan(plan, get_db(args.db))
+
+
+def _migrate_plan(args):
+    from . import migrations
+    from .connection import get_db
+
+    steps = migrations.plan(get_db(args.db), prune=args.prune, allow_rebuild=args.allow_rebuild)
+    for step in steps:
+        print(f" {'!' if step.action == 'conflict' else '-'} {step.describe()}")
+    print(f" {len(steps)} step(s); spec {migrations.fingerprint()}")
+
+
+def _migrate_apply(args):
+    from . import migrations
+    from .connection import get_db
+
+    window = tuple(args.window.split("-")) if args.window else None
+    # commitQuorum is a member count or a name like "majority"
+    quorum = int(args.commit_quorum) if args.commit_quorum and args.commit_quorum.isdigit() else args.commit_quorum
+    version = migrations.migrate(get_db(args.db), prune=args.prune, allow_rebuild=args.allow_rebuild,
+                                 rolling=args.rolling, window=window, max_lag=args.max_lag,
+                                 commit_quorum=quorum, poll=args.poll)
+    if version:
+        print(f" Applied version {version['_id']}: {len(version['steps'])} step(s)")
+
+
+def _migrate_history(args):
+    from . import migrations
+    from .connection import get_db
+
+    for version in migrations.history(get_db(args.db)):
+        print(f" {version['_id']:>4} {version['status']:<8} spec {version['spec']} "
+              f"{version['startedAt']:%Y-%m-%d %H:%M} {len(version['steps'])}/{len(version['planned'])} steps"
+              f"{'  ' + version['error'] if version.get('error') else ''}")
+
+
+def _date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def _rollups_backfill(args):
+    from . import rollups
+    from .connection import get_db
+
+    result = rollups.backfill(args.start, args.end, get_db(args.db))
+    print(f" Wrote {result['documents']} rollups, removed {result['removed']} stale")
+
+
+def _rollups_trends(args):
+    from . import rollups
+    from .connection import get_db
+
+    db = get_db(args.db)
+    if args.by_category:
+        for category, buckets in sorted(rollups.monthly_trends_by_category(args.months, db=db).items()):
+            print(f" {category}: " + ", ".join(f"{bucket:%Y-%m} {count}" for bucket, count in buckets))
+    else:
+        for row in rollups.monthly_trends(db=db)[-args.months:]:
+            print(f" {row['period']}: {row['enrollmentCount']} enrollments")
+
+
+def _sketches_rebuild(args):
+    from . import approximate
+    from .connection import get_db
+
+    start = time.perf_counter()
+    result = approximate.rebuild(get_db(args.db), precision=args.precision, verbose=True)
+    print(f" Rebuilt from {result['enrollments']:,} enrollments and {result['grades']:,} grades "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def _sketches_check(args):
+    from . import approximate
+    from .connection import get_db
+
+    rows = approximate.check(get_db(args.db), precision=args.precision)
+    if any(not row["ok"] for row in rows):
+        raise SystemExit(1)
+
+
+def _grades_rebuild(args):
+    from . import grades
+    from .connection import get_db
+
+    start = time.perf_counter()
+    result = grades.rebuild(get_db(args.db))
+    print(f" Rebuilt {result['histograms']:,} histograms and {result['students']:,} course averages "
+          f"in {time.perf_counter() - start:.1f}s; removed {result['removed']:,} stale documents")
+
+
+def _grades_histogram(args):
+    from . import grades
+    from .connection import get_db
+
+    db = get_db(args.db)
+    for row in grades.histogram(args.assignment, args.course, width=args.width, db=db):
+        if row["count"]:
+            print(f" {row['grade']:>3}: {row['count']:,}")
+    for p, grade in grades.percentiles(args.assignment, args.course, db=db).items():
+        print(f" p{p}: {grade}")
+
+
+def _grades_rank(args):
+    from . import grades
+    from .connection import get_db
+
+    rank = grades.student_rank(args.student_id, args.course_id, get_db(args.db))
+    if rank is None:
+        print(f" {args.student_id} has no graded submission in {args.course_id}")
+        raise SystemExit(1)
+    print(f" {args.student_id}: average {rank['averageGrade']} over {rank['gradedSubmissions']} submissions, "
+          f"rank {rank['rank']:,} of {rank['students']:,} (percentile {rank['percentile']})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="eduhub", description="EduHub database tools")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    seed = commands.add_parser("seed", help="generate a synthetic dataset for load testing")
+    seed.add_argument("--users", default="10k", help="number of users, e.g. 5M (default 10k)")
+    seed.add_argument("--courses", default="500", help="number of courses, e.g. 50k (default 500)")
+    seed.add_argument("--enrollments-per-student", type=float, default=3.0, help="mean enrollments per student")
+    seed.add_argument("--lessons-per-course", type=int, default=8)
+    seed.add_argument("--assignments-per-course", type=int, default=4)
+    seed.add_argument("--submissions-per-student", type=float, default=5.0, help="mean of the power-law submission count")
+    seed.add_argument("--instructor-ratio", type=float, default=0.02)
+    seed.add_argument("--categories", type=int, default=8)
+    seed.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent of course popularity")
+    seed.add_argument("--pareto-alpha", type=float, default=1.5, help="Pareto shape of submissions per student")
+    seed.add_argument("--seed", type=int, default=42, help="random seed; same seed and --as-of give the same data")
+    seed.add_argument("--as-of", help="reference date YYYY-MM-DD that all dates are relative to (default today)")
+    seed.add_argument("--workers", type=int, default=1, help="worker processes, each owning a shard of the ID space")
+    seed.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many call")
+    seed.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    seed.add_argument("--drop", action="store_true", help="drop the collections first")
+    seed.set_defaults(func=_seed)
+
+    bench = commands.add_parser("bench", help="query benchmark suite")
+    bench_commands = bench.add_subparsers(dest="bench_command")
+    bench_commands.required = True
+
+    run = bench_commands.add_parser("run", help="benchmark the Task 3.2, 4.1, 4.2 and 5.2 queries")
+    run.add_argument("--query", action="append", help="only run this query (repeatable)")
+    run.add_argument("--warmup", type=int, default=3)
+    run.add_argument("--repeat", type=int, default=20)
+    run.add_argument("--out", help="write results as JSON to this path")
+    run.add_argument("--record-shapes", metavar="PATH", help="record the query shapes run, for indexes advise")
+    run.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    run.set_defaults(func=_bench_run)
+
+    compare = bench_commands.add_parser("compare", help="compare two result files; exit 1 on regression")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction (default 0.2)")
+    compare.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    compare.set_defaults(func=_bench_compare)
+
+    stats = commands.add_parser("stats", help="course_stats summary collection")
+    stats_commands = stats.add_subparsers(dest="stats_command")
+    stats_commands.required = True
+
+    reconcile = stats_commands.add_parser("reconcile", help="rebuild course_stats from enrollments with $merge")
+    reconcile.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    reconcile.set_defaults(func=_stats_reconcile)
+
+    top = stats_commands.add_parser("top", help="courses with the most enrollments")
+    top.add_argument("--limit", type=int, default=10)
+    top.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    top.set_defaults(func=_stats_top)
+
+    rollups = commands.add_parser("rollups", help="day/month enrollment rollups")
+    rollups_commands = rollups.add_subparsers(dest="rollups_command")
+    rollups_commands.required = True
+
+    backfill = rollups_commands.add_parser("backfill", help="rebuild rollups for a date range with $merge")
+    backfill.add_argument("--start", type=_date, help="YYYY-MM-DD (default: first enrollment)")
+    backfill.add_argument("--end", type=_date, help="YYYY-MM-DD (default: today)")
+    backfill.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    backfill.set_defaults(func=_rollups_backfill)
+
+    trends = rollups_commands.add_parser("trends", help="monthly enrollment trends from the rollups")
+    trends.add_argument("--months", type=int, default=12)
+    trends.add_argument("--by-category", action="store_true")
+    trends.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    trends.set_defaults(func=_rollups_trends)
+
+    course_snapshots = commands.add_parser("snapshots", help="course snapshots embedded in enrollments")
+    snapshots_commands = course_snapshots.add_subparsers(dest="snapshots_command")
+    snapshots_commands.required = True
+
+    snapshots_backfill = snapshots_commands.add_parser("backfill", help="embed or refresh the snapshot on every enrollment")
+    snapshots_backfill.add_argument("--batch-size", type=int, default=500, help="courses per bulk_write")
+    snapshots_backfill.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    snapshots_backfill.set_defaults(func=_snapshots_backfill)
+
+    from .export import EXPORTS
+
+    export = commands.add_parser("export", help="stream an analytics result to Parquet, CSV or Arrow")
+    export.add_argument("name", choices=sorted(EXPORTS))
+    export.add_argument("path", help="output file; the extension picks the format unless --format is given")
+    export.add_argument("--format", choices=["parquet", "csv", "arrow"])
+    export.add_argument("--batch-size", type=int, default=50_000, help="rows per record batch / row group")
+    export.add_argument("--verbose", action="store_true", help="print progress after each batch")
+    export.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    export.set_defaults(func=_export)
+
+    migrate = commands.add_parser("migrate", help="declarative collection, validator and index migrations")
+    migrate_commands = migrate.add_subparsers(dest="migrate_command")
+    migrate_commands.required = True
+
+    migrate_plan = migrate_commands.add_parser("plan", help="show the steps that would be applied")
+    migrate_apply = migrate_commands.add_parser("apply", help="apply the steps one at a time and record a version")
+    for command in (migrate_plan, migrate_apply):
+        command.add_argument("--prune", action="store_true", help="drop indexes that are not in the spec")
+        command.add_argument("--allow-rebuild", action="store_true",
+                             help="drop and recreate indexes whose keys or options differ from the spec")
+        command.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    migrate_plan.set_defaults(func=_migrate_plan)
+    migrate_apply.add_argument("--rolling", action="store_true",
+                               help="pace index builds by maintenance window and replication lag")
+    migrate_apply.add_argument("--window", metavar="HH:MM-HH:MM", help="maintenance window for --rolling builds")
+    migrate_apply.add_argument("--max-lag", type=float, default=10.0, help="max secondary lag in seconds for --rolling")
+    migrate_apply.add_argument("--commit-quorum", help="createIndexes commitQuorum for --rolling, e.g. majority")
+    migrate_apply.add_argument("--poll", type=float, default=5.0, help="seconds between progress reports")
+    migrate_apply.set_defaults(func=_migrate_apply)
+
+    migrate_history = migrate_commands.add_parser("history", help="list the recorded migration versions")
+    migrate_history.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    migrate_history.set_defaults(func=_migrate_history)
+
+    indexes = commands.add_parser("indexes", help="index advisor driven by recorded query shapes")
+    index_commands = indexes.add_subparsers(dest="indexes_command")
+    index_commands.required = True
+
+    indexes_advise = index_commands.add_parser("advise", help="propose index creations and drops for recorded shapes")
+    indexes_advise.add_argument("shapes", help="query shapes file (bench run --record-shapes)")
+    indexes_advise.add_argument("--out", help="write the plan as JSON to this path")
+    indexes_advise.add_argument("--min-count", type=int, default=1, help="ignore shapes seen fewer times")
+    indexes_advise.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    indexes_advise.set_defaults(func=_indexes_advise)
+
+    indexes_apply = index_commands.add_parser("apply", help="create/drop the indexes marked \"apply\" in a plan")
+    indexes_apply.add_argument("plan")
+    indexes_apply.add_argument("--dry-run", action="store_true", help="only print the plan")
+    indexes_apply.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    indexes_apply.set_defaults(func=_indexes_apply)
+
+    columnar = commands.add_parser("columnar", help="memory-mapped snapshot files of the columnar analytics store")
+    columnar_commands = columnar.add_subparsers(dest="columnar_command")
+    columnar_commands.required = True
+
+    columnar_save = columnar_commands.add_parser("save", help="scan the collections and write a snapshot file")
+    columnar_save.add_argument("path")
+    columnar_save.add_argument("--batch-size", type=int, default=50_000)
+    columnar_save.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    columnar_save.set_defaults(func=_columnar_save)
+
+    columnar_load = columnar_commands.add_parser("load", help="map a snapshot file and apply the changes made since")
+    columnar_load.add_argument("path")
+    columnar_load.add_argument("--no-catch-up", action="store_true", help="do not read the change stream")
+    columnar_load.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    columnar_load.set_defaults(func=_columnar_load)
+
+    watch = commands.add_parser("watch", help="consume the change stream and fan events out to hooks")
+    watch.add_argument("--name", default="default", help="consumer name; its resume token is stored under it")
+    watch.add_argument("--collection", action="append", help="only watch this collection (repeatable)")
+    watch.add_argument("--max-events", type=int, help="stop after this many events")
+    watch.add_argument("--quiet", action="store_true", help="do not print each event")
+    watch.add_argument("--snapshots", action="store_true", help="propagate course edits to enrollment snapshots")
+    watch.add_argument("--sketches", action="store_true", help="merge enrollment and grade writes into the sketches")
+    watch.add_argument("--pre-images", action="store_true",
+                       help="ask for deleted and updated documents (MongoDB 6.0+ with changeStreamPreAndPostImages)")
+    watch.add_argument("--summaries", action="store_true",
+                       help="count enrollment writes in course_stats and enrollment_rollups "
+                            "(writers need EDUHUB_INLINE_SUMMARIES=0)")
+    watch.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    watch.set_defaults(func=_watch)
+
+    integrity = commands.add_parser("integrity", help="orphaned references, found by streaming anti-joins")
+    integrity_commands = integrity.add_subparsers(dest="integrity_command")
+    integrity_commands.required = True
+
+    integrity_check = integrity_commands.add_parser("check", help="report orphans; exit 1 if any (without --action)")
+    integrity_check.add_argument("--collection", action="append", help="only check this collection (repeatable)")
+    integrity_check.add_argument("--action", choices=["quarantine", "delete"],
+                                 help="move orphans to integrityQuarantine, or delete them")
+    integrity_check.add_argument("--method", default="auto", choices=["auto", "merge", "lookup"])
+    integrity_check.add_argument("--workers", type=int, default=4, help="threads of the $lookup method")
+    integrity_check.add_argument("--batch-size", type=int, default=1000)
+    integrity_check.add_argument("--out", help="write every orphan as a JSON line to this path")
+    integrity_check.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    integrity_check.set_defaults(func=_integrity_check)
+
+    integrity_restore = integrity_commands.add_parser("restore", help="put quarantined documents back")
+    integrity_restore.add_argument("--collection", help="only documents of this collection")
+    integrity_restore.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    integrity_restore.set_defaults(func=_integrity_restore)
+
+    complete = commands.add_parser("typeahead", help="top completions of prefixes over course titles and tags")
+    complete.add_argument("prefix", nargs="+")
+    complete.add_argument("--limit", type=int, default=10)
+    complete.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    complete.set_defaults(func=_typeahead)
+
+    sketches = commands.add_parser("sketches", help="sketches behind the approximate dashboard analytics")
+    sketches_commands = sketches.add_subparsers(dest="sketches_command")
+    sketches_commands.required = True
+
+    sketches_rebuild = sketches_commands.add_parser("rebuild", help="recompute every sketch from one scan")
+    sketches_rebuild.add_argument("--precision", type=int, default=12, help="HyperLogLog precision")
+    sketches_rebuild.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    sketches_rebuild.set_defaults(func=_sketches_rebuild)
+
+    sketches_check = sketches_commands.add_parser("check", help="compare with the exact pipelines; exit 1 if out of bounds")
+    sketches_check.add_argument("--precision", type=int, default=12, help="HyperLogLog precision they were built with")
+    sketches_check.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    sketches_check.set_defaults(func=_sketches_check)
+
+    grades = commands.add_parser("grades", help="grade distributions, percentiles and student ranks")
+    grades_commands = grades.add_subparsers(dest="grades_command")
+    grades_commands.required = True
+
+    grades_rebuild = grades_commands.add_parser("rebuild", help="recompute the grade histograms and course averages")
+    grades_rebuild.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    grades_rebuild.set_defaults(func=_grades_rebuild)
+
+    grades_histogram = grades_commands.add_parser("histogram", help="grade histogram and percentiles")
+    scope = grades_histogram.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--assignment", help="assignment id")
+    scope.add_argument("--course", help="course id (all its assignments)")
+    grades_histogram.add_argument("--width", type=int, default=10, help="grade points per bar")
+    grades_histogram.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    grades_histogram.set_defaults(func=_grades_histogram)
+
+    grades_rank = grades_commands.add_parser("rank", help="a student's average grade and rank in a course")
+    grades_rank.add_argument("student_id")
+    grades_rank.add_argument("course_id")
+    grades_rank.add_argument("--db", help="database name (default from EDUHUB_DB)")
+    grades_rank.set_defaults(func=_grades_rank)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
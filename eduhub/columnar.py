@@ -0,0 +1,419 @@
+"""In-memory columnar analytics over submissions and enrollments (NumPy)
+
+ColumnarStore.load() reads users, assignments, submissions and enrollments
+once, with projections and batched cursors. It keeps them as NumPy arrays:
+IDs are dictionary-encoded to int32 codes, statuses to int8 codes, and
+grades and progress are float32 (NaN where missing). The Task 4.2 metrics
+are then computed vectorized in memory, for any combination of filters,
+without going back to the database:
+
+    store = ColumnarStore.load()
+    store.student_performance()
+    store.top_students(limit=10, course_ids=["COURSE_..."], since=datetime(2026, 1, 1))
+    store.engagement_metrics(status=["active", "completed"])
+
+The results have the same shape as the eduhub.analytics runners. Values
+are widened back to float64 before summing, so averages agree with the
+pipelines to the 2 decimal places both round to; summation order can still
+flip a result that sits exactly on a rounding boundary. Requires numpy
+(pip install numpy).
+"""
+from datetime import datetime
+
+from .connection import resolve_db
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SUBMISSION_STATUSES = ["submitted", "graded", "late"]
+ENROLLMENT_STATUSES = ["active", "completed", "dropped"]
+# float32 keeps about 7 significant digits: rounding to this many places
+# when widening to float64 recovers grades/progress entered with up to 4 decimals
+RESTORE_DECIMALS = 4
+
+USER_PROJECTION = {"_id": 0, "userId": 1, "firstName": 1, "lastName": 1, "role": 1}
+ASSIGNMENT_PROJECTION = {"_id": 0, "assignmentId": 1, "courseId": 1}
+SUBMISSION_PROJECTION = {"studentId": 1, "assignmentId": 1, "grade": 1, "status": 1, "submittedAt": 1}
+ENROLLMENT_PROJECTION = {"studentId": 1, "courseId": 1, "progress": 1, "status": 1, "enrollmentDate": 1}
+
+# Column suffixes and dtypes of the submission_* and enrollment_* arrays;
+# row_id is the document _id, used to apply updates and deletes
+SUBMISSION_DTYPES = {"row_id": "S", "student": "int32", "assignment": "int32", "grade": "float32",
+                     "status": "int8", "time": "datetime64[ms]"}
+ENROLLMENT_DTYPES = {"row_id": "S", "student": "int32", "course": "int32", "progress": "float32",
+                     "status": "int8", "time": "datetime64[ms]"}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The columnar engine needs numpy: pip install numpy")
+
+
+def _round(value):
+    """Round like $round to 2 places; NaN becomes None"""
+    value = float(value)
+    return None if value != value else round(value, 2)
+
+
+class Dictionary:
+    """Dictionary encoding of string IDs to dense int32 codes"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    @classmethod
+    def from_values(cls, values):
+        """Dictionary whose codes are the positions in values"""
+        dictionary = cls()
+        dictionary.values = list(values)
+        dictionary.codes = {value: code for code, value in enumerate(dictionary.values)}
+        return dictionary
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values):
+        return np.fromiter((self.encode(value) for value in values), dtype=np.int32, count=len(values))
+
+    def lookup(self, values):
+        """Codes of the given IDs, skipping IDs that were never seen"""
+        return np.array([self.codes[v] for v in values if v in self.codes], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _status_codes(statuses):
+    return {status: code for code, status in enumerate(statuses)}
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+class ColumnarStore:
+    """Column arrays of submissions and enrollments, with the metrics computed from them"""
+
+    def __init__(self):
+        self.users = Dictionary()
+        self.courses = Dictionary()
+        self.assignments = Dictionary()
+        self.loaded_at = None
+        # Change stream position the columns are current to, when known (see eduhub.columnar_file)
+        self.resume_token = None
+
+    # Loading
+
+    @classmethod
+    def load(cls, db=None, batch_size=50_000):
+        """Read everything the metrics need from the database"""
+        _require_numpy()
+        db = resolve_db(db)
+        store = cls()
+        store._load_users(db, batch_size)
+        store._load_assignments(db, batch_size)
+        store._load_submissions(db, batch_size)
+        store._load_enrollments(db, batch_size)
+        store._pad_users()
+        store.loaded_at = datetime.now()
+        return store
+
+    def _load_users(self, db, batch_size):
+        self.user_names = []
+        students = []
+        for user in db.users.find({}, USER_PROJECTION, batch_size=batch_size):
+            self.users.encode(user.get("userId"))
+            self.user_names.append(_full_name(user))
+            students.append(user.get("role") == "student")
+        self.user_is_student = np.array(students, dtype=bool)
+        self.user_known = np.ones(len(students), dtype=bool)
+
+    def _load_assignments(self, db, batch_size):
+        courses = []
+        for assignment in db.assignments.find({}, ASSIGNMENT_PROJECTION, batch_size=batch_size):
+            self.assignments.encode(assignment.get("assignmentId"))
+            courses.append(self.courses.encode(assignment.get("courseId")))
+        self.assignment_course = np.array(courses, dtype=np.int32)
+
+    def _load_submissions(self, db, batch_size):
+        cursor = db.submissions.find({}, SUBMISSION_PROJECTION, batch_size=batch_size)
+        chunks = [self._submission_columns(batch) for batch in _batches(cursor, batch_size)]
+        self._set_columns("submission", chunks, SUBMISSION_DTYPES)
+        self._pad_assignments()
+
+    def _load_enrollments(self, db, batch_size):
+        cursor = db.enrollments.find({}, ENROLLMENT_PROJECTION, batch_size=batch_size)
+        chunks = [self._enrollment_columns(batch) for batch in _batches(cursor, batch_size)]
+        self._set_columns("enrollment", chunks, ENROLLMENT_DTYPES)
+
+    def _submission_columns(self, documents):
+        codes = _status_codes(SUBMISSION_STATUSES)
+        return {
+            "row_id": _row_ids([d.get("_id") for d in documents]),
+            "student": self.users.encode_many([d.get("studentId") for d in documents]),
+            "assignment": self.assignments.encode_many([d.get("assignmentId") for d in documents]),
+            "grade": _floats([d.get("grade") for d in documents]),
+            "status": np.array([codes.get(d.get("status"), -1) for d in documents], dtype=np.int8),
+            "time": _datetimes([d.get("submittedAt") for d in documents]),
+        }
+
+    def _enrollment_columns(self, documents):
+        codes = _status_codes(ENROLLMENT_STATUSES)
+        return {
+            "row_id": _row_ids([d.get("_id") for d in documents]),
+            "student": self.users.encode_many([d.get("studentId") for d in documents]),
+            "course": self.courses.encode_many([d.get("courseId") for d in documents]),
+            "progress": _floats([d.get("progress") for d in documents]),
+            "status": np.array([codes.get(d.get("status"), -1) for d in documents], dtype=np.int8),
+            "time": _datetimes([d.get("enrollmentDate") for d in documents]),
+        }
+
+    def _set_columns(self, prefix, chunks, dtypes):
+        for name, dtype in dtypes.items():
+            setattr(self, f"{prefix}_{name}", _concat([chunk[name] for chunk in chunks], dtype))
+
+    def _pad_assignments(self):
+        # Assignments referenced by submissions but missing from assignments have no course
+        missing = len(self.assignments) - len(self.assignment_course)
+        if missing:
+            self.assignment_course = np.concatenate([self.assignment_course, np.full(missing, -1, dtype=np.int32)])
+
+    def _pad_users(self):
+        # Student IDs seen only in submissions/enrollments: unknown users,
+        # dropped like the pipelines' $unwind after the users $lookup
+        missing = len(self.users) - len(self.user_names)
+        if missing:
+            self.user_names.extend([None] * missing)
+            self.user_is_student = np.concatenate([self.user_is_student, np.zeros(missing, dtype=bool)])
+            self.user_known = np.concatenate([self.user_known, np.zeros(missing, dtype=bool)])
+
+    # Incremental updates
+
+    def apply_changes(self, changes):
+        """Apply change stream events, oldest first; return how many touched the columns
+
+        Events need the post-image (full_document="updateLookup"). Submission
+        and enrollment events are folded per _id, so the rows are rewritten
+        once per call; replaying an event that is already reflected is
+        harmless. Users are updated by userId, so a user delete is only seen
+        when the event carries a pre-image.
+        """
+        pending = {"submissions": {}, "enrollments": {}}
+        applied = 0
+        for change in changes:
+            collection = change.get("ns", {}).get("coll")
+            operation = change.get("operationType")
+            if collection in pending:
+                key = _row_ids([change["documentKey"]["_id"]])[0]
+                pending[collection][key] = None if operation == "delete" else change.get("fullDocument")
+            elif collection == "users":
+                self._apply_user(operation, change)
+            elif collection == "assignments" and change.get("fullDocument"):
+                document = change["fullDocument"]
+                code = self.assignments.encode(document.get("assignmentId"))
+                self._pad_assignments()
+                self._writable("assignment_course")[code] = self.courses.encode(document.get("courseId"))
+            else:
+                continue
+            applied += 1
+        if pending["submissions"]:
+            self._upsert_rows("submission", pending["submissions"], self._submission_columns)
+        if pending["enrollments"]:
+            self._upsert_rows("enrollment", pending["enrollments"], self._enrollment_columns)
+        self._pad_users()
+        self._pad_assignments()
+        return applied
+
+    def _apply_user(self, operation, change):
+        document = change.get("fullDocument")
+        if operation == "delete" or document is None:
+            document = change.get("fullDocumentBeforeChange")
+            if document is None or document.get("userId") not in self.users.codes:
+                return
+            code = self.users.codes[document["userId"]]
+            self._writable("user_known")[code] = False
+            self._writable("user_is_student")[code] = False
+            return
+        code = self.users.encode(document.get("userId"))
+        self._pad_users()
+        self.user_names[code] = _full_name(document)
+        self._writable("user_known")[code] = True
+        self._writable("user_is_student")[code] = document.get("role") == "student"
+
+    def _upsert_rows(self, prefix, documents, build):
+        # Drop every touched row, then append the current version of the ones that still exist
+        keep = ~np.isin(getattr(self, f"{prefix}_row_id"), np.array(list(documents), dtype="S"))
+        current = [document for document in documents.values() if document is not None]
+        columns = build(current) if current else None
+        for name in (SUBMISSION_DTYPES if prefix == "submission" else ENROLLMENT_DTYPES):
+            values = getattr(self, f"{prefix}_{name}")[keep]
+            if columns is not None:
+                values = np.concatenate([values, columns[name]])
+            setattr(self, f"{prefix}_{name}", values)
+
+    def _writable(self, name):
+        # Columns loaded from a memory-mapped file are read-only: copy on first write
+        values = getattr(self, name)
+        if not values.flags.writeable:
+            values = values.copy()
+            setattr(self, name, values)
+        return values
+
+    # Filters
+
+    def _mask(self, size, students, courses, statuses, status_names, times, student_ids, course_ids, status, since, until):
+        mask = np.ones(size, dtype=bool)
+        if student_ids is not None:
+            mask &= np.isin(students, self.users.lookup(_as_list(student_ids)))
+        if course_ids is not None:
+            mask &= np.isin(courses, self.courses.lookup(_as_list(course_ids)))
+        if status is not None:
+            codes = _status_codes(status_names)
+            mask &= np.isin(statuses, [codes[s] for s in _as_list(status) if s in codes])
+        if since is not None:
+            mask &= times >= np.datetime64(since, "ms")
+        if until is not None:
+            mask &= times < np.datetime64(until, "ms")
+        return mask
+
+    def submission_mask(self, student_ids=None, course_ids=None, status=None, since=None, until=None):
+        """Boolean mask over submissions; since/until apply to submittedAt"""
+        courses = self.assignment_course[self.submission_assignment] if course_ids is not None else None
+        return self._mask(len(self.submission_student), self.submission_student, courses, self.submission_status,
+                          SUBMISSION_STATUSES, self.submission_time, student_ids, course_ids, status, since, until)
+
+    def enrollment_mask(self, student_ids=None, course_ids=None, status=None, since=None, until=None):
+        """Boolean mask over enrollments; since/until apply to enrollmentDate"""
+        return self._mask(len(self.enrollment_student), self.enrollment_student, self.enrollment_course,
+                          self.enrollment_status, ENROLLMENT_STATUSES, self.enrollment_time,
+                          student_ids, course_ids, status, since, until)
+
+    # Metrics
+
+    def student_performance(self, **filters):
+        """Same rows as analytics.student_performance, over the filtered submissions"""
+        mask = self.submission_mask(**filters)
+        students = self.submission_student[mask]
+        grades = self.submission_grade[mask]
+        size = len(self.users)
+        graded = ~np.isnan(grades)
+        total = np.bincount(students, minlength=size)
+        graded_count = np.bincount(students[graded], minlength=size)
+        grade_sum = np.bincount(students[graded], weights=_widen(grades[graded]), minlength=size)
+
+        codes = np.nonzero((total > 0) & self.user_is_student)[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = grade_sum[codes] / graded_count[codes]
+            rate = graded_count[codes] / total[codes] * 100
+        # Descending average, students without grades last (null sorts lowest)
+        order = np.argsort(np.where(np.isnan(average), np.inf, -average), kind="stable")
+        return [
+            {
+                "_id": self.users.values[codes[i]],
+                "studentName": self.user_names[codes[i]],
+                "totalSubmissions": int(total[codes[i]]),
+                "gradedSubmissions": int(graded_count[codes[i]]),
+                "averageGrade": _round(average[i]),
+                "completionRate": _round(rate[i]),
+            }
+            for i in order
+        ]
+
+    def top_students(self, limit=3, min_submissions=2, **filters):
+        """Same rows as analytics.top_students, over the filtered submissions"""
+        if limit <= 0:
+            return []
+        mask = self.submission_mask(**filters) & ~np.isnan(self.submission_grade)
+        students = self.submission_student[mask]
+        size = len(self.users)
+        count = np.bincount(students, minlength=size)
+        grade_sum = np.bincount(students, weights=_widen(self.submission_grade[mask]), minlength=size)
+
+        codes = np.nonzero((count >= max(min_submissions, 1)) & self.user_known)[0]
+        average = grade_sum[codes] / count[codes]
+        if len(codes) > limit:
+            # Partial selection first, then sort only the top limit
+            top = np.argpartition(-average, limit - 1)[:limit]
+        else:
+            top = np.arange(len(codes))
+        top = top[np.argsort(-average[top], kind="stable")]
+        return [
+            {
+                "_id": self.users.values[codes[i]],
+                "studentName": self.user_names[codes[i]],
+                "averageGrade": _round(average[i]),
+            }
+            for i in top
+        ]
+
+    def engagement_metrics(self, **filters):
+        """Same document as analytics.engagement_metrics, over the filtered enrollments"""
+        mask = self.enrollment_mask(**filters)
+        total = int(mask.sum())
+        if not total:
+            return None
+        statuses = np.bincount(self.enrollment_status[mask] + 1, minlength=len(ENROLLMENT_STATUSES) + 1)[1:]
+        progress = self.enrollment_progress[mask]
+        progress = progress[~np.isnan(progress)]
+        return {
+            "_id": None,
+            "totalEnrollments": total,
+            "activeRate": _round(statuses[0] / total * 100),
+            "completionRate": _round(statuses[1] / total * 100),
+            "dropRate": _round(statuses[2] / total * 100),
+            "averageProgress": _round(_widen(progress).mean()) if len(progress) else None,
+        }
+
+    def memory_bytes(self):
+        """Bytes held by the NumPy columns (not counting the ID dictionaries)"""
+        return sum(value.nbytes for value in vars(self).values() if isinstance(value, np.ndarray))
+
+
+def _batches(cursor, size):
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _full_name(user):
+    first, last = user.get("firstName"), user.get("lastName")
+    # $concat gives null if a part is missing
+    return f"{first} {last}" if isinstance(first, str) and isinstance(last, str) else None
+
+
+def _row_ids(values):
+    """Document _ids as fixed-width bytes (ObjectIds as their hex string)"""
+    return np.array([str(value).encode() for value in values], dtype="S")
+
+
+def _floats(values):
+    """float32 array; None and non-numeric values become NaN, as $avg ignores them"""
+    return np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values],
+                    dtype=np.float32)
+
+
+def _widen(values):
+    """float32 column as float64, with the float32 representation error rounded away"""
+    return np.round(values.astype(np.float64), RESTORE_DECIMALS)
+
+
+def _datetimes(values):
+    return np.array([v if isinstance(v, datetime) else None for v in values], dtype="datetime64[ms]")
+
+
+def _concat(chunks, dtype):
+    return np.concatenate(chunks) if chunks else np.array([], dtype=dtype)
@@ -0,0 +1,276 @@
+"""Memory-mapped snapshot files of the columnar analytics store
+
+Building a ColumnarStore scans users, assignments, submissions and
+enrollments in full, which takes minutes on a large database. save()
+writes a built store to a single file instead. Every worker then maps that
+file with load(): the NumPy columns are views straight onto the mapped
+pages (no copy, and shared between processes through the page cache), and
+only the ID dictionaries are decoded. Changes made since the snapshot are
+then read from the change stream and applied on top:
+
+    columnar_file.save("analytics.col")               # once, e.g. from cron
+    store = columnar_file.load("analytics.col")       # in each worker
+
+or from the shell:
+
+    python -m eduhub columnar save analytics.col
+    python -m eduhub columnar load analytics.col
+
+File layout (little-endian):
+
+    8 bytes   magic b"EDUCOL01"
+    8 bytes   header length in bytes (uint64)
+    header    UTF-8 JSON: version, createdAt, database, clusterTime,
+              resumeToken, and for every array/table its offset, size,
+              dtype and length
+    padding   to a 64-byte boundary, where the data section starts
+    data      each array's raw bytes, and each string table as a JSON
+              list, every one starting on a 64-byte boundary
+
+clusterTime and resumeToken record the change stream position taken just
+before the collections were scanned, so catching up may replay a few
+events that the scan already saw; applying them again changes nothing.
+Change streams need a replica set. Without one the snapshot has no
+position and is loaded as it is.
+"""
+import base64
+from datetime import datetime
+import json
+import mmap
+import os
+import struct
+import time
+
+from .columnar import ColumnarStore, Dictionary, np
+from .connection import resolve_db
+
+
+MAGIC = b"EDUCOL01"
+VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sQ")
+
+# String lists stored as JSON, by attribute: True for a Dictionary, False for a plain list
+TABLES = {
+    "users": True,
+    "courses": True,
+    "assignments": True,
+    "user_names": False,
+}
+COLLECTIONS = ["users", "assignments", "submissions", "enrollments"]
+
+# Events that mean the snapshot no longer describes the collections
+INVALIDATING_OPERATIONS = ("drop", "rename", "dropDatabase", "invalidate")
+CHANGE_STREAM_HISTORY_LOST = 286
+CHANGE_STREAM_FATAL_ERROR = 280
+
+
+class SnapshotTooOld(Exception):
+    """The changes since the snapshot cannot be replayed; a full load is needed"""
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Columnar snapshot files need numpy: pip install numpy")
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _arrays(store):
+    return {name: value for name, value in sorted(vars(store).items()) if isinstance(value, np.ndarray)}
+
+
+def _table(store, name):
+    value = getattr(store, name)
+    return value.values if TABLES[name] else value
+
+
+# Change stream position
+
+def stream_position(db=None):
+    """(resume token, cluster time) of "now", or (None, None) without a replica set"""
+    from pymongo.errors import OperationFailure
+
+    db = resolve_db(db)
+    try:
+        with db.watch([{"$match": {"ns.coll": {"$in": COLLECTIONS}}}], max_await_time_ms=1) as stream:
+            stream.try_next()
+            token = stream.resume_token
+    except OperationFailure:
+        return None, None
+    return token, db.command("ping").get("operationTime")
+
+
+def _encode_token(token):
+    import bson
+
+    return None if token is None else base64.b64encode(bson.encode(token)).decode()
+
+
+def _decode_token(text):
+    import bson
+
+    return None if text is None else bson.decode(base64.b64decode(text))
+
+
+# Writing
+
+def save(path, db=None, store=None, batch_size=50_000):
+    """Write a snapshot file; with no store, build one from the database first
+
+    A store passed in must be freshly loaded: the file records the change
+    stream position of now, not of when the store was built.
+    """
+    _require_numpy()
+    db = resolve_db(db)
+    token, cluster_time = stream_position(db)
+    if store is None:
+        store = ColumnarStore.load(db, batch_size=batch_size)
+
+    sections = []
+    header = {
+        "version": VERSION,
+        "createdAt": datetime.now().isoformat(),
+        "database": db.name,
+        "clusterTime": None if cluster_time is None else {"t": cluster_time.time, "i": cluster_time.inc},
+        "resumeToken": _encode_token(token),
+        "arrays": {},
+        "tables": {},
+    }
+    offset = 0
+    for name, values in _arrays(store).items():
+        data = np.ascontiguousarray(values).view(np.uint8).reshape(-1)
+        header["arrays"][name] = {"offset": offset, "nbytes": data.nbytes, "dtype": values.dtype.str,
+                                  "length": len(values)}
+        sections.append((offset, data))
+        offset = _aligned(offset + data.nbytes)
+    for name in TABLES:
+        data = json.dumps(_table(store, name), separators=(",", ":")).encode()
+        header["tables"][name] = {"offset": offset, "nbytes": len(data)}
+        sections.append((offset, data))
+        offset = _aligned(offset + len(data))
+
+    header_bytes = json.dumps(header).encode()
+    data_start = _aligned(PREAMBLE.size + len(header_bytes))
+    # Written next to the target and renamed, so readers never map a partial file
+    partial = f"{path}.partial"
+    with open(partial, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for section_offset, data in sections:
+            f.seek(data_start + section_offset)
+            f.write(data)
+        f.truncate(data_start + offset)
+    os.replace(partial, path)
+    return header
+
+
+# Reading
+
+def read_header(path):
+    """The header of a snapshot file, without mapping the data"""
+    with open(path, "rb") as f:
+        return _parse_header(f.read(PREAMBLE.size), f)
+
+
+def _parse_header(preamble, f):
+    magic, length = PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError("Not an eduhub columnar snapshot file")
+    header = json.loads(f.read(length))
+    if header.get("version") != VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+    header["dataStart"] = _aligned(PREAMBLE.size + length)
+    return header
+
+
+def map_store(path):
+    """ColumnarStore whose arrays are read-only views of the mapped file; return (store, header)"""
+    _require_numpy()
+    with open(path, "rb") as f:
+        header = _parse_header(f.read(PREAMBLE.size), f)
+        # The mapping stays valid after the file is closed
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    start = header["dataStart"]
+    store = ColumnarStore()
+    for name, spec in header["arrays"].items():
+        setattr(store, name, np.frombuffer(mapped, dtype=spec["dtype"], count=spec["length"],
+                                           offset=start + spec["offset"]))
+    for name, spec in header["tables"].items():
+        offset = start + spec["offset"]
+        values = json.loads(mapped[offset:offset + spec["nbytes"]])
+        setattr(store, name, Dictionary.from_values(values) if TABLES[name] else values)
+    store.loaded_at = datetime.fromisoformat(header["createdAt"])
+    return store, header
+
+
+def catch_up(store, db=None, token=None, cluster_time=None, batch_size=10_000, max_await_ms=200):
+    """Apply every change after the given stream position; return (events applied, new resume token)
+
+    Raises SnapshotTooOld when the oplog no longer reaches back to the
+    position, or a watched collection was dropped or renamed since.
+    """
+    from bson import Timestamp
+    from pymongo.errors import OperationFailure
+
+    options = {"full_document": "updateLookup", "max_await_time_ms": max_await_ms}
+    if token is not None:
+        options["start_after"] = token
+    else:
+        options["start_at_operation_time"] = Timestamp(cluster_time["t"], cluster_time["i"])
+    applied = 0
+    batch = []
+    try:
+        with resolve_db(db).watch([{"$match": {"ns.coll": {"$in": COLLECTIONS}}}], **options) as stream:
+            while True:
+                # None once the stream has nothing newer: caught up
+                change = stream.try_next()
+                if change is None:
+                    break
+                if change["operationType"] in INVALIDATING_OPERATIONS:
+                    raise SnapshotTooOld(f"{change['operationType']} on {change.get('ns', {}).get('coll')}")
+                batch.append(change)
+                if len(batch) >= batch_size:
+                    applied += store.apply_changes(batch)
+                    batch = []
+            applied += store.apply_changes(batch)
+            return applied, stream.resume_token
+    except OperationFailure as e:
+        if e.code in (CHANGE_STREAM_HISTORY_LOST, CHANGE_STREAM_FATAL_ERROR):
+            raise SnapshotTooOld(str(e))
+        raise
+
+
+def load(path, db=None, catch_up_changes=True, rebuild=True, verbose=False):
+    """Map a snapshot file and bring it up to date with the change stream
+
+    When the changes cannot be replayed the store is rebuilt with a full
+    scan (rebuild=False raises SnapshotTooOld instead). The returned store
+    has resume_token set to the position it is current to, for callers that
+    keep following the stream.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    start = time.perf_counter()
+    store, header = map_store(path)
+    log(f" Mapped {path} ({os.path.getsize(path) / (1024 * 1024):,.1f} MB) in {time.perf_counter() - start:.3f}s")
+    token = _decode_token(header["resumeToken"])
+    store.resume_token = token
+    if not catch_up_changes:
+        return store
+    if token is None and header["clusterTime"] is None:
+        log(" Snapshot has no change stream position; not catching up")
+        return store
+    try:
+        applied, store.resume_token = catch_up(store, db, token, header["clusterTime"])
+    except SnapshotTooOld as e:
+        if not rebuild:
+            raise
+        log(f" Cannot catch up ({e}); rebuilding from the collections")
+        position, _ = stream_position(db)
+        store = ColumnarStore.load(db)
+        store.resume_token = position
+        return store
+    log(f" Applied {applied:,} changes since {header['createdAt']} in {time.perf_counter() - start:.3f}s total")
+    return store
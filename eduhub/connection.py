@@ -0,0 +1,121 @@
+"""Shared, lazily created MongoDB client for the EduHub database.
+
+Nothing here talks to the server (or even imports pymongo) until the first
+call to get_client()/get_db(). Every caller in the process then shares one
+pooled MongoClient.
+"""
+import os
+import threading
+
+
+# Connection settings, overridable from the environment or via configure()
+DEFAULT_SETTINGS = {
+    "uri": os.environ.get("EDUHUB_MONGO_URI", "mongodb://localhost:27017/"),
+    "database": os.environ.get("EDUHUB_DB", "eduhub_db"),
+    "maxPoolSize": int(os.environ.get("EDUHUB_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.environ.get("EDUHUB_MIN_POOL_SIZE", "0")),
+    "serverSelectionTimeoutMS": int(os.environ.get("EDUHUB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.environ.get("EDUHUB_CONNECT_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.environ.get("EDUHUB_SOCKET_TIMEOUT_MS", "30000")),
+    "waitQueueTimeoutMS": int(os.environ.get("EDUHUB_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    "readPreference": os.environ.get("EDUHUB_READ_PREFERENCE", "primary"),
+    "appname": os.environ.get("EDUHUB_APPNAME", "eduhub"),
+}
+
+_settings = dict(DEFAULT_SETTINGS)
+# pymongo.monitoring listeners passed to the shared client (see add_event_listener)
+_listeners = []
+# Clients replaced after a listener change; cursors opened on them keep
+# working until close_client()
+_retired = []
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def configure(**options):
+    """Override connection settings; the next get_client() call picks them up"""
+    unknown = set(options) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown connection settings: {sorted(unknown)}")
+    with _lock:
+        _settings.update(options)
+        _close_locked()
+
+
+def add_event_listener(listener):
+    """Attach a pymongo.monitoring listener; the next get_client() call picks it up
+
+    The current client is left open for the cursors and change streams
+    already running on it, so only commands sent through a later
+    get_client() are seen by the listener.
+    """
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+            _retire_locked()
+
+
+def remove_event_listener(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+            _retire_locked()
+
+
+def get_settings():
+    """Return a copy of the active connection settings"""
+    return dict(_settings)
+
+
+def get_client():
+    """Return the process-wide MongoClient, creating it on first use"""
+    global _client, _client_pid
+    client = _client
+    # A client inherited across fork() must not be reused by the child
+    if client is not None and _client_pid == os.getpid():
+        return client
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            from pymongo import MongoClient
+
+            options = dict(_settings)
+            uri = options.pop("uri")
+            options.pop("database")
+            _client = MongoClient(uri, connect=False, event_listeners=list(_listeners), **options)
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_db(name=None):
+    """Return the EduHub database handle from the shared client"""
+    return get_client()[name or _settings["database"]]
+
+
+def resolve_db(db=None):
+    """Return db if given, otherwise the default EduHub database"""
+    return get_db() if db is None else db
+
+
+def close_client():
+    """Close the shared client (and those replaced by listener changes); a new one is created on next use"""
+    with _lock:
+        _close_locked()
+        while _retired:
+            _retired.pop().close()
+
+
+def _retire_locked():
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _retired.append(_client)
+    _client = None
+    _client_pid = None
+
+
+def _close_locked():
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
@@ -0,0 +1,187 @@
+"""Incrementally maintained enrollment statistics per course (course_stats)
+
+The Task 4.2 enrollment statistics pipeline scans every enrollment on each
+call. course_stats keeps the same numbers in one document per course:
+
+    {"_id": courseId, "totalEnrollments", "activeEnrollments",
+     "completedEnrollments", "progressSum", "progressCount", "updatedAt"}
+
+The repository enrollment write paths apply $inc deltas here in the same
+call as the write. Writes that bypass them (bulk loads, the shell, a crash
+between the two writes) cause drift, which reconcile_course_stats() repairs
+by recomputing everything with $merge; run it periodically, e.g. from cron:
+
+    python -m eduhub stats reconcile
+"""
+from datetime import datetime
+
+from .connection import resolve_db
+
+
+COLLECTION = "course_stats"
+
+COUNTERS = ["totalEnrollments", "activeEnrollments", "completedEnrollments", "progressSum", "progressCount"]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def enrollment_delta(enrollment, sign=1):
+    """$inc document that adds (sign=1) or removes (sign=-1) an enrollment"""
+    status = enrollment.get("status")
+    progress = enrollment.get("progress")
+    # $avg in the pipeline ignores missing and non-numeric progress, so do we
+    counted = _is_number(progress)
+    return {
+        "totalEnrollments": sign,
+        "activeEnrollments": sign if status == "active" else 0,
+        "completedEnrollments": sign if status == "completed" else 0,
+        "progressSum": sign * progress if counted else 0,
+        "progressCount": sign if counted else 0,
+    }
+
+
+def _apply(db, course_id, delta):
+    delta = {field: value for field, value in delta.items() if value}
+    if course_id is None or not delta:
+        return
+    db[COLLECTION].update_one(
+        {"_id": course_id},
+        {"$inc": delta, "$set": {"updatedAt": datetime.now()}},
+        upsert=True
+    )
+
+
+def record_insert(enrollment, db=None):
+    """Count a newly inserted enrollment"""
+    _apply(resolve_db(db), enrollment.get("courseId"), enrollment_delta(enrollment, 1))
+
+
+def record_delete(enrollment, db=None):
+    """Uncount a deleted enrollment (the document as it was before the delete)"""
+    _apply(resolve_db(db), enrollment.get("courseId"), enrollment_delta(enrollment, -1))
+
+
+def record_inserts(enrollments, db=None):
+    """Count a batch of newly inserted enrollments with one upsert per course"""
+    from pymongo import UpdateOne
+
+    totals = {}
+    for enrollment in enrollments:
+        course_id = enrollment.get("courseId")
+        if course_id is None:
+            continue
+        total = totals.setdefault(course_id, dict.fromkeys(COUNTERS, 0))
+        for field, value in enrollment_delta(enrollment, 1).items():
+            total[field] += value
+    now = datetime.now()
+    operations = [
+        UpdateOne({"_id": course_id},
+                  {"$inc": {field: value for field, value in total.items() if value}, "$set": {"updatedAt": now}},
+                  upsert=True)
+        for course_id, total in totals.items()
+    ]
+    if operations:
+        resolve_db(db)[COLLECTION].bulk_write(operations, ordered=False)
+
+
+def record_update(before, after, db=None):
+    """Apply the difference between two versions of an enrollment"""
+    db = resolve_db(db)
+    if before.get("courseId") != after.get("courseId"):
+        record_delete(before, db)
+        record_insert(after, db)
+        return
+    removed = enrollment_delta(before, -1)
+    added = enrollment_delta(after, 1)
+    _apply(db, after.get("courseId"), {field: removed[field] + added[field] for field in COUNTERS})
+
+
+# Reads
+
+def _shape(doc):
+    """Present a course_stats document like a Task 4.2 enrollment_stats row"""
+    count = doc.get("progressCount", 0)
+    return {
+        "_id": doc["_id"],
+        "totalEnrollments": doc.get("totalEnrollments", 0),
+        "activeEnrollments": doc.get("activeEnrollments", 0),
+        "completedEnrollments": doc.get("completedEnrollments", 0),
+        "averageProgress": round(doc.get("progressSum", 0) / count, 2) if count else None,
+    }
+
+
+def get_course_stats(course_id, db=None):
+    """Enrollment statistics of one course, read from a single document"""
+    doc = resolve_db(db)[COLLECTION].find_one({"_id": course_id})
+    return _shape(doc) if doc else None
+
+
+def top_courses(limit=10, db=None, cache=None):
+    """Courses with the most enrollments, with title and category when a ReferenceCache is given"""
+    cursor = resolve_db(db)[COLLECTION].find({"totalEnrollments": {"$gt": 0}}).sort("totalEnrollments", -1).limit(limit)
+    rows = [_shape(doc) for doc in cursor]
+    if cache is not None:
+        courses = cache.get_courses(row["_id"] for row in rows)
+        for row in rows:
+            course = courses.get(row["_id"], {})
+            row["courseTitle"] = course.get("title")
+            row["category"] = course.get("category")
+    return rows
+
+
+# Reconciliation
+
+def reconcile_pipeline(started):
+    return [
+        {
+            "$group": {
+                "_id": "$courseId",
+                "totalEnrollments": {"$sum": 1},
+                "activeEnrollments": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}
+                },
+                "completedEnrollments": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+                },
+                "progressSum": {"$sum": "$progress"},
+                "progressCount": {
+                    "$sum": {"$cond": [{"$isNumber": "$progress"}, 1, 0]}
+                }
+            }
+        },
+        {"$match": {"_id": {"$ne": None}}},
+        {"$set": {"updatedAt": started, "reconciledAt": started}},
+        {
+            "$merge": {
+                "into": COLLECTION,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }
+    ]
+
+
+def reconcile_course_stats(db=None):
+    """Recompute course_stats from enrollments and remove stale documents
+
+    Increments that land while the $merge runs can be overwritten by the
+    recomputed totals; the next run repairs them.
+    """
+    db = resolve_db(db)
+    # BSON dates have millisecond precision
+    now = datetime.now()
+    started = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    db.enrollments.aggregate(reconcile_pipeline(started))
+    # Courses without enrollments left: not rewritten by the merge and not
+    # incremented since it started
+    stale = db[COLLECTION].delete_many({
+        "updatedAt": {"$lt": started},
+        "$or": [{"reconciledAt": {"$lt": started}}, {"reconciledAt": {"$exists": False}}]
+    })
+    return {
+        "courses": db[COLLECTION].count_documents({"reconciledAt": started}),
+        "removed": stale.deleted_count,
+    }
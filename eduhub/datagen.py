@@ -0,0 +1,356 @@
+"""Deterministic synthetic data generator for load testing
+
+Documents are produced by generators and written in fixed-size
+insert_many(ordered=False) batches, so memory stays flat however many users
+are requested. The ID space of every entity is cut into blocks of BLOCK_SIZE
+and each block gets its own Random seeded from (seed, kind, block). Output is
+therefore identical for the same seed and reference date no matter how many
+worker processes share the work; each worker owns a contiguous shard of
+blocks.
+
+Skew is modelled on production traffic:
+- course popularity is Zipf distributed (a few courses get most enrollments)
+- submissions per student follow a power law (Pareto)
+"""
+from datetime import datetime
+from datetime import timedelta
+import bisect
+import itertools
+from multiprocessing import get_context
+import random
+import time
+
+from . import approximate
+from . import course_stats
+from . import grades
+from . import rollups
+from . import snapshots
+from . import ids
+from .connection import get_settings, resolve_db
+from .ids import encode_int
+
+
+BLOCK_SIZE = 10_000
+# Per-student ID slots for enrollments and submissions
+MAX_ENROLLMENTS_PER_STUDENT = 1024
+MAX_SUBMISSIONS_PER_STUDENT = 4096
+
+first_names = ["Alice", "Bob", "Charlie", "Diana", "Eve", "Frank", "Grace", "Henry", "Iris", "Jack", "Kate", "Liam", "Mia", "Noah", "Olivia",
+               "John", "Sarah", "Michael", "Emily", "David", "Amara", "Chidi", "Ngozi", "Tunde", "Yusuf", "Zainab", "Kofi", "Lena", "Mateo", "Priya"]
+last_names = ["Anderson", "Baker", "Clark", "Edwards", "Fisher", "Garcia", "Harris", "Jackson", "King", "Lopez", "Miller", "Nelson", "Parker", "Quinn", "Roberts",
+              "Smith", "Johnson", "Brown", "Davis", "Wilson", "Okafor", "Adeyemi", "Mensah", "Nwosu", "Patel", "Rossi", "Schmidt", "Tanaka", "Silva", "Kim"]
+skills = ["Python", "JavaScript", "Data Analysis", "Machine Learning", "Web Design", "Marketing", "Cybersecurity",
+          "HTML", "CSS", "Excel", "Communication", "Problem Solving", "SQL", "Cloud", "Statistics"]
+base_categories = ["Programming", "Data Science", "Web Development", "Business", "Design", "Marketing", "Cybersecurity", "Personal Development"]
+title_adjectives = ["Complete", "Practical", "Modern", "Advanced", "Essential", "Hands-on", "Applied", "Intro to", "Mastering", "Professional"]
+title_topics = ["Python", "Data Science", "Machine Learning", "Web Development", "React", "Node.js", "SQL", "MongoDB", "Cloud Computing", "DevOps",
+                "Digital Marketing", "UI/UX Design", "Business Strategy", "Cybersecurity", "Statistics", "Productivity", "Java", "Go", "Rust", "Kubernetes",
+                "Excel", "Public Speaking", "Project Management", "Photography", "Finance", "Deep Learning", "Data Engineering", "Networking", "Linux", "Testing"]
+title_suffixes = ["Bootcamp", "Fundamentals", "Masterclass", "Essentials", "Workshop", "for Beginners", "in Practice", "Deep Dive", "Crash Course", "Projects"]
+tag_pool = ["online", "certificate", "practical", "beginner-friendly", "advanced", "hands-on", "popular", "new", "bestseller", "project-based",
+            "self-paced", "live", "career", "quick", "in-depth", "exam-prep", "interactive", "mentored", "free-preview", "updated"]
+levels = ["beginner", "intermediate", "advanced"]
+enrollment_statuses = ["active", "completed", "dropped"]
+enrollment_status_weights = [0.55, 0.3, 0.15]
+submission_statuses = ["submitted", "graded", "late"]
+
+
+def parse_count(text):
+    """Parse counts such as '5M', '50k', '1.5B' or '1200'"""
+    text = str(text).strip().replace("_", "").replace(",", "")
+    multipliers = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+    suffix = text[-1:].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(text)
+
+
+def synthetic_id(prefix, n):
+    """Deterministic ID for the n-th synthetic entity
+
+    Same width and alphabet as eduhub.ids, with a zero timestamp so synthetic
+    IDs can never collide with IDs minted by the live ID service.
+    """
+    return prefix + encode_int(n)
+
+
+class SyntheticDataset:
+    """Sizes and distributions of one synthetic dataset"""
+
+    def __init__(self, users, courses, enrollments_per_student=3.0, lessons_per_course=8, assignments_per_course=4,
+                 submissions_per_student=5.0, instructor_ratio=0.02, categories=len(base_categories),
+                 zipf_s=1.1, pareto_alpha=1.5, seed=42, as_of=None):
+        self.users = users
+        self.courses = courses
+        self.instructors = max(1, int(users * instructor_ratio))
+        self.students = users - self.instructors
+        self.enrollments_per_student = enrollments_per_student
+        self.lessons_per_course = lessons_per_course
+        self.assignments_per_course = assignments_per_course
+        self.submissions_per_student = submissions_per_student
+        self.categories = categories
+        self.zipf_s = zipf_s
+        self.pareto_alpha = pareto_alpha
+        self.seed = seed
+        as_of = as_of or datetime.now()
+        self.as_of = datetime(as_of.year, as_of.month, as_of.day)
+        self._popularity = None
+
+    def rng(self, kind, block):
+        """Random instance owning one block of one entity kind"""
+        return random.Random(f"{self.seed}:{kind}:{block}")
+
+    def category(self, i):
+        if i < len(base_categories):
+            return base_categories[i]
+        return f"{base_categories[i % len(base_categories)]} {i // len(base_categories)}"
+
+    def course_popularity(self):
+        """(cumulative Zipf weights, rank -> course index) for course sampling"""
+        if self._popularity is None:
+            cum_weights = list(itertools.accumulate(1.0 / (rank ** self.zipf_s) for rank in range(1, self.courses + 1)))
+            # Shuffle so popular courses are not simply the lowest IDs
+            ranking = list(range(self.courses))
+            random.Random(f"{self.seed}:popularity").shuffle(ranking)
+            self._popularity = (cum_weights, ranking)
+        return self._popularity
+
+    def pick_courses(self, rng, k):
+        cum_weights, ranking = self.course_popularity()
+        total = cum_weights[-1]
+        picked = set()
+        # Popular courses repeat a lot, so bound the attempts to stay distinct
+        for _ in range(k * 4):
+            if len(picked) == k:
+                break
+            picked.add(ranking[bisect.bisect_left(cum_weights, rng.random() * total)])
+        return picked
+
+    # Document generators; each yields the documents of users/courses [start, end)
+
+    def iter_users(self, start, end):
+        for i, rng in self._iter_indexed("users", start, end, self.users):
+            first, last = rng.choice(first_names), rng.choice(last_names)
+            role = "instructor" if i < self.instructors else "student"
+            yield {
+                "userId": synthetic_id("USER_", i),
+                "email": f"{first.lower()}.{last.lower()}.{i}@{'eduhub.com' if role == 'instructor' else 'student.com'}",
+                "firstName": first,
+                "lastName": last,
+                "role": role,
+                "dateJoined": self.as_of - timedelta(days=rng.randint(1, 3 * 365)),
+                "profile": {
+                    "bio": f"{first} {last}, {role} at EduHub",
+                    "avatar": f"{role}_{i}.jpg",
+                    "skills": rng.sample(skills, 3)
+                },
+                "isActive": rng.random() > 0.05
+            }
+
+    def iter_courses(self, start, end):
+        for i, rng in self._iter_indexed("courses", start, end, self.courses):
+            level = rng.choice(levels)
+            topic = rng.choice(title_topics)
+            yield {
+                "courseId": synthetic_id("COURSE_", i),
+                "title": f"{rng.choice(title_adjectives)} {topic} {rng.choice(title_suffixes)}",
+                "description": f"Learn {topic} at the {level} level",
+                "instructorId": synthetic_id("USER_", rng.randrange(self.instructors)),
+                "category": self.category(rng.randrange(self.categories)),
+                "level": level,
+                "duration": rng.randint(5, 80),
+                "price": rng.randint(0, 200),
+                "tags": rng.sample(tag_pool, rng.randint(2, 5)),
+                "createdAt": self.as_of - timedelta(days=rng.randint(30, 3 * 365)),
+                "updatedAt": self.as_of - timedelta(days=rng.randint(0, 30)),
+                "isPublished": rng.random() < 0.85
+            }
+
+    def iter_lessons(self, start, end):
+        for i, rng in self._iter_indexed("lessons", start, end, self.courses):
+            course_id = synthetic_id("COURSE_", i)
+            for order in range(1, self.lessons_per_course + 1):
+                yield {
+                    "lessonId": synthetic_id("LESSON_", i * self.lessons_per_course + order - 1),
+                    "courseId": course_id,
+                    "title": f"Lesson {order}",
+                    "content": f"Content for lesson {order} of {course_id}",
+                    "videoUrl": f"https://video.eduhub.com/{course_id}/lesson{order}",
+                    "duration": rng.randint(5, 60),
+                    "order": order,
+                    "createdAt": self.as_of - timedelta(days=rng.randint(1, 365))
+                }
+
+    def iter_assignments(self, start, end):
+        for i, rng in self._iter_indexed("assignments", start, end, self.courses):
+            course_id = synthetic_id("COURSE_", i)
+            for j in range(self.assignments_per_course):
+                yield {
+                    "assignmentId": synthetic_id("ASSIGN_", i * self.assignments_per_course + j),
+                    "courseId": course_id,
+                    "title": f"Assignment {j + 1}",
+                    "description": f"Assignment {j + 1} for {course_id}",
+                    "dueDate": self.as_of + timedelta(days=rng.randint(-180, 60)),
+                    "maxPoints": rng.choice([50, 100]),
+                    "createdAt": self.as_of - timedelta(days=rng.randint(60, 365))
+                }
+
+    def iter_enrollments(self, start, end):
+        """Enrollments of the students among users [start, end)"""
+        mean = self.enrollments_per_student
+        if mean <= 0:
+            return
+        for i, rng in self._iter_indexed("enrollments", max(start, self.instructors), end, self.users):
+            count = min(self.courses, MAX_ENROLLMENTS_PER_STUDENT, max(1, int(rng.expovariate(1.0 / mean) + 0.5)))
+            for n, course in enumerate(sorted(self.pick_courses(rng, count))):
+                status = rng.choices(enrollment_statuses, enrollment_status_weights)[0]
+                enrolled_at = self.as_of - timedelta(days=rng.randint(1, 2 * 365), seconds=rng.randint(0, 86399))
+                progress = 100 if status == "completed" else rng.randint(0, 99)
+                yield {
+                    "enrollmentId": synthetic_id("ENROLL_", i * MAX_ENROLLMENTS_PER_STUDENT + n),
+                    "studentId": synthetic_id("USER_", i),
+                    "courseId": synthetic_id("COURSE_", course),
+                    "enrollmentDate": enrolled_at,
+                    "progress": progress,
+                    "completionDate": enrolled_at + timedelta(days=rng.randint(7, 120)) if status == "completed" else None,
+                    "status": status
+                }
+
+    def iter_submissions(self, start, end):
+        """Power-law distributed submissions of the students among users [start, end)"""
+        alpha = self.pareto_alpha
+        # Scale the Pareto draw so its mean matches submissions_per_student
+        scale = self.submissions_per_student * (alpha - 1) / alpha if alpha > 1 else self.submissions_per_student
+        cap = min(MAX_SUBMISSIONS_PER_STUDENT, int(self.submissions_per_student * 50) + 1)
+        for i, rng in self._iter_indexed("submissions", max(start, self.instructors), end, self.users):
+            count = min(cap, int(rng.paretovariate(alpha) * scale))
+            student_id = synthetic_id("USER_", i)
+            for n in range(count):
+                # Submissions follow course popularity too
+                course = next(iter(self.pick_courses(rng, 1)))
+                assignment = course * self.assignments_per_course + rng.randrange(self.assignments_per_course)
+                graded = rng.random() < 0.7
+                yield {
+                    "submissionId": synthetic_id("SUBMIT_", i * MAX_SUBMISSIONS_PER_STUDENT + n),
+                    "assignmentId": synthetic_id("ASSIGN_", assignment),
+                    "studentId": student_id,
+                    "content": f"Submission {n + 1} by {student_id}",
+                    "submittedAt": self.as_of - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86399)),
+                    "grade": round(min(100.0, max(0.0, rng.gauss(75, 12))), 1) if graded else None,
+                    "feedback": "Reviewed" if graded else None,
+                    "status": "graded" if graded else rng.choice(["submitted", "late"])
+                }
+
+    def _iter_indexed(self, kind, start, end, limit):
+        """Yield (index, rng) for indexes [start, min(end, limit)), one rng per block
+
+        Shards are block aligned (see shard_ranges), so every block is always
+        walked from the same first index by a single worker.
+        """
+        end = min(end, limit)
+        if start >= end:
+            return
+        for block in range(start // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1):
+            rng = self.rng(kind, block)
+            block_start = block * BLOCK_SIZE
+            for i in range(max(start, block_start), min(end, block_start + BLOCK_SIZE)):
+                yield i, rng
+
+
+def shard_ranges(total, workers):
+    """Split [0, total) into contiguous, block aligned ranges, one per worker"""
+    blocks = (total + BLOCK_SIZE - 1) // BLOCK_SIZE
+    per_worker = (blocks + workers - 1) // workers
+    ranges = []
+    for w in range(workers):
+        start = min(total, w * per_worker * BLOCK_SIZE)
+        end = min(total, (w + 1) * per_worker * BLOCK_SIZE)
+        if start < end:
+            ranges.append((start, end))
+    return ranges
+
+
+def insert_batches(collection, documents, batch_size=5000):
+    """Insert documents from an iterable in unordered batches; return the count"""
+    inserted = 0
+    documents = iter(documents)
+    while True:
+        batch = list(itertools.islice(documents, batch_size))
+        if not batch:
+            return inserted
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+
+def _run_shard(task, db=None):
+    """Worker entry point: write one shard of one dataset"""
+    dataset, user_range, course_range, batch_size, db_name, settings, id_node = task
+    if db is None:
+        # A spawned worker starts from a fresh interpreter: take over the
+        # parent's connection settings and use an ID node of its own
+        from .connection import configure, get_db
+
+        configure(**settings)
+        ids.set_generator(ids.IdGenerator(node=id_node))
+        db = get_db(db_name)
+    counts = {}
+    plan = [
+        ("users", dataset.iter_users, user_range),
+        ("courses", dataset.iter_courses, course_range),
+        ("lessons", dataset.iter_lessons, course_range),
+        ("assignments", dataset.iter_assignments, course_range),
+        ("enrollments", dataset.iter_enrollments, user_range),
+        ("submissions", dataset.iter_submissions, user_range),
+    ]
+    for name, iterator, (start, end) in plan:
+        counts[name] = insert_batches(db[name], iterator(start, end), batch_size)
+    return counts
+
+
+def generate(dataset, db=None, workers=1, batch_size=5000, drop=False, verbose=True):
+    """Write the dataset, optionally across several processes; return counts by collection"""
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    if drop:
+        for name in ["users", "courses", "lessons", "assignments", "enrollments", "submissions",
+                     course_stats.COLLECTION, rollups.COLLECTION, approximate.COLLECTION,
+                     grades.BUCKETS_COLLECTION, grades.COURSE_GRADES_COLLECTION]:
+            db[name].drop()
+
+    user_shards = shard_ranges(dataset.users, workers)
+    course_shards = shard_ranges(dataset.courses, workers)
+    settings = get_settings()
+    nodes = random.SystemRandom().sample(range(ids.MAX_NODE + 1), max(len(user_shards), len(course_shards)))
+    tasks = []
+    for w, node in enumerate(nodes):
+        user_range = user_shards[w] if w < len(user_shards) else (0, 0)
+        course_range = course_shards[w] if w < len(course_shards) else (0, 0)
+        tasks.append((dataset, user_range, course_range, batch_size, db.name, settings, node))
+
+    log(f"Generating {dataset.users:,} users and {dataset.courses:,} courses on {len(tasks)} worker(s)...")
+    start = time.perf_counter()
+    if len(tasks) == 1:
+        results = [_run_shard(tasks[0], db)]
+    else:
+        with get_context("spawn").Pool(len(tasks)) as pool:
+            results = pool.map(_run_shard, tasks)
+    elapsed = time.perf_counter() - start
+
+    totals = {}
+    for counts in results:
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+    for name, count in totals.items():
+        log(f" Inserted {count:,} {name}")
+    total = sum(totals.values())
+    log(f" {total:,} documents in {elapsed:.1f}s ({total / elapsed:,.0f} docs/sec)")
+
+    course_stats.reconcile_course_stats(db)
+    rollups.backfill(db=db)
+    approximate.rebuild(db)
+    grades.rebuild(db)
+    log(" Rebuilt course_stats, enrollment_rollups, sketches and grade histograms")
+    if snapshots.enabled():
+        snapshots.backfill(db)
+        log(" Embedded course snapshots in enrollments")
+    return totals
@@ -0,0 +1,219 @@
+"""Streaming export of analytics results to Parquet, CSV or Arrow files
+
+The aggregation cursor is read batch by batch. Each batch is turned
+straight into an Arrow RecordBatch, with the values gathered into one list
+per column, so no DataFrame is built. The batch is appended to the output
+file before the next one is read, so memory stays bounded by batch_size
+however many rows there are. Requires pyarrow (pip install pyarrow).
+
+    stats = export("student_performance", "student_performance.parquet")
+    print(stats["rows"], stats["rows_per_sec"], stats["peak_rss_mb"])
+
+or from the shell:
+
+    python -m eduhub export student_performance out/student_performance.parquet
+"""
+import os
+import time
+
+from . import analytics
+from .connection import resolve_db
+
+
+class ExportSpec:
+    """A named export: the pipeline to run and the columns it produces
+
+    columns are (name, type, source field) with type one of "string",
+    "int64", "float64", "bool" or "timestamp"; the source field may be a
+    dotted path.
+    """
+
+    def __init__(self, name, collection, build, columns):
+        self.name = name
+        self.collection = collection
+        self.build = build
+        self.columns = columns
+
+
+EXPORTS = {spec.name: spec for spec in [
+    ExportSpec("student_performance", "submissions", analytics.student_performance_pipeline, [
+        ("studentId", "string", "_id"),
+        ("studentName", "string", "studentName"),
+        ("totalSubmissions", "int64", "totalSubmissions"),
+        ("gradedSubmissions", "int64", "gradedSubmissions"),
+        ("averageGrade", "float64", "averageGrade"),
+        ("completionRate", "float64", "completionRate"),
+    ]),
+    ExportSpec("instructor_analytics", "courses", analytics.instructor_analytics_pipeline, [
+        ("instructorId", "string", "_id"),
+        ("instructorName", "string", "instructorName"),
+        ("totalCourses", "int64", "totalCourses"),
+        ("publishedCourses", "int64", "publishedCourses"),
+        ("totalStudents", "int64", "totalStudents"),
+        ("potentialRevenue", "float64", "potentialRevenue"),
+    ]),
+    ExportSpec("engagement_metrics", "enrollments", analytics.engagement_metrics_pipeline, [
+        ("totalEnrollments", "int64", "totalEnrollments"),
+        ("activeRate", "float64", "activeRate"),
+        ("completionRate", "float64", "completionRate"),
+        ("dropRate", "float64", "dropRate"),
+        ("averageProgress", "float64", "averageProgress"),
+    ]),
+    ExportSpec("enrollment_stats", "enrollments", analytics.enrollment_stats_pipeline, [
+        ("courseId", "string", "_id"),
+        ("courseTitle", "string", "courseTitle"),
+        ("category", "string", "category"),
+        ("totalEnrollments", "int64", "totalEnrollments"),
+        ("activeEnrollments", "int64", "activeEnrollments"),
+        ("completedEnrollments", "int64", "completedEnrollments"),
+        ("averageProgress", "float64", "averageProgress"),
+    ]),
+    ExportSpec("completion_by_course", "enrollments", analytics.completion_by_course_pipeline, [
+        ("courseId", "string", "_id"),
+        ("courseTitle", "string", "courseTitle"),
+        ("completionRate", "float64", "completionRate"),
+    ]),
+    # Row-level enrollments, for BI tools that aggregate themselves
+    ExportSpec("enrollments", "enrollments", lambda: [{"$project": {"_id": 0}}], [
+        ("enrollmentId", "string", "enrollmentId"),
+        ("studentId", "string", "studentId"),
+        ("courseId", "string", "courseId"),
+        ("enrollmentDate", "timestamp", "enrollmentDate"),
+        ("progress", "float64", "progress"),
+        ("status", "string", "status"),
+        ("completionDate", "timestamp", "completionDate"),
+    ]),
+]}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Exports need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def arrow_schema(columns):
+    pa = _pyarrow()
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("ms"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind, _ in columns])
+
+
+def record_batch(documents, columns, schema):
+    """Build one RecordBatch from a list of documents, filling a list per column"""
+    pa = _pyarrow()
+    paths = [source.split(".") for _, _, source in columns]
+    values = [[] for _ in columns]
+    for document in documents:
+        for path, column in zip(paths, values):
+            value = document.get(path[0])
+            for part in path[1:]:
+                value = value.get(part) if isinstance(value, dict) else None
+            column.append(value)
+    arrays = []
+    for (_, kind, _), column, field in zip(columns, values, schema):
+        if kind == "string":
+            # ObjectIds and other non-string keys are written as text
+            column = [v if v is None or isinstance(v, str) else str(v) for v in column]
+        arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_batches(cursor, batch_size):
+    """Yield lists of up to batch_size documents from a cursor"""
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Sink:
+    """Incremental file writer for one of the supported formats"""
+
+    def __init__(self, path, schema, format, compression):
+        pa = _pyarrow()
+        self.format = format
+        if format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        elif format == "csv":
+            import pyarrow.csv as pacsv
+
+            self._writer = pacsv.CSVWriter(path, schema)
+        elif format == "arrow":
+            self._writer = pa.ipc.new_file(path, schema)
+        else:
+            raise ValueError(f"Unknown export format {format!r}; use parquet, csv or arrow")
+
+    def write(self, batch):
+        if self.format == "parquet":
+            # One row group per batch
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def format_for(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return {"pq": "parquet", "feather": "arrow", "ipc": "arrow"}.get(extension, extension)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def export(name, path, format=None, db=None, batch_size=50_000, compression="zstd", verbose=False):
+    """Stream one of EXPORTS into path; return rows, batches, timing and peak RSS"""
+    spec = EXPORTS[name]
+    log = print if verbose else (lambda *args, **kwargs: None)
+    db = resolve_db(db)
+    schema = arrow_schema(spec.columns)
+
+    rows = 0
+    batches = 0
+    start = time.perf_counter()
+    sink = _Sink(path, schema, format or format_for(path), compression)
+    cursor = None
+    try:
+        cursor = db[spec.collection].aggregate(spec.build(), allowDiskUse=True, batchSize=batch_size)
+        for documents in iter_batches(cursor, batch_size):
+            sink.write(record_batch(documents, spec.columns, schema))
+            rows += len(documents)
+            batches += 1
+            log(f" {name}: {rows:,} rows")
+    finally:
+        sink.close()
+        if cursor is not None:
+            cursor.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "export": name,
+        "path": path,
+        "rows": rows,
+        "batches": batches,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
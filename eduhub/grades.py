@@ -0,0 +1,375 @@
+"""Grade distributions, percentiles and student ranks (grade_buckets, course_grades)
+
+student_performance and top_students only average grades, after grouping
+every submission. Here the distributions are kept ready to read:
+
+- grade_buckets: the number of graded submissions per 1-point grade bucket
+  (100 holds 100 and above, 0 everything below 1), one document per
+  assignment and per course, and one per course over the students'
+  average grades in it:
+
+      {"_id": "assignment|ASSIGN_1", "scope": "assignment", "key": "ASSIGN_1",
+       "buckets": {"71": 12, "72": 40, ...}, "count": 512}
+
+- course_grades: each student's grade sum, count and average per course.
+
+A percentile or a rank adds up the buckets below the grade (at most 101
+numbers) and counts the rest within the grade's own bucket through an
+index: (assignmentId, grade) on submissions, (courseId, average) on
+course_grades. Only one bucket's index keys are walked, however many
+grades the assignment or course has.
+
+repository.grade_submission applies $inc deltas here in the same call as
+the write. rebuild() recomputes everything from submissions with $merge
+(MongoDB 4.4+), for bulk loads and drift:
+
+    python -m eduhub grades rebuild
+    python -m eduhub grades rank STUDENT_ID COURSE_ID
+"""
+from datetime import datetime
+import math
+
+from .connection import resolve_db
+
+
+BUCKETS_COLLECTION = "grade_buckets"
+COURSE_GRADES_COLLECTION = "course_grades"
+
+SCOPES = ["assignment", "course", "course_average"]
+BUCKETS = 101
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def bucket_of(grade):
+    """1-point bucket of a grade, 0 to 100"""
+    return min(BUCKETS - 1, max(0, math.floor(grade)))
+
+
+def bucket_id(scope, key):
+    return f"{scope}|{key}"
+
+
+def course_grade_id(course_id, student_id):
+    return f"{course_id}|{student_id}"
+
+
+def _bucket_range(bucket):
+    """Value range of a bucket, as a query on the grade field"""
+    if bucket == 0:
+        return {"$lt": 1}
+    if bucket == BUCKETS - 1:
+        return {"$gte": bucket}
+    return {"$gte": bucket, "$lt": bucket + 1}
+
+
+# Incremental maintenance
+
+def _bucket_delta(old, new):
+    """$inc moving one value from old to new (either may be None)"""
+    delta = {}
+    for value, sign in ((old, -1), (new, 1)):
+        if _is_number(value):
+            field = f"buckets.{bucket_of(value)}"
+            delta[field] = delta.get(field, 0) + sign
+            delta["count"] = delta.get("count", 0) + sign
+    return {field: value for field, value in delta.items() if value}
+
+
+def _apply(db, scope, key, delta, now):
+    if key is None or not delta:
+        return
+    db[BUCKETS_COLLECTION].update_one(
+        {"_id": bucket_id(scope, key)},
+        {"$inc": delta, "$set": {"updatedAt": now}, "$setOnInsert": {"scope": scope, "key": key}},
+        upsert=True
+    )
+
+
+def record_grade(submission, old_grade, new_grade, db=None):
+    """Move a submission from its old grade to its new one (either may be None, for ungraded)"""
+    from pymongo import ReturnDocument
+
+    db = resolve_db(db)
+    if old_grade == new_grade or not (_is_number(old_grade) or _is_number(new_grade)):
+        return
+    now = datetime.now()
+    assignment_id = submission.get("assignmentId")
+    delta = _bucket_delta(old_grade, new_grade)
+    _apply(db, "assignment", assignment_id, delta, now)
+    assignment = db.assignments.find_one({"assignmentId": assignment_id}, {"_id": 0, "courseId": 1})
+    course_id = (assignment or {}).get("courseId")
+    if course_id is None:
+        return
+    _apply(db, "course", course_id, delta, now)
+
+    student_id = submission.get("studentId")
+    added = (new_grade if _is_number(new_grade) else 0) - (old_grade if _is_number(old_grade) else 0)
+    counted = _is_number(new_grade) - _is_number(old_grade)
+    # One atomic read-modify-write; the average before it tells which bucket to leave
+    before = db[COURSE_GRADES_COLLECTION].find_one_and_update(
+        {"_id": course_grade_id(course_id, student_id)},
+        [
+            {"$set": {
+                "courseId": course_id,
+                "studentId": student_id,
+                "gradeSum": {"$add": [{"$ifNull": ["$gradeSum", 0]}, added]},
+                "gradeCount": {"$add": [{"$ifNull": ["$gradeCount", 0]}, counted]},
+                "updatedAt": now
+            }},
+            {"$set": {"average": {"$cond": [{"$gt": ["$gradeCount", 0]},
+                                            {"$divide": ["$gradeSum", "$gradeCount"]}, None]}}}
+        ],
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    ) or {}
+    grade_sum = before.get("gradeSum", 0) + added
+    grade_count = before.get("gradeCount", 0) + counted
+    # Same operations as the server, so the same float
+    average = grade_sum / grade_count if grade_count > 0 else None
+    _apply(db, "course_average", course_id, _bucket_delta(before.get("average"), average), now)
+
+
+# Rebuild
+
+def _bucket_expr(field):
+    return {"$toInt": {"$min": [BUCKETS - 1, {"$max": [0, {"$floor": field}]}]}}
+
+
+def _write_stages(scope, started):
+    """Shape {_id: {key, bucket}, n} rows into grade_buckets documents and $merge them"""
+    return [
+        {
+            "$group": {
+                "_id": "$_id.key",
+                "pairs": {"$push": {"k": {"$toString": "$_id.bucket"}, "v": "$n"}},
+                "count": {"$sum": "$n"}
+            }
+        },
+        {
+            "$project": {
+                "_id": {"$concat": [f"{scope}|", "$_id"]},
+                "scope": scope,
+                "key": "$_id",
+                "buckets": {"$arrayToObject": "$pairs"},
+                "count": 1,
+                "updatedAt": {"$literal": started},
+                "rebuiltAt": {"$literal": started}
+            }
+        },
+        {"$merge": {"into": BUCKETS_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+
+def _course_lookup(local_field):
+    return {
+        "$lookup": {
+            "from": "assignments",
+            "localField": local_field,
+            "foreignField": "assignmentId",
+            "pipeline": [{"$project": {"_id": 0, "courseId": 1}}],
+            "as": "assignment"
+        }
+    }
+
+
+def rebuild_pipelines(started):
+    """(source collection, pipeline) pairs, run in order, that rebuild both collections"""
+    graded = {"$match": {"grade": {"$type": "number"}, "assignmentId": {"$type": "string"}}}
+    return [
+        # 1. submissions -> assignment histograms
+        ("submissions", [
+            graded,
+            {"$group": {"_id": {"key": "$assignmentId", "bucket": _bucket_expr("$grade")}, "n": {"$sum": 1}}},
+        ] + _write_stages("assignment", started)),
+        # 2. assignment histograms -> course histograms, joining assignments once each
+        (BUCKETS_COLLECTION, [
+            {"$match": {"scope": "assignment", "rebuiltAt": started}},
+            _course_lookup("key"),
+            {"$unwind": "$assignment"},
+            {"$match": {"assignment.courseId": {"$type": "string"}}},
+            {"$project": {"course": "$assignment.courseId", "pairs": {"$objectToArray": "$buckets"}}},
+            {"$unwind": "$pairs"},
+            {"$group": {"_id": {"key": "$course", "bucket": "$pairs.k"}, "n": {"$sum": "$pairs.v"}}},
+        ] + _write_stages("course", started)),
+        # 3. submissions -> course_grades, joining assignments once per (assignment, student)
+        ("submissions", [
+            graded,
+            {
+                "$group": {
+                    "_id": {"assignmentId": "$assignmentId", "studentId": "$studentId"},
+                    "gradeSum": {"$sum": "$grade"},
+                    "gradeCount": {"$sum": 1}
+                }
+            },
+            _course_lookup("_id.assignmentId"),
+            {"$unwind": "$assignment"},
+            {"$match": {"assignment.courseId": {"$type": "string"}, "_id.studentId": {"$type": "string"}}},
+            {
+                "$group": {
+                    "_id": {"courseId": "$assignment.courseId", "studentId": "$_id.studentId"},
+                    "gradeSum": {"$sum": "$gradeSum"},
+                    "gradeCount": {"$sum": "$gradeCount"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": {"$concat": ["$_id.courseId", "|", "$_id.studentId"]},
+                    "courseId": "$_id.courseId",
+                    "studentId": "$_id.studentId",
+                    "gradeSum": 1,
+                    "gradeCount": 1,
+                    "average": {"$divide": ["$gradeSum", "$gradeCount"]},
+                    "updatedAt": {"$literal": started},
+                    "rebuiltAt": {"$literal": started}
+                }
+            },
+            {"$merge": {"into": COURSE_GRADES_COLLECTION, "on": "_id", "whenMatched": "replace",
+                        "whenNotMatched": "insert"}}
+        ]),
+        # 4. course_grades -> histograms of the students' averages per course
+        (COURSE_GRADES_COLLECTION, [
+            {"$match": {"average": {"$type": "number"}}},
+            {"$group": {"_id": {"key": "$courseId", "bucket": _bucket_expr("$average")}, "n": {"$sum": 1}}},
+        ] + _write_stages("course_average", started)),
+    ]
+
+
+def rebuild(db=None):
+    """Recompute grade_buckets and course_grades from submissions and remove stale documents
+
+    Grades recorded while it runs can be overwritten; the next run repairs them.
+    """
+    db = resolve_db(db)
+    # BSON dates have millisecond precision
+    now = datetime.now()
+    started = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    for collection, pipeline in rebuild_pipelines(started):
+        db[collection].aggregate(pipeline, allowDiskUse=True)
+    # Not rewritten by the rebuild and not updated since it started
+    stale = {
+        "updatedAt": {"$lt": started},
+        "$or": [{"rebuiltAt": {"$lt": started}}, {"rebuiltAt": {"$exists": False}}]
+    }
+    removed = sum(db[collection].delete_many(stale).deleted_count
+                  for collection in (BUCKETS_COLLECTION, COURSE_GRADES_COLLECTION))
+    return {
+        "histograms": db[BUCKETS_COLLECTION].count_documents({"rebuiltAt": started}),
+        "students": db[COURSE_GRADES_COLLECTION].count_documents({"rebuiltAt": started}),
+        "removed": removed,
+    }
+
+
+# Reads
+
+def _scope(assignment_id, course_id):
+    if (assignment_id is None) == (course_id is None):
+        raise ValueError("pass exactly one of assignment_id and course_id")
+    return ("assignment", assignment_id) if assignment_id is not None else ("course", course_id)
+
+
+def _source(db, scope, key):
+    """(collection, value field, filter) of the values one grade_buckets document counts"""
+    if scope == "assignment":
+        return db.submissions, "grade", {"assignmentId": key}
+    if scope == "course":
+        assignments = [doc["assignmentId"] for doc in db.assignments.find({"courseId": key}, {"_id": 0, "assignmentId": 1})]
+        return db.submissions, "grade", {"assignmentId": {"$in": assignments}}
+    return db[COURSE_GRADES_COLLECTION], "average", {"courseId": key}
+
+
+def _counts(doc):
+    buckets = (doc or {}).get("buckets") or {}
+    return [buckets.get(str(bucket), 0) for bucket in range(BUCKETS)]
+
+
+def _position(db, scope, key, doc, value):
+    """(values below value, values equal to it, all values) from the buckets and one bucket's index keys"""
+    counts = _counts(doc)
+    bucket = bucket_of(value)
+    collection, field, query = _source(db, scope, key)
+    lower = {"$gte": bucket} if bucket > 0 else {}
+    below = sum(counts[:bucket]) + collection.count_documents(dict(query, **{field: dict(lower, **{"$lt": value})}))
+    equal = collection.count_documents(dict(query, **{field: value}))
+    return below, equal, sum(counts)
+
+
+def _percentile_rank(below, equal, total):
+    # Mid-rank: ties count as half below
+    return round(100 * (below + equal / 2) / total, 2) if total else None
+
+
+def _value_at(db, scope, key, doc, rank):
+    """The rank-th smallest value (1-based), from the bucket holding it"""
+    counts = _counts(doc)
+    seen = 0
+    for bucket, count in enumerate(counts):
+        if seen + count >= rank:
+            collection, field, query = _source(db, scope, key)
+            found = next(iter(collection.find(dict(query, **{field: _bucket_range(bucket)}), {"_id": 0, field: 1})
+                              .sort(field, 1).skip(rank - seen - 1).limit(1)), None)
+            return found.get(field) if found else None
+        seen += count
+    return None
+
+
+def histogram(assignment_id=None, course_id=None, width=1, db=None):
+    """[{"grade": bucket start, "count"}] of the graded submissions of an assignment or a course
+
+    width groups the 1-point buckets, e.g. 10 for 0-9, 10-19, ... 100.
+    """
+    db = resolve_db(db)
+    doc = db[BUCKETS_COLLECTION].find_one({"_id": bucket_id(*_scope(assignment_id, course_id))})
+    counts = _counts(doc)
+    return [{"grade": start, "count": sum(counts[start:start + width])} for start in range(0, BUCKETS, width)]
+
+
+def percentiles(assignment_id=None, course_id=None, percentiles=PERCENTILES, db=None):
+    """{percentile: grade} (nearest rank) of the graded submissions of an assignment or a course"""
+    db = resolve_db(db)
+    scope, key = _scope(assignment_id, course_id)
+    doc = db[BUCKETS_COLLECTION].find_one({"_id": bucket_id(scope, key)})
+    total = sum(_counts(doc))
+    if not total:
+        return {}
+    return {p: _value_at(db, scope, key, doc, max(1, math.ceil(p / 100 * total))) for p in percentiles}
+
+
+def percentile_rank(grade, assignment_id=None, course_id=None, db=None):
+    """Where a grade stands among the graded submissions of an assignment or a course
+
+    Returns {"grade", "below", "equal", "count", "percentile"}; percentile
+    is the share below, counting ties as half.
+    """
+    db = resolve_db(db)
+    scope, key = _scope(assignment_id, course_id)
+    doc = db[BUCKETS_COLLECTION].find_one({"_id": bucket_id(scope, key)})
+    below, equal, total = _position(db, scope, key, doc, grade)
+    return {"grade": grade, "below": below, "equal": equal, "count": total,
+            "percentile": _percentile_rank(below, equal, total)}
+
+
+def student_rank(student_id, course_id, db=None):
+    """A student's average grade in a course and its rank among the course's students (1 = best)
+
+    None when the student has no graded submission in the course.
+    """
+    db = resolve_db(db)
+    grades = db[COURSE_GRADES_COLLECTION].find_one({"_id": course_grade_id(course_id, student_id)})
+    if grades is None or not _is_number(grades.get("average")):
+        return None
+    doc = db[BUCKETS_COLLECTION].find_one({"_id": bucket_id("course_average", course_id)})
+    below, equal, total = _position(db, "course_average", course_id, doc, grades["average"])
+    return {
+        "studentId": student_id,
+        "courseId": course_id,
+        "averageGrade": round(grades["average"], 2),
+        "gradedSubmissions": grades["gradeCount"],
+        # Students with a higher average, plus one; ties share a rank
+        "rank": total - below - equal + 1,
+        "students": total,
+        "percentile": _percentile_rank(below, equal, total),
+    }
@@ -0,0 +1,88 @@
+"""In-process change notifications
+
+The repository write paths emit an event after every write that changes a
+reference document. Caches and derived data register handlers here instead
+of being called directly by the write code.
+
+Events and their payloads:
+- "course_changed": course_id (None if unknown: drop everything)
+- "user_changed": user_id (None if unknown: drop everything)
+- "enrollment_changed": course_id, delta (+1 inserted, -1 deleted; course_id
+  None if unknown: recount everything), enrollment (the inserted or deleted
+  document, None if unknown)
+- "enrollment_updated": before, after (the enrollment around a progress or
+  status update; before None if unknown)
+- "submission_graded": submission_id, grade
+- "change": collection, change (raw change stream event, see eduhub.changes)
+- "resync": collections (changes may have been missed; rebuild derived data)
+
+Every event also carries source: REPOSITORY when the repository write paths
+emit it in-process, CHANGE_STREAM when an eduhub.changes consumer does. With
+both running, one write arrives twice, so handlers that count (rather than
+invalidate) must pick a source. Change stream events also carry change_id,
+the _id of the change event, which is the same when an event is replayed.
+EventFilter picks one source and drops those replays.
+"""
+from collections import OrderedDict
+import threading
+
+
+REPOSITORY = "repository"
+CHANGE_STREAM = "change_stream"
+# Change event ids remembered by EventFilter to skip replays
+REPLAY_WINDOW = 10_000
+
+_handlers = {}
+_lock = threading.Lock()
+
+
+def register(event, handler):
+    """Call handler(**payload) every time event is emitted"""
+    with _lock:
+        _handlers.setdefault(event, []).append(handler)
+    return handler
+
+
+def unregister(event, handler):
+    with _lock:
+        handlers = _handlers.get(event, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+
+def emit(event, **payload):
+    """Call every handler of event; a failing handler does not stop the others"""
+    errors = []
+    for handler in list(_handlers.get(event, ())):
+        try:
+            handler(**payload)
+        except Exception as e:
+            errors.append((handler, e))
+    return errors
+
+
+class EventFilter:
+    """Accept the events of one source, and each change event only once"""
+
+    def __init__(self, source=REPOSITORY, window=REPLAY_WINDOW):
+        self.source = source
+        self.window = window
+        self.skipped = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def accept(self, source=None, change_id=None):
+        """Whether an event comes from the followed source and was not accepted already"""
+        if (source or REPOSITORY) != self.source:
+            return False
+        if change_id is None:
+            return True
+        key = change_id.get("_data") if isinstance(change_id, dict) else change_id
+        with self._lock:
+            if key in self._seen:
+                self.skipped += 1
+                return False
+            self._seen[key] = True
+            if len(self._seen) > self.window:
+                self._seen.popitem(last=False)
+        return True
@@ -0,0 +1,184 @@
+"""Collision-free, time-sortable business IDs (userId, courseId, ...)
+
+IDs are 128-bit integers laid out like a ULID, but with a per-process
+sequence instead of fresh randomness in every ID:
+
+    | 48-bit unix ms timestamp | 40-bit node | 40-bit sequence |
+
+The node is chosen once per process (random, or EDUHUB_ID_NODE for a fixed
+Snowflake-style worker id). A random or EDUHUB_ID_NODE node is re-chosen at
+random after fork(): children inherit the node (and the environment) of
+their parent, so keeping it would give every forked worker the same one. A
+node passed to IdGenerator explicitly is kept; workers that need fixed
+nodes install their own generator with set_generator() after forking.
+Within a process the (timestamp, sequence) pair strictly increases, so IDs
+never repeat and sort in creation order; across processes they differ in
+the node bits. IDs are rendered as 26 Crockford base32 characters after a
+prefix, e.g. "USER_01JAF3Q8K2M4ZC7N1X0000002A".
+
+The generator is pluggable: anything with next_id() and next_ids(n) can be
+installed with set_generator().
+"""
+import os
+import threading
+import time
+
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+TIMESTAMP_BITS = 48
+NODE_BITS = 40
+SEQUENCE_BITS = 40
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# 10-bit chunk -> 2 base32 characters, used to encode the sequence quickly
+_PAIRS = [CROCKFORD[i >> 5] + CROCKFORD[i & 31] for i in range(1024)]
+
+
+def encode_int(value, length=26):
+    """Encode a non-negative integer as fixed-width Crockford base32"""
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    if value:
+        raise ValueError("value does not fit in the requested length")
+    return "".join(reversed(chars))
+
+
+def decode_id(text):
+    """Decode the base32 part of an ID (prefix allowed) back into an integer"""
+    body = text.rsplit("_", 1)[-1]
+    value = 0
+    for char in body.upper():
+        value = (value << 5) | CROCKFORD.index(char)
+    return value
+
+
+def id_timestamp_ms(text):
+    """Return the unix millisecond timestamp embedded in an ID"""
+    return decode_id(text) >> (NODE_BITS + SEQUENCE_BITS)
+
+
+def _random_node():
+    return int.from_bytes(os.urandom(5), "big")
+
+
+class IdGenerator:
+    """Thread-safe generator of monotonic 128-bit IDs"""
+
+    def __init__(self, node=None, clock=None):
+        # Only an explicit node survives fork()
+        self._explicit_node = node is not None
+        if node is None and os.environ.get("EDUHUB_ID_NODE") and not _forked:
+            node = int(os.environ["EDUHUB_ID_NODE"])
+        if node is not None and not 0 <= node <= MAX_NODE:
+            raise ValueError(f"node must be between 0 and {MAX_NODE}")
+        self._fixed_node = node
+        self._clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.node = self._fixed_node if self._fixed_node is not None else _random_node()
+        self._last_ms = 0
+        self._next_seq = 0
+
+    def _reserve(self, n):
+        """Reserve n consecutive sequence numbers and return (ms, first_seq)"""
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        if n > MAX_SEQUENCE + 1:
+            raise ValueError(f"at most {MAX_SEQUENCE + 1} IDs can be reserved at once")
+        with self._lock:
+            now = self._clock()
+            # Only move forward: a clock that steps back keeps the last timestamp
+            if now > self._last_ms:
+                self._last_ms = now
+                self._next_seq = 0
+            if self._next_seq + n > MAX_SEQUENCE + 1:
+                # Sequence exhausted for this millisecond, borrow the next one
+                self._last_ms += 1
+                self._next_seq = 0
+            first = self._next_seq
+            self._next_seq += n
+            return self._last_ms, first
+
+    def _head(self, ms):
+        return (ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS)
+
+    def next_int(self):
+        """Return the next ID as an integer"""
+        ms, seq = self._reserve(1)
+        return self._head(ms) | seq
+
+    def next_ints(self, n):
+        """Return n consecutive IDs as a range of integers"""
+        ms, first = self._reserve(n)
+        head = self._head(ms)
+        return range(head | first, (head | first) + n)
+
+    def next_id(self, prefix=""):
+        """Return the next ID as a string"""
+        return prefix + encode_int(self.next_int())
+
+    def next_ids(self, n, prefix=""):
+        """Return a list of n IDs; costs one lock round-trip for the whole batch"""
+        ms, first = self._reserve(n)
+        # All IDs in the batch share timestamp and node, only the sequence varies
+        head = prefix + encode_int(self._head(ms) >> SEQUENCE_BITS, 18)
+        pairs = _PAIRS
+        return [
+            head + pairs[seq >> 30] + pairs[(seq >> 20) & 1023] + pairs[(seq >> 10) & 1023] + pairs[seq & 1023]
+            for seq in range(first, first + n)
+        ]
+
+
+_generator = None
+_generator_lock = threading.Lock()
+# Set in forked children, where EDUHUB_ID_NODE is the parent's
+_forked = False
+
+
+def get_generator():
+    """Return the process-wide ID generator, creating it on first use"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = IdGenerator()
+    return _generator
+
+
+def set_generator(generator):
+    """Install a custom generator (any object with next_id/next_ids)"""
+    global _generator
+    with _generator_lock:
+        _generator = generator
+
+
+def _after_fork():
+    global _generator_lock, _forked
+    _generator_lock = threading.Lock()
+    _forked = True
+    if isinstance(_generator, IdGenerator):
+        _generator._lock = threading.Lock()
+        # Siblings forked from one parent would share the inherited node
+        if not _generator._explicit_node:
+            _generator._fixed_node = None
+        _generator._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def new_id(prefix=""):
+    """Return one new ID with the given prefix"""
+    return get_generator().next_id(prefix)
+
+
+def new_ids(n, prefix=""):
+    """Return n new IDs with the given prefix"""
+    return get_generator().next_ids(n, prefix)
@@ -0,0 +1,304 @@
+"""Index advisor: compound indexes for the recorded query shapes, and indexes to drop
+
+advise() takes the shapes recorded by eduhub.query_shapes and the indexes
+that exist, and returns a plan:
+
+- create: one compound index per group of shapes not yet served, keyed
+  equality fields first, then the sort fields, then one range field
+  (equality-sort-range). The size is estimated from a $sample of the
+  collection.
+- drop: indexes $indexStats reports as never used since the server
+  started, and indexes whose keys are a prefix of another index on the
+  same collection. Drops are written with "apply": false.
+- notes: shapes an index cannot fully serve ($text, unanchored or
+  case-insensitive regexes, $or), and indexes none of the recorded shapes
+  use.
+
+The plan is plain JSON, so it can be reviewed and edited, with "apply"
+flipped on the actions to take, before it is applied:
+
+    python -m eduhub bench run --record-shapes shapes.json
+    python -m eduhub indexes advise shapes.json --out plan.json
+    python -m eduhub indexes apply plan.json
+"""
+from datetime import datetime
+import json
+
+from .connection import resolve_db
+from .query_shapes import load_shapes
+
+
+# Rough per-entry cost of a B-tree index entry beyond the key itself:
+# the RecordId and page/slot overhead, before WiredTiger prefix compression
+ENTRY_OVERHEAD_BYTES = 16
+SAMPLE_SIZE = 1000
+
+
+# Index matching
+
+def _keys(index):
+    return [(field, direction) for field, direction in index["key"].items()]
+
+
+def _is_plain(index):
+    """Not _id, unique, text, TTL, partial, sparse or collated: safe to drop in favour of another"""
+    return not (index.get("name") == "_id_" or index.get("unique") or index.get("sparse")
+                or "partialFilterExpression" in index or "expireAfterSeconds" in index
+                or "collation" in index or any(d == "text" for _, d in _keys(index)))
+
+
+def _sort_matches(keys, sort):
+    if len(keys) < len(sort):
+        return False
+    forward = all(k == s for k, s in zip(keys, sort))
+    backward = all(k[0] == s[0] and k[1] == -s[1] for k, s in zip(keys, sort))
+    return forward or backward
+
+
+def serves(keys, shape):
+    """"full" if an index on keys serves shape as ESR intends, "partial" if only a prefix of it, else None"""
+    if any(direction == "text" for _, direction in keys):
+        return "full" if shape.text else None
+    if not keys or not shape.fields():
+        return None
+    equality = set(shape.equality)
+    # Sort fields that are also equality fields are constant, so they need no index order
+    sort = [(field, direction) for field, direction in shape.sort if field not in equality]
+    leading = keys[:len(equality)]
+    if {field for field, _ in leading} != equality or any(d not in (1, -1) for _, d in leading):
+        return "partial" if keys[0][0] in equality or keys[0][0] in shape.range else None
+    rest = keys[len(equality):]
+    if sort:
+        if not _sort_matches(rest, sort):
+            return "partial" if equality else None
+        rest = rest[len(sort):]
+    if shape.range and (not rest or rest[0][0] not in shape.range):
+        return "partial" if equality or sort else None
+    return "full"
+
+
+def candidate_keys(shape, order=None):
+    """ESR compound key for shape; equality fields in the given order (most shared first)"""
+    if shape.text or not shape.fields():
+        return None
+    order = order or {}
+    equality = sorted(shape.equality, key=lambda field: (-order.get(field, 0), field))
+    sorted_fields = {field for field, _ in shape.sort}
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction) for field, direction in shape.sort if field not in shape.equality]
+    # One range field: the index can only scan a range on the first one
+    ranges = [field for field in shape.range if field not in sorted_fields]
+    if ranges:
+        keys.append((ranges[0], 1))
+    return keys
+
+
+# Size estimation
+
+def _get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [v.get(part) if isinstance(v, dict) else None for v in value]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def estimate_index_bytes(db, collection, keys, sample_size=SAMPLE_SIZE):
+    """Uncompressed size estimate of an index on keys, from a $sample of the collection"""
+    import bson
+
+    count = db[collection].estimated_document_count()
+    if not count:
+        return 0
+    projection = {field: 1 for field, _ in keys}
+    projection["_id"] = 1 if any(field == "_id" for field, _ in keys) else 0
+    sample = list(db[collection].aggregate([{"$sample": {"size": sample_size}}, {"$project": projection}]))
+    if not sample:
+        return 0
+    total = 0
+    for document in sample:
+        values = [_get_path(document, field) for field, _ in keys]
+        # A multikey index has one entry per array element
+        entries = max([len(v) for v in values if isinstance(v, list)] or [1])
+        key_bytes = len(bson.encode({str(i): value for i, value in enumerate(values)}))
+        total += entries * (key_bytes + ENTRY_OVERHEAD_BYTES)
+    return int(total / len(sample) * count)
+
+
+# Existing indexes
+
+def existing_indexes(db, collections):
+    """{collection: [index info with "ops" from $indexStats (None when unavailable)]}"""
+    from pymongo.errors import OperationFailure
+
+    result = {}
+    for collection in collections:
+        indexes = list(db[collection].list_indexes())
+        try:
+            stats = {row["name"]: row for row in db[collection].aggregate([{"$indexStats": {}}])}
+        except OperationFailure:
+            stats = {}
+        for index in indexes:
+            accesses = stats.get(index["name"], {}).get("accesses", {})
+            index["ops"] = accesses.get("ops")
+            index["since"] = accesses.get("since")
+        result[collection] = indexes
+    return result
+
+
+# Planning
+
+def advise(shapes, db=None, min_count=1, estimate_sizes=True):
+    """Plan of index creations and drops for {QueryShape: ShapeStats}"""
+    db = resolve_db(db)
+    shapes = {shape: stats for shape, stats in shapes.items() if stats.count >= min_count}
+    collections = sorted({shape.collection for shape in shapes})
+    indexes = existing_indexes(db, collections)
+
+    # Fields shared by the equality part of many shapes go first, so one
+    # index prefix serves several shapes
+    order = {}
+    for shape, stats in shapes.items():
+        for field in shape.equality:
+            order[field] = order.get(field, 0) + stats.count
+
+    proposals = []
+    notes = []
+    used = set()
+    for shape, stats in sorted(shapes.items(), key=lambda item: -item[1].total_ms):
+        served = [index for index in indexes[shape.collection] if serves(_keys(index), shape) == "full"]
+        for index in served:
+            used.add((shape.collection, index["name"]))
+        if served:
+            continue
+        for index in indexes[shape.collection]:
+            if serves(_keys(index), shape) == "partial":
+                used.add((shape.collection, index["name"]))
+        if shape.unindexed:
+            notes.append(f"{shape.describe()}: regexes that are unanchored or case-insensitive scan every key; "
+                         f"consider $text search")
+        keys = candidate_keys(shape, order)
+        if keys is None:
+            if shape.text:
+                notes.append(f"{shape.describe()}: needs a text index on the searched fields")
+            continue
+        if shape.disjunction:
+            notes.append(f"{shape.describe()}: each $or branch needs its own index; only the common fields are proposed")
+        proposal = next((p for p in proposals
+                         if p["collection"] == shape.collection and serves(p["keys"], shape) == "full"), None)
+        if proposal is None:
+            # Extend a proposal whose keys are a prefix of these keys, so one index serves both
+            proposal = next((p for p in proposals
+                             if p["collection"] == shape.collection and keys[:len(p["keys"])] == p["keys"]), None)
+            if proposal is not None:
+                proposal["keys"] = keys
+            else:
+                proposal = {"collection": shape.collection, "keys": keys, "shapes": [], "count": 0, "total_ms": 0.0}
+                proposals.append(proposal)
+        proposal["shapes"].append(shape.describe())
+        proposal["count"] += stats.count
+        proposal["total_ms"] += stats.total_ms
+
+    actions = []
+    for proposal in proposals:
+        actions.append({
+            "action": "create",
+            "apply": True,
+            "collection": proposal["collection"],
+            "keys": [list(pair) for pair in proposal["keys"]],
+            "reason": f"serves {len(proposal['shapes'])} shape(s): {proposal['count']:,} queries, "
+                      f"{proposal['total_ms']:,.0f} ms in total",
+            "shapes": proposal["shapes"],
+            "estimatedBytes": estimate_index_bytes(db, proposal["collection"], proposal["keys"])
+            if estimate_sizes else None,
+        })
+
+    for collection, infos in indexes.items():
+        for index in infos:
+            keys = _keys(index)
+            longer = next((other for other in infos if other is not index and len(_keys(other)) > len(keys)
+                           and _keys(other)[:len(keys)] == keys), None)
+            if longer is not None and _is_plain(index):
+                actions.append(_drop(collection, index, f"redundant: its keys are a prefix of {longer['name']}"))
+            elif index.get("ops") == 0 and _is_plain(index):
+                actions.append(_drop(collection, index, f"unused: no operations since {index.get('since')}"))
+            elif (collection, index["name"]) not in used and _is_plain(index):
+                notes.append(f"{collection}.{index['name']}: used by none of the recorded shapes")
+
+    return {
+        "createdAt": datetime.now().isoformat(),
+        "database": db.name,
+        "shapes": len(shapes),
+        "actions": actions,
+        "notes": notes,
+    }
+
+
+def _drop(collection, index, reason):
+    return {
+        "action": "drop",
+        "apply": False,
+        "collection": collection,
+        "name": index["name"],
+        "keys": [list(pair) for pair in _keys(index)],
+        "reason": reason,
+    }
+
+
+def advise_from_file(path, db=None, min_count=1):
+    return advise(load_shapes(path), db, min_count)
+
+
+# Review and apply
+
+def save_plan(plan, path):
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=2, default=str)
+
+
+def load_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def format_plan(plan):
+    """The plan as readable lines"""
+    lines = [f" Index plan for {plan['database']} ({plan['shapes']} recorded shapes)"]
+    for action in plan["actions"]:
+        keys = ", ".join(f"{field} {direction}" for field, direction in action["keys"])
+        mark = "x" if action["apply"] else " "
+        size = action.get("estimatedBytes")
+        size = f"  ~{size / (1024 * 1024):,.1f} MB" if size else ""
+        lines.append(f" [{mark}] {action['action']} {action['collection']} ({keys}){size}")
+        lines.append(f"       {action['reason']}")
+        for shape in action.get("shapes", []):
+            lines.append(f"       - {shape}")
+    for note in plan["notes"]:
+        lines.append(f" note: {note}")
+    return "\n".join(lines)
+
+
+def apply_plan(plan, db=None, verbose=True):
+    """Run the actions marked "apply"; return the names of the indexes created and dropped"""
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    done = []
+    for action in plan["actions"]:
+        if not action.get("apply"):
+            continue
+        collection = db[action["collection"]]
+        if action["action"] == "create":
+            name = collection.create_index([tuple(pair) for pair in action["keys"]])
+            log(f" Created {action['collection']}.{name}")
+        elif action["action"] == "drop":
+            name = action["name"]
+            collection.drop_index(name)
+            log(f" Dropped {action['collection']}.{name}")
+        else:
+            raise ValueError(f"Unknown plan action {action['action']!r}")
+        done.append(name)
+    return done
@@ -0,0 +1,59 @@
+"""Index definitions for the EduHub collections (Task 5.1)"""
+from .connection import resolve_db
+from .schemas import COLLECTIONS
+
+
+ASCENDING = 1
+DESCENDING = -1
+
+# (collection, keys, options)
+INDEXES = [
+    # 1. User email lookup index
+    ("users", [("email", ASCENDING)], {"unique": True}),
+    # 2. Course search by title and category index
+    ("courses", [("title", "text"), ("category", ASCENDING)], {}),
+    # 3. Assignment queries by due date index
+    ("assignments", [("dueDate", ASCENDING)], {}),
+    # 4. Enrollment queries by student and course index
+    ("enrollments", [("studentId", ASCENDING), ("courseId", ASCENDING)], {}),
+    # Per-course enrollment reads and course snapshot refreshes
+    ("enrollments", [("courseId", ASCENDING)], {}),
+    # Additional performance indexes
+    ("courses", [("instructorId", ASCENDING)], {}),
+    ("lessons", [("courseId", ASCENDING), ("order", ASCENDING)], {}),
+    ("submissions", [("assignmentId", ASCENDING), ("studentId", ASCENDING)], {}),
+    # Grade percentiles and ranks within one bucket (eduhub.grades)
+    ("submissions", [("assignmentId", ASCENDING), ("grade", ASCENDING)], {}),
+    ("course_grades", [("courseId", ASCENDING), ("average", ASCENDING)], {}),
+    ("assignments", [("courseId", ASCENDING)], {}),
+    # Business keys are generated by eduhub.ids and must never repeat
+    ("users", [("userId", ASCENDING)], {"unique": True}),
+    ("courses", [("courseId", ASCENDING)], {"unique": True}),
+    ("enrollments", [("enrollmentId", ASCENDING)], {"unique": True}),
+    ("lessons", [("lessonId", ASCENDING)], {"unique": True}),
+    ("assignments", [("assignmentId", ASCENDING)], {"unique": True}),
+    ("submissions", [("submissionId", ASCENDING)], {"unique": True}),
+    # Keyset pagination sort keys (eduhub.pagination)
+    ("users", [("role", ASCENDING), ("isActive", ASCENDING), ("_id", ASCENDING)], {}),
+    ("users", [("dateJoined", DESCENDING), ("_id", DESCENDING)], {}),
+    ("courses", [("price", ASCENDING), ("_id", ASCENDING)], {}),
+    # Dashboard ranking over the course_stats summary collection
+    ("course_stats", [("totalEnrollments", DESCENDING)], {}),
+    # Rollup range reads, for one key and for every key of a dimension
+    ("enrollment_rollups", [("grain", ASCENDING), ("dimension", ASCENDING), ("key", ASCENDING), ("bucket", ASCENDING)], {}),
+    ("enrollment_rollups", [("grain", ASCENDING), ("dimension", ASCENDING), ("bucket", ASCENDING)], {}),
+    # Sketch reads, for one key and for every key of a dimension (eduhub.approximate)
+    ("sketches", [("name", ASCENDING), ("dimension", ASCENDING), ("key", ASCENDING)], {}),
+]
+
+
+def create_indexes(db=None):
+    """Create every index in INDEXES and return their names"""
+    db = resolve_db(db)
+    return [db[collection].create_index(keys, **options) for collection, keys, options in INDEXES]
+
+
+def list_indexes(db=None):
+    """Return {collection: [index info, ...]} for the EduHub collections"""
+    db = resolve_db(db)
+    return {name: list(db[name].list_indexes()) for name in COLLECTIONS}
@@ -0,0 +1,161 @@
+"""Instructor analytics that count enrollments instead of materializing them
+
+The Task 4.2 pipeline $push'ed every courseId per instructor and joined
+the enrollments of all of them, only to take the $size of that array.
+Here every course looks up just its enrollment count and the counts are
+summed per instructor, so nothing grows with the enrollments of a course
+or the courses of an instructor. The count comes from one of two sources:
+
+- "course_stats": the pre-aggregated totalEnrollments (eduhub.course_stats),
+  one indexed _id lookup per course. Only as fresh as course_stats; run
+  "python -m eduhub stats reconcile" if writes bypassed the repository.
+- "enrollments": a $count sub-pipeline over the courseId index per course.
+
+totalStudents counts enrollments, as before. distinct="approximate" adds
+distinctStudents, the students enrolled in any of an instructor's courses,
+from one covered scan of the (studentId, courseId) index into a
+HyperLogLog per instructor (eduhub.sketches; about 1.6% standard error at
+the default precision 12, 4 KB per instructor). distinct="exact" counts
+them on the server with two $group stages instead, which sorts every
+(instructor, student) pair.
+
+    instructor_analytics(source="course_stats", distinct="approximate")
+"""
+from . import partitioned
+from .connection import resolve_db
+from .sketches import HyperLogLog, hash64
+
+
+SOURCES = ("course_stats", "enrollments")
+DISTINCT_MODES = (None, "approximate", "exact")
+
+
+def course_count_lookup(source="course_stats"):
+    """$lookup adding "counts": [{"count": enrollments of the course}] to a course"""
+    if source == "course_stats":
+        return {
+            "$lookup": {
+                "from": "course_stats",
+                "localField": "courseId",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "count": "$totalEnrollments"}}],
+                "as": "counts"
+            }
+        }
+    if source == "enrollments":
+        return {
+            "$lookup": {
+                "from": "enrollments",
+                "localField": "courseId",
+                "foreignField": "courseId",
+                "pipeline": [{"$count": "count"}],
+                "as": "counts"
+            }
+        }
+    raise ValueError(f"Unknown source {source!r}; expected one of {SOURCES}")
+
+
+def instructor_analytics_pipeline(source="course_stats"):
+    return [
+        # Enrollment count of each course, never the enrollments themselves
+        course_count_lookup(source),
+        {
+            "$group": {
+                "_id": "$instructorId",
+                "totalCourses": {"$sum": 1},
+                "publishedCourses": {
+                    "$sum": {"$cond": ["$isPublished", 1, 0]}
+                },
+                "totalRevenue": {"$sum": "$price"},
+                "totalStudents": {"$sum": {"$sum": "$counts.count"}}
+            }
+        },
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "userId",
+                "pipeline": [{"$project": {"_id": 0, "firstName": 1, "lastName": 1}}],
+                "as": "instructor"
+            }
+        },
+        {"$unwind": "$instructor"},
+        {
+            "$project": {
+                "instructorName": {"$concat": ["$instructor.firstName", " ", "$instructor.lastName"]},
+                "totalCourses": 1,
+                "publishedCourses": 1,
+                "totalStudents": 1,
+                "potentialRevenue": "$totalRevenue"
+            }
+        },
+        {"$sort": {"totalStudents": -1}}
+    ]
+
+
+def distinct_students_pipeline():
+    """Exact distinct students per instructor, over enrollments"""
+    return [
+        {
+            "$lookup": {
+                "from": "courses",
+                "localField": "courseId",
+                "foreignField": "courseId",
+                "pipeline": [{"$project": {"_id": 0, "instructorId": 1}}],
+                "as": "course"
+            }
+        },
+        {"$unwind": "$course"},
+        {"$group": {"_id": {"instructorId": "$course.instructorId", "studentId": "$studentId"}}},
+        {"$group": {"_id": "$_id.instructorId", "distinctStudents": {"$sum": 1}}}
+    ]
+
+
+def distinct_student_sketches(db=None, precision=12, batch_size=10_000):
+    """{instructorId: HyperLogLog of the students enrolled in their courses}"""
+    db = resolve_db(db)
+    instructors = {course["courseId"]: course.get("instructorId")
+                   for course in db.courses.find({}, {"_id": 0, "courseId": 1, "instructorId": 1})}
+    sketches = {}
+    last_student, hashed = None, None
+    # Covered by the (studentId, courseId) index; in studentId order, so
+    # each student is hashed once however many courses they take
+    cursor = db.enrollments.find({}, {"_id": 0, "studentId": 1, "courseId": 1}, batch_size=batch_size)
+    for enrollment in cursor.hint([("studentId", 1), ("courseId", 1)]):
+        instructor = instructors.get(enrollment.get("courseId"))
+        if instructor is None:
+            continue
+        student = enrollment.get("studentId")
+        if student != last_student or hashed is None:
+            last_student, hashed = student, hash64(student)
+        sketch = sketches.get(instructor)
+        if sketch is None:
+            sketch = sketches[instructor] = HyperLogLog(precision)
+        sketch.add_hash(hashed)
+    return sketches
+
+
+def instructor_analytics(db=None, source="course_stats", distinct=None, precision=12, partitions=None):
+    """Course, publication, student and revenue totals per instructor, most enrollments first
+
+    distinct "approximate" or "exact" adds distinctStudents; partitions
+    splits the course scan with eduhub.partitioned.
+    """
+    if distinct not in DISTINCT_MODES:
+        raise ValueError(f"Unknown distinct mode {distinct!r}; expected one of {DISTINCT_MODES}")
+    db = resolve_db(db)
+    pipeline = instructor_analytics_pipeline(source)
+    if partitions:
+        rows = partitioned.run("courses", pipeline, db, partitions)
+    else:
+        rows = list(db.courses.aggregate(pipeline))
+    if distinct == "approximate":
+        counts = {instructor: len(sketch) for instructor, sketch in distinct_student_sketches(db, precision).items()}
+    elif distinct == "exact":
+        counts = {row["_id"]: row["distinctStudents"]
+                  for row in db.enrollments.aggregate(distinct_students_pipeline(), allowDiskUse=True)}
+    else:
+        return rows
+    for row in rows:
+        row["distinctStudents"] = counts.get(row["_id"], 0)
+    return rows
@@ -0,0 +1,308 @@
+"""Referential integrity checks that stream instead of shipping ID lists
+
+Task 2.2 pulled every user and course ID into Python and sent them back in
+a $nin, which breaks the 16MB BSON limit with millions of users and scans
+every document anyway. Here each reference in RELATIONS is checked as an
+anti-join, in bounded memory, one of two ways:
+
+- merge: the referencing collection is read sorted by the reference field
+  (through an index that starts with it) next to the referenced keys read
+  sorted through their unique index; a reference with no equal key is an
+  orphan. One pass over two indexed cursors, nothing held but the batches.
+- lookup: for a field without such an index, a $lookup against the unique
+  index of the referenced key keeps the documents that joined nothing
+  ({"joined": []}), run over _id ranges by worker threads. It uses the
+  let/$expr form, which any server with $lookup sub-pipelines (3.6+) runs.
+
+A reference holding an array resolves if any of its elements does, as in
+a localField $lookup; both methods check those one document at a time.
+
+method="auto" picks merge when the index exists. Orphans are reported as
+they are found and can be moved to the integrityQuarantine collection or
+deleted, in batches:
+
+    python -m eduhub integrity check
+    python -m eduhub integrity check --action quarantine --out orphans.jsonl
+
+Relations are checked parents first, so the enrollments, lessons and
+assignments of a course quarantined in the same run show up as orphans
+too. Quarantining or deleting enrollments bypasses course_stats and the
+rollups: run their reconcile/backfill afterwards.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import queue
+import threading
+
+from .connection import resolve_db
+
+
+# (collection, reference field, referenced collection, referenced key, filter on the referenced documents)
+RELATIONS = [
+    ("courses", "instructorId", "users", "userId", {"role": "instructor"}),
+    ("enrollments", "studentId", "users", "userId", {"role": "student"}),
+    ("enrollments", "courseId", "courses", "courseId", {}),
+    ("lessons", "courseId", "courses", "courseId", {}),
+    ("assignments", "courseId", "courses", "courseId", {}),
+    ("submissions", "assignmentId", "assignments", "assignmentId", {}),
+    ("submissions", "studentId", "users", "userId", {"role": "student"}),
+]
+
+QUARANTINE_COLLECTION = "integrityQuarantine"
+ACTIONS = ("quarantine", "delete")
+BATCH_SIZE = 1000
+SAMPLES_PER_CHUNK = 20
+PROGRESS_EVERY = 100_000
+
+
+def describe(relation):
+    collection, field, parent, key, parent_filter = relation
+    role = "".join(f" ({name}={value})" for name, value in parent_filter.items())
+    return f"{collection}.{field} -> {parent}.{key}{role}"
+
+
+def relations_for(collections=None):
+    """RELATIONS of the given referencing collections (all when None)"""
+    return [relation for relation in RELATIONS if collections is None or relation[0] in collections]
+
+
+# Sorted-merge anti-join
+
+# BSON sort order of the scalar types a reference can have; arrays and
+# embedded documents sort by their contents and are looked up one by one
+_TYPE_ORDER = [(type(None), 0), (bool, 8), (int, 1), (float, 1), (str, 2), (datetime, 9)]
+
+
+def _order(value):
+    for kind, rank in _TYPE_ORDER:
+        if isinstance(value, kind):
+            return (rank, value)
+    if type(value).__name__ == "ObjectId":
+        return (7, value)
+    return None
+
+
+def _resolves(db, relation, value):
+    """Whether a reference that cannot be merged (array, embedded document) has a match"""
+    _, _, parent, key, parent_filter = relation
+    match = {"$in": value} if isinstance(value, list) else value
+    return db[parent].find_one(dict(parent_filter, **{key: match}), {"_id": 1}) is not None
+
+
+def has_leading_index(db, collection, field):
+    """Whether an index of collection starts with field (a sorted read of it is a walk of the index)"""
+    return any(next(iter(index["key"]), None) == field for index in db[collection].list_indexes())
+
+
+def merge_orphans(relation, db=None, batch_size=BATCH_SIZE):
+    """(_id, value) of every document whose reference has no match, by a sorted merge"""
+    db = resolve_db(db)
+    collection, field, parent, key, parent_filter = relation
+    keys = (doc.get(key) for doc in db[parent].find(parent_filter, {"_id": 0, key: 1}, batch_size=batch_size)
+            .sort(key, 1))
+    current = None
+    for doc in db[collection].find({}, {field: 1}, batch_size=batch_size).sort(field, 1):
+        value = doc.get(field)
+        if value is None:
+            yield doc["_id"], value
+            continue
+        order = _order(value)
+        if order is None:
+            if not _resolves(db, relation, value):
+                yield doc["_id"], value
+            continue
+        while current is None or current < order:
+            try:
+                current = _order(next(keys))
+            except StopIteration:
+                current = (float("inf"),)
+        if current != order:
+            yield doc["_id"], value
+
+
+# Chunked $lookup anti-join
+
+def lookup_pipeline(relation, lower=None, upper=None):
+    collection, field, parent, key, parent_filter = relation
+    bounds = {}
+    if lower is not None:
+        bounds["$gte"] = lower
+    if upper is not None:
+        bounds["$lt"] = upper
+    return [
+        {"$match": {"_id": bounds}} if bounds else {"$match": {}},
+        {"$project": {field: 1}},
+        {"$lookup": {
+            "from": parent,
+            "let": {"reference": f"${field}"},
+            "pipeline": [
+                # $eq compares arrays as a whole: lookup_orphans re-checks those
+                {"$match": {"$expr": {"$eq": [f"${key}", "$$reference"]}}},
+                {"$match": parent_filter},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "joined"
+        }},
+        {"$match": {"joined": []}},
+        {"$project": {field: 1}}
+    ]
+
+
+def id_ranges(collection, chunks, db=None):
+    """[(lower, upper)] _id ranges splitting collection into about chunks parts, from a $sample"""
+    db = resolve_db(db)
+    if chunks <= 1:
+        return [(None, None)]
+    sample = db[collection].aggregate([{"$sample": {"size": chunks * SAMPLES_PER_CHUNK}}, {"$project": {"_id": 1}}])
+    ids = sorted({doc["_id"] for doc in sample})
+    step = max(len(ids) // chunks, 1)
+    bounds = ids[step::step][:chunks - 1]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def lookup_orphans(relation, db=None, workers=4, chunks=None, batch_size=BATCH_SIZE):
+    """(_id, value) of every document whose reference has no match, by $lookup over _id ranges in parallel"""
+    db = resolve_db(db)
+    field = relation[1]
+    ranges = id_ranges(relation[0], chunks or workers * 4, db)
+    # Bounded hand-off: workers block while the consumer is behind
+    found = queue.Queue(maxsize=batch_size)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Gives up once the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                found.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def scan(bounds):
+        for doc in db[relation[0]].aggregate(lookup_pipeline(relation, *bounds), batchSize=batch_size):
+            value = doc.get(field)
+            if isinstance(value, list) and _resolves(db, relation, value):
+                continue
+            if not put((doc["_id"], value)):
+                return
+
+    def run():
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in [pool.submit(scan, bounds) for bounds in ranges]:
+                    error = future.exception()
+                    if error is not None:
+                        put(error)
+        finally:
+            put(done)
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            item = found.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def find_orphans(relation, db=None, method="auto", workers=4, chunks=None, batch_size=BATCH_SIZE):
+    """(_id, value) of the orphans of one relation; method is merge, lookup or auto"""
+    db = resolve_db(db)
+    if method == "auto":
+        method = "merge" if has_leading_index(db, relation[0], relation[1]) else "lookup"
+    if method == "merge":
+        return merge_orphans(relation, db, batch_size)
+    if method == "lookup":
+        return lookup_orphans(relation, db, workers, chunks, batch_size)
+    raise ValueError(f"Unknown method {method!r}; expected auto, merge or lookup")
+
+
+# Quarantine and repair
+
+def _act(db, relation, orphans, action):
+    """Quarantine or delete a batch of orphans; return how many documents were removed"""
+    collection, field, parent, key, _ = relation
+    ids = [orphan["_id"] for orphan in orphans]
+    if action == "quarantine":
+        documents = {doc["_id"]: doc for doc in db[collection].find({"_id": {"$in": ids}})}
+        now = datetime.now()
+        rows = [{"collection": collection, "field": field, "value": orphan["value"],
+                 "references": f"{parent}.{key}", "document": documents[orphan["_id"]], "quarantinedAt": now}
+                for orphan in orphans if orphan["_id"] in documents]
+        if rows:
+            db[QUARANTINE_COLLECTION].insert_many(rows)
+        ids = [row["document"]["_id"] for row in rows]
+    return db[collection].delete_many({"_id": {"$in": ids}}).deleted_count
+
+
+def restore(collection=None, db=None):
+    """Put quarantined documents back (those of one collection, or all); return how many"""
+    db = resolve_db(db)
+    query = {} if collection is None else {"collection": collection}
+    restored = 0
+    batch = []
+    for row in db[QUARANTINE_COLLECTION].find(query).sort("_id", 1):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            restored += _restore_batch(db, batch)
+            batch = []
+    if batch:
+        restored += _restore_batch(db, batch)
+    return restored
+
+
+def _restore_batch(db, rows):
+    by_collection = {}
+    for row in rows:
+        by_collection.setdefault(row["collection"], []).append(row["document"])
+    for collection, documents in by_collection.items():
+        db[collection].insert_many(documents)
+    db[QUARANTINE_COLLECTION].delete_many({"_id": {"$in": [row["_id"] for row in rows]}})
+    return len(rows)
+
+
+# Running the checks
+
+def check(db=None, collections=None, action=None, method="auto", workers=4, chunks=None, batch_size=BATCH_SIZE,
+          on_orphan=None, verbose=True):
+    """Check every relation of collections; return {relation description: orphan count}
+
+    on_orphan(orphan) is called for every orphan as it is found, with
+    orphan = {"collection", "_id", "field", "value", "references"}.
+    action "quarantine" or "delete" removes the orphans in batches.
+    """
+    if action is not None and action not in ACTIONS:
+        raise ValueError(f"Unknown action {action!r}; expected one of {ACTIONS}")
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    counts = {}
+    for relation in relations_for(collections):
+        collection, field, parent, key, _ = relation
+        name = describe(relation)
+        count = removed = 0
+        batch = []
+        for _id, value in find_orphans(relation, db, method, workers, chunks, batch_size):
+            orphan = {"collection": collection, "_id": _id, "field": field, "value": value,
+                      "references": f"{parent}.{key}"}
+            count += 1
+            if on_orphan is not None:
+                on_orphan(orphan)
+            if action is not None:
+                batch.append(orphan)
+                if len(batch) >= batch_size:
+                    removed += _act(db, relation, batch, action)
+                    batch = []
+            if count % PROGRESS_EVERY == 0:
+                log(f"   {name}: {count:,} orphans so far")
+        if batch:
+            removed += _act(db, relation, batch, action)
+        counts[name] = count
+        log(f" {name}: {count:,} orphans" + (f", {removed:,} {action}d" if action else ""))
+    return counts
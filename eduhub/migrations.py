@@ -0,0 +1,390 @@
+"""Declarative collection, validator and index migrations
+
+SPEC describes the collections, validators and indexes the database should
+have. It is built from schemas.COLLECTION_VALIDATORS and indexes.INDEXES,
+so those stay the single source of truth. plan() compares it with
+listCollections and listIndexes and returns the steps that are missing.
+migrate() runs them one at a time and reports the progress of each index
+build:
+
+    python -m eduhub migrate plan                  # what would change
+    python -m eduhub migrate apply --rolling       # apply, pacing the builds
+    python -m eduhub migrate history
+
+Only differences are applied, so a rerun after a failure or on an
+up-to-date database is safe. Every run that changes something is recorded
+as a numbered version in the schemaMigrations collection, with the spec
+fingerprint and the steps it completed. A lock document there stops two
+runners from working at the same time.
+
+Steps that remove something are only planned on request. Indexes that are
+not in the spec are dropped with prune=True. An index whose options
+differ from the spec is rebuilt (dropped and created again) with
+allow_rebuild=True.
+
+Rolling mode paces the index builds for a replica set. Each build starts
+only inside the maintenance window, and only once every secondary is
+within max_lag seconds of the primary. Builds wait for commit_quorum
+members. A true member-by-member rolling build, taking each secondary out
+of the set in turn, has to be orchestrated outside the driver.
+"""
+from datetime import datetime
+from datetime import timedelta
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from . import approximate
+from . import course_stats
+from . import grades
+from . import rollups
+from .connection import resolve_db
+from .indexes import INDEXES
+from .schemas import COLLECTION_VALIDATORS
+
+
+MIGRATIONS_COLLECTION = "schemaMigrations"
+LOCK_ID = "lock"
+LOCK_TTL = timedelta(hours=6)
+
+# Validation defaults of MongoDB, used when the spec does not say
+DEFAULT_VALIDATION_LEVEL = "strict"
+DEFAULT_VALIDATION_ACTION = "error"
+
+# Index options compared with the live index. Others are build-time hints
+# (background) or are filled in by the server (text index weights and
+# language, collation defaults), so comparing them would report false changes
+INDEX_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "hidden")
+
+
+def _collection_spec(validator):
+    return {"validator": validator, "validationLevel": DEFAULT_VALIDATION_LEVEL,
+            "validationAction": DEFAULT_VALIDATION_ACTION}
+
+
+SPEC = {
+    "collections": dict(
+        {name: _collection_spec(validator) for name, validator in COLLECTION_VALIDATORS.items()},
+        **{course_stats.COLLECTION: _collection_spec(None), rollups.COLLECTION: _collection_spec(None),
+           approximate.COLLECTION: _collection_spec(None), grades.BUCKETS_COLLECTION: _collection_spec(None),
+           grades.COURSE_GRADES_COLLECTION: _collection_spec(None)}
+    ),
+    "indexes": INDEXES,
+}
+
+
+def index_name(keys, options=None):
+    """The name MongoDB gives an index on keys unless options name it"""
+    if options and options.get("name"):
+        return options["name"]
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def fingerprint(spec=SPEC):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+# Diff
+
+class Step:
+    """One change to make: create_collection, coll_mod, create_index or drop_index"""
+
+    def __init__(self, action, collection, name=None, keys=None, options=None, reason=""):
+        self.action = action
+        self.collection = collection
+        self.name = name
+        self.keys = keys
+        self.options = options or {}
+        self.reason = reason
+
+    def describe(self):
+        target = f"{self.collection}.{self.name}" if self.name else self.collection
+        return f"{self.action} {target}" + (f" ({self.reason})" if self.reason else "")
+
+    def to_dict(self):
+        return {"action": self.action, "collection": self.collection, "name": self.name,
+                "keys": [list(pair) for pair in self.keys] if self.keys else None, "reason": self.reason}
+
+    def __repr__(self):
+        return f"Step({self.describe()})"
+
+
+def _collection_steps(spec, live):
+    steps = []
+    for name, wanted in spec["collections"].items():
+        if name not in live:
+            steps.append(Step("create_collection", name, options=wanted, reason="missing"))
+            continue
+        options = live[name].get("options", {})
+        current = {
+            "validator": options.get("validator") or None,
+            "validationLevel": options.get("validationLevel", DEFAULT_VALIDATION_LEVEL),
+            "validationAction": options.get("validationAction", DEFAULT_VALIDATION_ACTION),
+        }
+        changed = [key for key in wanted if _canonical(wanted[key]) != _canonical(current[key])]
+        if changed:
+            steps.append(Step("coll_mod", name, options=wanted, reason=f"{', '.join(changed)} changed"))
+    return steps
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _live_keys(info):
+    """Key list of a listIndexes entry, with a text index's _fts/_ftsx put back as its text fields"""
+    keys = []
+    for field, direction in info["key"].items():
+        if field == "_fts":
+            keys.extend((text_field, "text") for text_field in sorted(info.get("weights", {})))
+        elif field != "_ftsx":
+            keys.append((field, direction))
+    return keys
+
+
+def _index_options(options):
+    return {key: options[key] for key in INDEX_OPTIONS if key in options}
+
+
+def _index_steps(spec, live_indexes, prune, allow_rebuild):
+    steps = []
+    wanted_names = set()
+    for collection, keys, options in spec["indexes"]:
+        keys = [(field, direction) for field, direction in keys]
+        name = index_name(keys, options)
+        wanted_names.add((collection, name))
+        live = live_indexes.get(collection, {})
+        same_keys = next((info for info in live.values() if _live_keys(info) == keys), None)
+        if same_keys is None:
+            if name in live:
+                # The name is taken by an index on other keys
+                if allow_rebuild:
+                    steps.append(Step("drop_index", collection, name, reason="name reused for new keys"))
+                    steps.append(Step("create_index", collection, name, keys, options, reason="keys changed"))
+                else:
+                    steps.append(Step("conflict", collection, name, keys, options,
+                                      reason="an index with this name has other keys; rerun with allow_rebuild"))
+            else:
+                steps.append(Step("create_index", collection, name, keys, options, reason="missing"))
+            continue
+        if _canonical(_index_options(same_keys)) != _canonical(_index_options(options)):
+            if allow_rebuild:
+                steps.append(Step("drop_index", collection, same_keys["name"], reason="options changed"))
+                steps.append(Step("create_index", collection, name, keys, options, reason="options changed"))
+            else:
+                steps.append(Step("conflict", collection, same_keys["name"], keys, options,
+                                  reason="options differ from the spec; rerun with allow_rebuild"))
+        wanted_names.add((collection, same_keys["name"]))
+    if prune:
+        for collection, live in live_indexes.items():
+            for name in live:
+                if name != "_id_" and (collection, name) not in wanted_names:
+                    steps.append(Step("drop_index", collection, name, reason="not in the spec"))
+    return steps
+
+
+def plan(db=None, spec=SPEC, prune=False, allow_rebuild=False):
+    """Steps that bring the database in line with spec, in the order they should run"""
+    db = resolve_db(db)
+    live = {info["name"]: info for info in db.list_collections()}
+    live_indexes = {}
+    for name in {collection for collection, _, _ in spec["indexes"]} | set(spec["collections"]):
+        if name in live:
+            live_indexes[name] = {info["name"]: info for info in db[name].list_indexes()}
+    # Collections and validators first, so indexes are built on collections that exist
+    return _collection_steps(spec, live) + _index_steps(spec, live_indexes, prune, allow_rebuild)
+
+
+# Pacing of index builds
+
+def in_window(window, now=None):
+    """True if now falls in window = (start "HH:MM", end "HH:MM"); windows may wrap midnight"""
+    if window is None:
+        return True
+    now = (now or datetime.now()).strftime("%H:%M")
+    start, end = window
+    return start <= now < end if start <= end else now >= start or now < end
+
+
+def replication_lag(db):
+    """Seconds the slowest secondary is behind the primary; None when not a replica set"""
+    from pymongo.errors import OperationFailure
+
+    try:
+        status = db.client.admin.command("replSetGetStatus")
+    except OperationFailure:
+        return None
+    members = status.get("members", [])
+    primary = next((m for m in members if m.get("stateStr") == "PRIMARY"), None)
+    secondaries = [m for m in members if m.get("stateStr") == "SECONDARY"]
+    if primary is None or not secondaries:
+        return 0.0
+    return max((primary["optimeDate"] - m["optimeDate"]).total_seconds() for m in secondaries)
+
+
+def _wait_until_ready(db, window, max_lag, poll, log):
+    announced = False
+    while True:
+        lag = replication_lag(db) if max_lag is not None else None
+        if in_window(window) and (lag is None or lag <= max_lag):
+            return
+        if not announced:
+            reason = "outside the maintenance window" if not in_window(window) else f"secondaries {lag:.0f}s behind"
+            log(f"   waiting: {reason}")
+            announced = True
+        time.sleep(poll)
+
+
+def _build_progress(db, collection):
+    """(done, total) of a running createIndexes on collection, if the server reports one"""
+    from pymongo.errors import OperationFailure
+
+    try:
+        operations = list(db.client.admin.aggregate([
+            {"$currentOp": {"allUsers": True}},
+            {"$match": {"ns": f"{db.name}.{collection}", "progress": {"$exists": True}}},
+        ]))
+    except OperationFailure:
+        return None
+    for operation in operations:
+        progress = operation["progress"]
+        return progress.get("done"), progress.get("total")
+    return None
+
+
+def _create_index(db, step, commit_quorum, poll, log):
+    options = dict(step.options)
+    options.setdefault("name", step.name)
+    if commit_quorum is not None:
+        options["commitQuorum"] = commit_quorum
+    error = []
+
+    def build():
+        try:
+            db[step.collection].create_index(step.keys, **options)
+        except Exception as e:
+            error.append(e)
+
+    # Built on a thread so the build can be watched from here
+    builder = threading.Thread(target=build, name=f"eduhub-index-{step.name}", daemon=True)
+    builder.start()
+    while builder.is_alive():
+        builder.join(poll)
+        progress = _build_progress(db, step.collection) if builder.is_alive() else None
+        if progress and progress[1]:
+            log(f"   {step.name}: {progress[0]:,} / {progress[1]:,} ({progress[0] / progress[1]:.0%})")
+    if error:
+        raise error[0]
+
+
+def _run_step(db, step, commit_quorum, poll, log):
+    if step.action == "create_collection":
+        options = {key: value for key, value in step.options.items() if value is not None}
+        db.create_collection(step.collection, **options)
+    elif step.action == "coll_mod":
+        # collMod needs an empty validator, not null, to remove validation
+        db.command("collMod", step.collection, validator=step.options["validator"] or {},
+                   validationLevel=step.options["validationLevel"],
+                   validationAction=step.options["validationAction"])
+    elif step.action == "create_index":
+        _create_index(db, step, commit_quorum, poll, log)
+    elif step.action == "drop_index":
+        db[step.collection].drop_index(step.name)
+    else:
+        raise ValueError(f"Cannot run step {step.describe()}")
+
+
+# Lock and history
+
+def _acquire_lock(db, owner):
+    from pymongo.errors import DuplicateKeyError
+
+    now = datetime.now()
+    collection = db[MIGRATIONS_COLLECTION]
+    # An expired lock (a crashed runner) is taken over
+    collection.delete_one({"_id": LOCK_ID, "expiresAt": {"$lt": now}})
+    try:
+        collection.insert_one({"_id": LOCK_ID, "owner": owner, "lockedAt": now, "expiresAt": now + LOCK_TTL})
+    except DuplicateKeyError:
+        holder = collection.find_one({"_id": LOCK_ID}) or {}
+        raise RuntimeError(f"Another migration is running ({holder.get('owner')} since {holder.get('lockedAt')})")
+
+
+def _release_lock(db, owner):
+    db[MIGRATIONS_COLLECTION].delete_one({"_id": LOCK_ID, "owner": owner})
+
+
+def history(db=None):
+    """Recorded migration versions, oldest first"""
+    return list(resolve_db(db)[MIGRATIONS_COLLECTION].find({"_id": {"$type": "number"}}).sort("_id", 1))
+
+
+def current_version(db=None):
+    applied = list(resolve_db(db)[MIGRATIONS_COLLECTION]
+                   .find({"_id": {"$type": "number"}, "status": "applied"}).sort("_id", -1).limit(1))
+    return applied[0] if applied else None
+
+
+# Running
+
+def _planned(db, spec, prune, allow_rebuild, log):
+    """plan(), logged; raises ValueError on conflicts"""
+    steps = plan(db, spec, prune, allow_rebuild)
+    conflicts = [step for step in steps if step.action == "conflict"]
+    for step in steps:
+        log(f" {'!' if step.action == 'conflict' else '-'} {step.describe()}")
+    if conflicts:
+        raise ValueError(f"{len(conflicts)} index conflict(s); see the plan")
+    if not steps:
+        log(f" Up to date (spec {fingerprint(spec)})")
+    return steps
+
+
+def migrate(db=None, spec=SPEC, prune=False, allow_rebuild=False, dry_run=False, rolling=False,
+            window=None, max_lag=10.0, commit_quorum=None, poll=5.0, verbose=True):
+    """Apply the steps of plan() one at a time; return the version document (None if nothing to do)
+
+    rolling=True waits for window and for replication lag <= max_lag
+    before every index build. Conflicting steps stop the run before
+    anything is changed.
+    """
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+    if dry_run:
+        _planned(db, spec, prune, allow_rebuild, log)
+        return None
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    _acquire_lock(db, owner)
+    collection = db[MIGRATIONS_COLLECTION]
+    try:
+        # Planned under the lock: a migration that held it may have changed everything
+        steps = _planned(db, spec, prune, allow_rebuild, log)
+        if not steps:
+            return None
+        last = next(iter(collection.find({"_id": {"$type": "number"}}).sort("_id", -1).limit(1)), None)
+        version = (last["_id"] if last else 0) + 1
+        collection.insert_one({"_id": version, "spec": fingerprint(spec), "status": "running",
+                               "startedAt": datetime.now(), "planned": [step.to_dict() for step in steps],
+                               "steps": []})
+        for number, step in enumerate(steps, 1):
+            if rolling and step.action == "create_index":
+                _wait_until_ready(db, window, max_lag, poll, log)
+            log(f" [{number}/{len(steps)}] {step.describe()}")
+            start = time.perf_counter()
+            try:
+                _run_step(db, step, commit_quorum if rolling else None, poll, log)
+            except Exception as e:
+                collection.update_one({"_id": version}, {"$set": {
+                    "status": "failed", "error": f"{step.describe()}: {e}", "finishedAt": datetime.now()}})
+                raise
+            seconds = time.perf_counter() - start
+            log(f"   done in {seconds:.1f}s")
+            collection.update_one({"_id": version}, {"$push": {"steps": dict(step.to_dict(), seconds=seconds)}})
+        collection.update_one({"_id": version}, {"$set": {"status": "applied", "finishedAt": datetime.now()}})
+        return collection.find_one({"_id": version})
+    finally:
+        _release_lock(db, owner)
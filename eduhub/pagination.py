@@ -0,0 +1,142 @@
+"""Keyset (range) pagination for listing queries
+
+skip/limit makes the server walk past every skipped document, so page N
+costs N pages. Keyset pagination remembers the sort key of the last row
+and asks for the rows after it, which an index on the sort keys answers
+directly: every page costs the same as the first.
+
+    page = paginate(db.courses, {"price": {"$gte": 50}}, [("price", 1)], limit=20)
+    for course in page:
+        ...
+    page = paginate(db.courses, {"price": {"$gte": 50}}, [("price", 1)], limit=20, token=page.next_token)
+
+_id is always added as the final sort key, so the order is total. Sort
+fields should be present on every document. Tokens are opaque strings;
+they are only valid for the same sort they were issued for.
+"""
+import base64
+import hashlib
+
+
+class Page:
+    """One page of results and the token for the next page (None on the last page)"""
+
+    def __init__(self, items, next_token):
+        self.items = items
+        self.next_token = next_token
+
+    @property
+    def has_more(self):
+        return self.next_token is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"Page({len(self.items)} items, has_more={self.has_more})"
+
+
+def normalize_sort(sort):
+    """[(field, 1 | -1), ...] with _id appended as the tiebreaker"""
+    sort = [(field, direction) for field, direction in sort]
+    if not any(field == "_id" for field, _ in sort):
+        sort.append(("_id", sort[-1][1] if sort else 1))
+    return sort
+
+
+def _sort_fingerprint(sort):
+    return hashlib.sha1(repr(sort).encode()).hexdigest()[:8]
+
+
+def encode_token(sort, values):
+    import bson
+
+    data = bson.encode({"s": _sort_fingerprint(sort), "v": list(values)})
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_token(token, sort):
+    """Return the last-row sort values encoded in token; ValueError if it does not fit sort"""
+    import bson
+
+    try:
+        data = bson.decode(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid page token")
+    if data.get("s") != _sort_fingerprint(sort) or len(data.get("v", [])) != len(sort):
+        raise ValueError("Page token was issued for a different sort")
+    return data["v"]
+
+
+def after_filter(sort, values):
+    """Filter matching the rows that come after values in the given sort order
+
+    For keys (a, b, _id) that is a > va, or a == va and b > vb, or
+    a == va and b == vb and _id > vid (with $lt for descending keys).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def _get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def paginate(collection, filter=None, sort=(("_id", 1),), limit=20, token=None, projection=None):
+    """Return one Page of collection.find(filter) in sort order
+
+    projection works as in find(); sort fields are fetched even when it
+    leaves them out (to build the next token) and removed again before the
+    rows are returned.
+    """
+    sort = normalize_sort(sort)
+    query = dict(filter or {})
+    if token is not None:
+        query = {"$and": [query, after_filter(sort, decode_token(token, sort))]}
+
+    added = []
+    if projection is not None:
+        projection = dict(projection)
+        inclusive = any(value for field, value in projection.items() if field != "_id")
+        for field, _ in sort:
+            if projection.get(field) == 0:
+                del projection[field]
+                added.append(field)
+            elif inclusive and field not in projection and field != "_id":
+                projection[field] = 1
+                added.append(field)
+
+    # One extra row tells whether there is a next page
+    rows = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+    next_token = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_token = encode_token(sort, [_get_path(rows[-1], field) for field, _ in sort])
+    for field in added:
+        if "." not in field:
+            for row in rows:
+                row.pop(field, None)
+    return Page(rows, next_token)
+
+
+def iter_pages(collection, filter=None, sort=(("_id", 1),), limit=1000, projection=None):
+    """Yield every Page of the query, one keyset query per page"""
+    token = None
+    while True:
+        page = paginate(collection, filter, sort, limit, token, projection)
+        yield page
+        if page.next_token is None:
+            return
+        token = page.next_token
@@ -0,0 +1,297 @@
+"""Partitioned aggregation: one heavy $group pipeline split over key ranges
+
+A pipeline like student_performance runs as one aggregation on a single
+server thread. run() splits its input into key ranges (split points from
+splitVector, or a $sample when that is not available), runs the stages up
+to the first $group on every range concurrently from a thread pool, and
+merges the partial groups in the client:
+
+    rows = partitioned.run("submissions", analytics.student_performance_pipeline(), partitions=8)
+
+Only accumulators whose partial states can be combined are split (see
+MERGEABLE): $sum and $count add up, $min/$max keep the extreme, $avg runs
+as a sum and a count of numeric values, $push concatenates and $addToSet
+unions in range order, and $first/$last come from the first/last range
+holding the group. Any other accumulator, a stage before the $group that
+depends on other documents ($sort, $limit, $group...), or a later stage
+that does ($group, $facet...) makes run() fall back to the plain pipeline.
+
+The stages after the $group that work document by document ($lookup,
+$unwind, $match, $project...) run on the merged groups through $documents
+(MongoDB 5.1+), a chunk at a time. A trailing $sort/$skip/$limit is applied
+in the client.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .connection import resolve_db
+
+
+# Accumulators whose partial results can be merged; the value is how
+MERGEABLE = {
+    "$sum": "add",
+    "$count": "add",
+    "$min": "min",
+    "$max": "max",
+    "$avg": "average",
+    "$push": "concat",
+    "$addToSet": "union",
+    "$first": "first",
+    "$last": "last",
+}
+
+# Stages that only look at the document in front of them
+DOCUMENT_STAGES = {"$match", "$project", "$addFields", "$set", "$unset", "$unwind", "$lookup",
+                   "$replaceRoot", "$replaceWith", "$redact"}
+FINAL_STAGES = {"$sort", "$skip", "$limit"}
+
+DOCUMENTS_BATCH = 5000
+SAMPLES_PER_PARTITION = 20
+SUM_SUFFIX = "__partialSum"
+COUNT_SUFFIX = "__partialCount"
+
+
+class NotPartitionable(ValueError):
+    """The pipeline cannot be split; the message says why"""
+
+
+# Planning
+
+def _accumulator(spec):
+    if not isinstance(spec, dict) or len(spec) != 1:
+        return None, None
+    return next(iter(spec.items()))
+
+
+def split_pipeline(pipeline):
+    """(stages before the $group, the $group, per-document stages after, final $sort/$skip/$limit)"""
+    index = next((i for i, stage in enumerate(pipeline) if "$group" in stage), None)
+    if index is None:
+        raise NotPartitionable("no $group stage")
+    before, group, after = pipeline[:index], pipeline[index]["$group"], pipeline[index + 1:]
+    for stage in before:
+        name = next(iter(stage))
+        if name not in DOCUMENT_STAGES:
+            raise NotPartitionable(f"{name} before the $group depends on other documents")
+    for field, spec in group.items():
+        if field == "_id":
+            continue
+        operator, _ = _accumulator(spec)
+        if operator not in MERGEABLE:
+            raise NotPartitionable(f"{field}: {operator or spec!r} cannot be merged across partitions")
+    final_at = len(after)
+    while final_at and next(iter(after[final_at - 1])) in FINAL_STAGES:
+        final_at -= 1
+    per_document, final = after[:final_at], after[final_at:]
+    for stage in per_document:
+        name = next(iter(stage))
+        if name not in DOCUMENT_STAGES:
+            raise NotPartitionable(f"{name} after the $group depends on other documents")
+    return before, group, per_document, final
+
+
+def partial_group(group):
+    """The $group each partition runs: $avg as a sum and a count of numbers, $count as a $sum"""
+    partial = {}
+    for field, spec in group.items():
+        operator, argument = _accumulator(spec) if field != "_id" else (None, None)
+        if operator == "$avg":
+            partial[field + SUM_SUFFIX] = {"$sum": argument}
+            partial[field + COUNT_SUFFIX] = {"$sum": {"$cond": [{"$isNumber": argument}, 1, 0]}}
+        elif operator == "$count":
+            partial[field] = {"$sum": 1}
+        else:
+            partial[field] = spec
+    return partial
+
+
+# Key ranges
+
+def _range_match(key, lower, upper):
+    # The first range takes everything not >= its upper bound, so documents
+    # with a missing key, or a key of another type, still land in one range
+    if lower is None and upper is None:
+        return {}
+    if lower is None:
+        return {key: {"$not": {"$gte": upper}}}
+    if upper is None:
+        return {key: {"$gte": lower}}
+    return {key: {"$gte": lower, "$lt": upper}}
+
+
+def _evenly(values, partitions):
+    """Up to partitions - 1 evenly spaced values of a list, as increasing split points"""
+    if len({type(value) for value in values}) > 1:
+        # Mixed key types have no single order to split on
+        return []
+    values = sorted(set(values))
+    if len(values) < partitions:
+        return values
+    step = (len(values) + 1) / partitions
+    return sorted({values[int(step * i) - 1] for i in range(1, partitions)})
+
+
+def split_points(collection, partitions, key="_id", db=None):
+    """Up to partitions - 1 increasing values of key splitting collection into even parts"""
+    from pymongo.errors import OperationFailure
+
+    db = resolve_db(db)
+    if partitions <= 1:
+        return []
+    try:
+        # splitVector walks the index on key and cuts it by data size
+        size = db.command("collStats", collection).get("size", 0)
+        result = db.command("splitVector", f"{db.name}.{collection}", keyPattern={key: 1},
+                            maxChunkSizeBytes=max(int(size / partitions / 2), 1))
+        points = [point[key] for point in result.get("splitKeys", [])]
+    except OperationFailure:
+        # No index on key, or not allowed (mongos, missing privileges): sample instead
+        sample = db[collection].aggregate([{"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+                                           {"$project": {"_id": 0, "key": "$" + key}}])
+        points = [doc["key"] for doc in sample if doc.get("key") is not None]
+    return _evenly(points, partitions)
+
+
+def ranges(points):
+    return list(zip([None] + points, points + [None]))
+
+
+# Merging partial groups
+
+_TYPE_ORDER = [(type(None), 0), (bool, 8), (int, 1), (float, 1), (str, 2), (dict, 3), (list, 4),
+               (bytes, 5), (datetime, 9)]
+
+
+def _bson_order(value):
+    """Sort key following the BSON comparison order of the common types"""
+    for kind, rank in _TYPE_ORDER:
+        if isinstance(value, kind):
+            if kind is dict:
+                return (rank, [(k, _bson_order(v)) for k, v in value.items()])
+            if kind is list:
+                return (rank, [_bson_order(v) for v in value])
+            return (rank, value)
+    return (7 if type(value).__name__ == "ObjectId" else 6, value)
+
+
+def _freeze(value):
+    """Hashable stand-in for a group _id"""
+    if isinstance(value, dict):
+        return ("d",) + tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return ("l",) + tuple(_freeze(v) for v in value)
+    return value
+
+
+def _merge_value(how, left, right):
+    if how == "add":
+        return left + right
+    if how in ("min", "max"):
+        # $min/$max ignore null and missing values
+        if left is None:
+            return right
+        if right is None:
+            return left
+        pick = min if how == "min" else max
+        return pick(left, right, key=_bson_order)
+    if how == "concat":
+        return left + right
+    if how == "union":
+        seen = {_freeze(value) for value in left}
+        return left + [value for value in right if _freeze(value) not in seen]
+    if how == "first":
+        return left
+    return right
+
+
+def merge_groups(group, partials):
+    """Merge per-partition results of partial_group(group), in partition order, into final groups"""
+    plan = {}
+    for field, spec in group.items():
+        if field != "_id":
+            plan[field] = MERGEABLE[_accumulator(spec)[0]]
+    merged = {}
+    for rows in partials:
+        for row in rows:
+            key = _freeze(row["_id"])
+            state = merged.get(key)
+            if state is None:
+                merged[key] = dict(row)
+                continue
+            for field, how in plan.items():
+                if how == "average":
+                    for suffix in (SUM_SUFFIX, COUNT_SUFFIX):
+                        state[field + suffix] += row[field + suffix]
+                else:
+                    state[field] = _merge_value(how, state.get(field), row.get(field))
+    results = []
+    for state in merged.values():
+        for field, how in plan.items():
+            if how == "average":
+                total, count = state.pop(field + SUM_SUFFIX), state.pop(field + COUNT_SUFFIX)
+                state[field] = total / count if count else None
+        results.append(state)
+    return results
+
+
+# Finishing
+
+def _get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def apply_final(rows, stages):
+    """$sort, $skip and $limit stages on a list of documents"""
+    for stage in stages:
+        if "$sort" in stage:
+            # Stable sorts from the last key to the first give the compound order
+            for field, direction in reversed(list(stage["$sort"].items())):
+                rows.sort(key=lambda row: _bson_order(_get_path(row, field)), reverse=direction == -1)
+        elif "$skip" in stage:
+            rows = rows[stage["$skip"]:]
+        elif "$limit" in stage:
+            rows = rows[:stage["$limit"]]
+    return rows
+
+
+def _run_documents(db, rows, stages, batch_size):
+    if not stages:
+        return rows
+    results = []
+    for start in range(0, len(rows), batch_size):
+        results.extend(db.aggregate([{"$documents": rows[start:start + batch_size]}] + stages))
+    return results
+
+
+def run(collection, pipeline, db=None, partitions=4, workers=None, key="_id", fallback=True,
+        batch_size=DOCUMENTS_BATCH):
+    """Run pipeline over collection split into key ranges; same results as aggregate()
+
+    With fallback=False a pipeline that cannot be split raises NotPartitionable
+    instead of running whole.
+    """
+    db = resolve_db(db)
+    try:
+        before, group, per_document, final = split_pipeline(pipeline)
+    except NotPartitionable:
+        if not fallback:
+            raise
+        return list(db[collection].aggregate(pipeline, allowDiskUse=True))
+    points = split_points(collection, partitions, key, db)
+    partial = before + [{"$group": partial_group(group)}]
+
+    def scan(bounds):
+        match = _range_match(key, *bounds)
+        stages = ([{"$match": match}] if match else []) + partial
+        return list(db[collection].aggregate(stages, allowDiskUse=True))
+
+    key_ranges = ranges(points)
+    with ThreadPoolExecutor(max_workers=workers or len(key_ranges)) as pool:
+        partials = list(pool.map(scan, key_ranges))
+    rows = merge_groups(group, partials)
+    return apply_final(_run_documents(db, rows, per_document, batch_size), final)
@@ -0,0 +1,283 @@
+"""Query-shape recorder: which filters and sorts actually run, how often and how slowly
+
+QueryShapeRecorder is a pymongo command listener. Attached to the shared
+client, it sees every find, aggregate, count, distinct, update, delete and
+findAndModify that the repository, analytics and benchmark code sends. Each
+one is reduced to a shape: the collection, the equality, range and sort
+fields, and whether it is a $text search, an $or or an unanchored regex.
+Values are dropped, so {"studentId": "USER_1", "status": "active"} and
+{"studentId": "USER_2", "status": "dropped"} are the same shape. Per shape
+it keeps a count and the total and maximum latency:
+
+    recorder = QueryShapeRecorder().install()   # before the first get_db()
+    ...                                         # run the workload
+    recorder.save("shapes.json")
+
+The saved shapes are the input of eduhub.index_advisor. For aggregations
+only the leading $match (and a $sort straight after it) is recorded: that
+is the part an index can serve.
+"""
+import json
+import threading
+
+
+RECORDED_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Operators matched with an index range scan; $eq and $in are equality.
+# $exists, $type and $size are left out: they are guards an ordinary index
+# does not narrow down
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$mod"}
+EQUALITY_OPERATORS = {"$eq", "$in", "$all", "$elemMatch"}
+
+
+class QueryShape:
+    """Normalized filter/sort of one query, without the values"""
+
+    def __init__(self, collection, equality=(), range=(), sort=(), text=False, disjunction=False, unindexed=()):
+        self.collection = collection
+        self.equality = tuple(sorted(set(equality)))
+        # A field compared both ways ({"a": 1, "a": {"$gt": ...}}) only counts as equality
+        self.range = tuple(sorted(set(range) - set(self.equality)))
+        self.sort = tuple((field, direction) for field, direction in sort)
+        self.text = text
+        self.disjunction = disjunction
+        # Fields matched by an unanchored or case-insensitive regex: a full scan either way
+        self.unindexed = tuple(sorted(set(unindexed)))
+
+    def key(self):
+        return (self.collection, self.equality, self.range, self.sort, self.text, self.disjunction, self.unindexed)
+
+    def fields(self):
+        return set(self.equality) | set(self.range) | {field for field, _ in self.sort}
+
+    def describe(self):
+        parts = [f"eq({', '.join(self.equality)})" if self.equality else None,
+                 f"sort({', '.join(f'{f} {d}' for f, d in self.sort)})" if self.sort else None,
+                 f"range({', '.join(self.range)})" if self.range else None,
+                 "$text" if self.text else None,
+                 "$or" if self.disjunction else None,
+                 f"regex({', '.join(self.unindexed)})" if self.unindexed else None]
+        return f"{self.collection}: {' '.join(p for p in parts if p) or 'collection scan'}"
+
+    def to_dict(self):
+        return {"collection": self.collection, "equality": list(self.equality), "range": list(self.range),
+                "sort": [list(pair) for pair in self.sort], "text": self.text, "disjunction": self.disjunction,
+                "unindexed": list(self.unindexed)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["collection"], data["equality"], data["range"], [tuple(pair) for pair in data["sort"]],
+                   data.get("text", False), data.get("disjunction", False), data.get("unindexed", ()))
+
+    def __eq__(self, other):
+        return isinstance(other, QueryShape) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"QueryShape({self.describe()})"
+
+
+def _regex_indexable(pattern, options):
+    # Only a case-sensitive prefix match turns into an index range
+    return isinstance(pattern, str) and pattern.startswith("^") and "i" not in (options or "")
+
+
+def _classify(filter, equality, range, flags):
+    for field, condition in (filter or {}).items():
+        if field in ("$and", "$nor"):
+            for clause in condition:
+                _classify(clause, equality, range, flags)
+        elif field == "$or":
+            flags["disjunction"] = True
+            # Every branch has to be indexed for the $or to use indexes; the
+            # fields common to all branches are what one index can serve
+            branches = []
+            for clause in condition:
+                branch_equality, branch_range = [], []
+                _classify(clause, branch_equality, branch_range, flags)
+                branches.append((set(branch_equality), set(branch_range)))
+            if branches:
+                equality.extend(set.intersection(*[eq for eq, _ in branches]))
+                range.extend(set.intersection(*[rng for _, rng in branches]))
+        elif field == "$text":
+            flags["text"] = True
+        elif field.startswith("$"):
+            # $expr, $where, $jsonSchema, $comment: not served by an index
+            continue
+        elif hasattr(condition, "pattern") or (isinstance(condition, dict) and "$regex" in condition):
+            if isinstance(condition, dict):
+                pattern, options = condition["$regex"], condition.get("$options")
+                pattern, options = getattr(pattern, "pattern", pattern), options or getattr(pattern, "flags", "")
+            else:
+                pattern, options = condition.pattern, getattr(condition, "flags", "")
+            if isinstance(options, int):
+                options = "i" if options & 2 else ""
+            if _regex_indexable(pattern, options):
+                range.append(field)
+            else:
+                flags["unindexed"].append(field)
+        elif isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            operators = set(condition) - {"$options", "$not"}
+            if operators & RANGE_OPERATORS or "$not" in condition:
+                range.append(field)
+            elif operators & EQUALITY_OPERATORS:
+                equality.append(field)
+        else:
+            equality.append(field)
+
+
+def shape_of(collection, filter=None, sort=None):
+    """QueryShape of a find-style filter and sort"""
+    equality, range, flags = [], [], {"text": False, "disjunction": False, "unindexed": []}
+    _classify(filter, equality, range, flags)
+    sort = list(sort.items()) if isinstance(sort, dict) else list(sort or [])
+    # {"$meta": "textScore"} sorts are not index sorts
+    sort = [(field, direction) for field, direction in sort if direction in (1, -1)]
+    return QueryShape(collection, equality, range, sort, flags["text"], flags["disjunction"], flags["unindexed"])
+
+
+def pipeline_shape(collection, pipeline):
+    """QueryShape of the leading $match/$sort of a pipeline, None if it starts with neither"""
+    match, sort = {}, None
+    for stage in pipeline:
+        if "$match" in stage and sort is None:
+            match = {"$and": [match, stage["$match"]]} if match else stage["$match"]
+        elif "$sort" in stage and sort is None:
+            sort = stage["$sort"]
+        else:
+            break
+    if not match and sort is None:
+        return None
+    return shape_of(collection, match, sort)
+
+
+def command_shapes(command_name, command):
+    """QueryShapes of one database command document"""
+    collection = command.get(command_name)
+    if not isinstance(collection, str) or collection.startswith("system."):
+        return []
+    if command_name == "find":
+        return [shape_of(collection, command.get("filter"), command.get("sort"))]
+    if command_name == "aggregate":
+        shape = pipeline_shape(collection, command.get("pipeline", []))
+        return [shape] if shape else []
+    if command_name in ("count", "distinct"):
+        return [shape_of(collection, command.get("query"))]
+    if command_name == "findAndModify":
+        return [shape_of(collection, command.get("query"), command.get("sort"))]
+    if command_name == "update":
+        return [shape_of(collection, statement.get("q")) for statement in command.get("updates", [])]
+    if command_name == "delete":
+        return [shape_of(collection, statement.get("q")) for statement in command.get("deletes", [])]
+    return []
+
+
+class ShapeStats:
+    """Count and latency of one shape"""
+
+    def __init__(self, count=0, total_ms=0.0, max_ms=0.0):
+        self.count = count
+        self.total_ms = total_ms
+        self.max_ms = max_ms
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+try:
+    from pymongo.monitoring import CommandListener as _CommandListener
+except ImportError:
+    _CommandListener = object
+
+
+class QueryShapeRecorder(_CommandListener):
+    """Command listener aggregating the commands it sees by QueryShape"""
+
+    def __init__(self, max_pending=10_000):
+        self.shapes = {}
+        self._pending = {}
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+
+    # Attaching
+
+    def install(self):
+        """Attach to the shared client (eduhub.connection); returns self"""
+        from .connection import add_event_listener
+
+        add_event_listener(self)
+        return self
+
+    def uninstall(self):
+        from .connection import remove_event_listener
+
+        remove_event_listener(self)
+
+    # CommandListener interface
+
+    def started(self, event):
+        if event.command_name not in RECORDED_COMMANDS:
+            return
+        shapes = command_shapes(event.command_name, event.command)
+        if not shapes:
+            return
+        # Listeners are called from every thread using the client
+        with self._lock:
+            if len(self._pending) < self._max_pending:
+                self._pending[(event.connection_id, event.request_id)] = shapes
+
+    def succeeded(self, event):
+        with self._lock:
+            shapes = self._pending.pop((event.connection_id, event.request_id), None)
+        if shapes:
+            self.record(shapes, event.duration_micros / 1000.0)
+
+    def failed(self, event):
+        with self._lock:
+            self._pending.pop((event.connection_id, event.request_id), None)
+
+    # Recording
+
+    def record(self, shapes, ms):
+        with self._lock:
+            for shape in shapes:
+                stats = self.shapes.get(shape)
+                if stats is None:
+                    stats = self.shapes[shape] = ShapeStats()
+                stats.add(ms)
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+
+    def report(self):
+        """[(shape, stats)] with the most total time first"""
+        with self._lock:
+            return sorted(self.shapes.items(), key=lambda item: -item[1].total_ms)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump([dict(shape.to_dict(), count=stats.count, total_ms=stats.total_ms, max_ms=stats.max_ms)
+                       for shape, stats in self.report()], f, indent=2)
+
+
+def load_shapes(path):
+    """{QueryShape: ShapeStats} from a file written by QueryShapeRecorder.save()"""
+    with open(path) as f:
+        rows = json.load(f)
+    shapes = {}
+    for row in rows:
+        shape = QueryShape.from_dict(row)
+        stats = shapes.setdefault(shape, ShapeStats())
+        stats.count += row["count"]
+        stats.total_ms += row["total_ms"]
+        stats.max_ms = max(stats.max_ms, row["max_ms"])
+    return shapes
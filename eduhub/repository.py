@@ -0,0 +1,360 @@
+"""CRUD operations and read queries (Tasks 3 and 4.1)"""
+from datetime import datetime
+from datetime import timedelta
+
+from . import course_stats
+from . import grades
+from . import hooks
+from . import rollups
+from . import search
+from . import snapshots
+from . import summaries
+from .connection import resolve_db
+from .pagination import paginate
+
+
+#TASK 3.1: CREATE OPERATIONS
+
+def add_user(user_doc, db=None):
+    """Insert a new user and return the inserted _id"""
+    inserted_id = resolve_db(db).users.insert_one(user_doc).inserted_id
+    hooks.emit("user_changed", user_id=user_doc.get("userId"), source=hooks.REPOSITORY)
+    return inserted_id
+
+
+def create_course(course_doc, db=None):
+    """Insert a new course and return the inserted _id"""
+    inserted_id = resolve_db(db).courses.insert_one(course_doc).inserted_id
+    hooks.emit("course_changed", course_id=course_doc.get("courseId"), source=hooks.REPOSITORY)
+    return inserted_id
+
+
+def enroll_student(enrollment_doc, db=None):
+    """Insert a new enrollment and return the inserted _id"""
+    db = resolve_db(db)
+    if snapshots.enabled() and "course" not in enrollment_doc:
+        snapshots.attach_snapshot(enrollment_doc, db)
+    inserted_id = db.enrollments.insert_one(enrollment_doc).inserted_id
+    if summaries.inline():
+        course_stats.record_insert(enrollment_doc, db)
+        rollups.record_insert(enrollment_doc, db)
+    hooks.emit("enrollment_changed", course_id=enrollment_doc.get("courseId"), delta=1, enrollment=enrollment_doc,
+               source=hooks.REPOSITORY)
+    return inserted_id
+
+
+def add_lesson(lesson_doc, db=None):
+    """Insert a new lesson and return the inserted _id"""
+    return resolve_db(db).lessons.insert_one(lesson_doc).inserted_id
+
+
+#TASK 3.2: READ OPERATIONS
+
+def active_students_filter():
+    return {
+        "role": "student",
+        "isActive": True
+    }
+
+
+def find_active_students(db=None):
+    """Find all active students"""
+    return list(resolve_db(db).users.find(active_students_filter()))
+
+
+def courses_with_instructor_pipeline(limit=3):
+    return [
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "instructorId",
+                "foreignField": "userId",
+                "as": "instructor"
+            }
+        },
+        {"$unwind": "$instructor"},
+        {"$limit": limit}
+    ]
+
+
+def courses_with_instructor(limit=3, db=None, cache=None):
+    """Retrieve course details joined with instructor information
+
+    With a ReferenceCache the instructors are joined client-side from the
+    cache instead of by a server-side $lookup.
+    """
+    db = resolve_db(db)
+    if cache is None:
+        return list(db.courses.aggregate(courses_with_instructor_pipeline(limit)))
+    results = []
+    for batch in _batches(db.courses.find({}), max(limit, 100)):
+        instructors = cache.get_users(course["instructorId"] for course in batch)
+        for course in batch:
+            # Same inner-join semantics as $unwind: skip unknown instructors
+            if course["instructorId"] in instructors:
+                course["instructor"] = instructors[course["instructorId"]]
+                results.append(course)
+                if len(results) == limit:
+                    return results
+    return results
+
+
+def courses_by_category(category, db=None):
+    """Get all courses in a specific category"""
+    return list(resolve_db(db).courses.find({
+        "category": category
+    }))
+
+
+def enrolled_students_pipeline(course_id):
+    return [
+        {"$match": {"courseId": course_id}},
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "studentId",
+                "foreignField": "userId",
+                "as": "student"
+            }
+        },
+        {"$unwind": "$student"}
+    ]
+
+
+def enrolled_students(course_id, db=None, cache=None):
+    """Find enrollments for a course joined with the enrolled student
+
+    With a ReferenceCache, "student" is the cached user projection joined
+    client-side instead of the full user document from a $lookup.
+    """
+    db = resolve_db(db)
+    if cache is None:
+        return list(db.enrollments.aggregate(enrolled_students_pipeline(course_id)))
+    enrollments = list(db.enrollments.find({"courseId": course_id}))
+    students = cache.get_users(e["studentId"] for e in enrollments)
+    results = []
+    for enrollment in enrollments:
+        if enrollment["studentId"] in students:
+            enrollment["student"] = students[enrollment["studentId"]]
+            results.append(enrollment)
+    return results
+
+
+def search_courses_by_title(text, db=None, limit=None, **filters):
+    """Search courses by title (case-insensitive, partial match) with the in-process search index
+
+    filters are those of CourseSearchIndex.search: category, level,
+    min_price, max_price, published.
+    """
+    return search.get_search_index(db).search(text, limit=limit, **filters)
+
+
+#TASK 3.3: UPDATE OPERATIONS
+
+def update_user_profile(user_id, bio, skills, db=None):
+    """Update a user's profile bio and skills"""
+    result = resolve_db(db).users.update_one(
+        {"userId": user_id},
+        {
+            "$set": {
+                "profile.bio": bio,
+                "profile.skills": skills
+            }
+        }
+    )
+    hooks.emit("user_changed", user_id=user_id, source=hooks.REPOSITORY)
+    return result
+
+
+def publish_course(course_id, db=None):
+    """Mark a course as published"""
+    result = resolve_db(db).courses.update_one(
+        {"courseId": course_id},
+        {
+            "$set": {
+                "isPublished": True,
+                "updatedAt": datetime.now()
+            }
+        }
+    )
+    hooks.emit("course_changed", course_id=course_id, source=hooks.REPOSITORY)
+    return result
+
+
+def grade_submission(submission_id, grade, feedback, db=None):
+    """Record a grade and feedback on a submission; return whether the submission exists"""
+    from pymongo import ReturnDocument
+
+    db = resolve_db(db)
+    before = db.submissions.find_one_and_update(
+        {"submissionId": submission_id},
+        {
+            "$set": {
+                "grade": grade,
+                "feedback": feedback,
+                "status": "graded"
+            }
+        },
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return False
+    grades.record_grade(before, before.get("grade"), grade, db)
+    hooks.emit("submission_graded", submission_id=submission_id, grade=grade, source=hooks.REPOSITORY)
+    return True
+
+
+def update_course(course_id, changes, db=None):
+    """Set fields such as title, category or level on a course"""
+    result = resolve_db(db).courses.update_one(
+        {"courseId": course_id},
+        {"$set": dict(changes, updatedAt=datetime.now())}
+    )
+    hooks.emit("course_changed", course_id=course_id, source=hooks.REPOSITORY)
+    return result
+
+
+def add_course_tags(course_id, tags, db=None):
+    """Add tags to an existing course without creating duplicates"""
+    result = resolve_db(db).courses.update_one(
+        {"courseId": course_id},
+        {
+            "$addToSet": {
+                "tags": {"$each": list(tags)}
+            },
+            "$set": {"updatedAt": datetime.now()}
+        }
+    )
+    hooks.emit("course_changed", course_id=course_id, source=hooks.REPOSITORY)
+    return result
+
+
+def update_enrollment_progress(enrollment_id, progress, status=None, db=None):
+    """Record a student's progress (and optionally a new status) on an enrollment"""
+    from pymongo import ReturnDocument
+
+    db = resolve_db(db)
+    changes = {"progress": progress}
+    if status is not None:
+        changes["status"] = status
+    before = db.enrollments.find_one_and_update(
+        {"enrollmentId": enrollment_id},
+        {"$set": changes},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is not None:
+        after = dict(before, **changes)
+        if summaries.inline():
+            course_stats.record_update(before, after, db)
+        hooks.emit("enrollment_updated", before=before, after=after, source=hooks.REPOSITORY)
+    return before is not None
+
+
+#TASK 3.4: DELETE OPERATIONS
+
+def soft_delete_user(user_id, db=None):
+    """Remove a user by setting isActive to false"""
+    result = resolve_db(db).users.update_one(
+        {"userId": user_id},
+        {"$set": {"isActive": False}}
+    )
+    hooks.emit("user_changed", user_id=user_id, source=hooks.REPOSITORY)
+    return result
+
+
+def delete_enrollment(enrollment_id, db=None):
+    """Delete an enrollment"""
+    from pymongo.results import DeleteResult
+
+    db = resolve_db(db)
+    # The document as it was deleted, so a concurrent update cannot make us uncount a stale one
+    enrollment = db.enrollments.find_one_and_delete({"enrollmentId": enrollment_id})
+    if enrollment is not None:
+        if summaries.inline():
+            course_stats.record_delete(enrollment, db)
+            rollups.record_delete(enrollment, db)
+        hooks.emit("enrollment_changed", course_id=enrollment.get("courseId"), delta=-1, enrollment=enrollment,
+                   source=hooks.REPOSITORY)
+    return DeleteResult({"n": int(enrollment is not None)}, acknowledged=True)
+
+
+def delete_lesson(lesson_id, db=None):
+    """Remove a lesson from a course"""
+    return resolve_db(db).lessons.delete_one(
+        {"lessonId": lesson_id}
+    )
+
+
+#TASK 4.1: COMPLEX QUERIES
+
+def courses_in_price_range(low, high, db=None):
+    """Find courses with price between low and high (inclusive)"""
+    return list(resolve_db(db).courses.find({
+        "price": {"$gte": low, "$lte": high}
+    }))
+
+
+def users_joined_since(since, db=None):
+    """Get users who joined on or after the given date"""
+    return list(resolve_db(db).users.find({
+        "dateJoined": {"$gte": since}
+    }))
+
+
+def courses_with_tags(tags, db=None):
+    """Find courses that have any of the given tags"""
+    return list(resolve_db(db).courses.find({
+        "tags": {"$in": list(tags)}
+    }))
+
+
+def upcoming_assignments_filter(days=7):
+    now = datetime.now()
+    return {
+        "dueDate": {
+            "$gte": now,
+            "$lte": now + timedelta(days=days)
+        }
+    }
+
+
+def upcoming_assignments(days=7, db=None):
+    """Retrieve assignments due within the next number of days"""
+    return list(resolve_db(db).assignments.find(upcoming_assignments_filter(days)))
+
+
+# Paginated listings: keyset pages on indexed sort keys (see eduhub.pagination)
+
+def active_students_page(limit=20, token=None, projection=None, db=None):
+    """One page of active students in _id order"""
+    return paginate(resolve_db(db).users, active_students_filter(), [("_id", 1)], limit, token, projection)
+
+
+def courses_in_price_range_page(low, high, limit=20, token=None, projection=None, db=None):
+    """One page of courses priced between low and high, cheapest first"""
+    query = {"price": {"$gte": low, "$lte": high}}
+    return paginate(resolve_db(db).courses, query, [("price", 1)], limit, token, projection)
+
+
+def users_joined_since_page(since, limit=20, token=None, projection=None, db=None):
+    """One page of users who joined on or after since, newest first"""
+    query = {"dateJoined": {"$gte": since}}
+    return paginate(resolve_db(db).users, query, [("dateJoined", -1)], limit, token, projection)
+
+
+def courses_with_tags_page(tags, limit=20, token=None, projection=None, db=None):
+    """One page of courses having any of the given tags, in _id order"""
+    query = {"tags": {"$in": list(tags)}}
+    return paginate(resolve_db(db).courses, query, [("_id", 1)], limit, token, projection)
+
+
+def _batches(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
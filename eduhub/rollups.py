@@ -0,0 +1,282 @@
+"""Pre-aggregated enrollment counts per day and month (enrollment_rollups)
+
+monthly_trends groups every enrollment on each call. enrollment_rollups holds
+one document per (grain, dimension, key, bucket):
+
+    {"_id": "month|category|Programming|2026-03-01", "grain": "month",
+     "dimension": "category", "key": "Programming",
+     "bucket": datetime(2026, 3, 1), "enrollmentCount": 412}
+
+grain is "day" or "month", dimension is "course" (key = courseId),
+"category" (key = category) or "all" (key = "*"). Buckets are UTC. Reading
+a range touches one document per bucket and key instead of every enrollment.
+
+enroll_student and delete_enrollment keep the rollups current with $inc.
+backfill() rebuilds a date range from enrollments with $merge, for bulk
+loads, drift and courses that changed category:
+
+    python -m eduhub rollups backfill --start 2025-01-01
+"""
+from datetime import datetime
+from datetime import timezone
+
+from .connection import resolve_db
+
+
+COLLECTION = "enrollment_rollups"
+
+GRAINS = ["day", "month"]
+DIMENSIONS = ["course", "category", "all"]
+ALL = "*"
+
+
+def bucket_start(grain, when):
+    """Start of the day or month bucket containing when (UTC)"""
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    if grain == "day":
+        return datetime(when.year, when.month, when.day)
+    return datetime(when.year, when.month, 1)
+
+
+def rollup_id(grain, dimension, key, bucket):
+    return f"{grain}|{dimension}|{key}|{bucket:%Y-%m-%d}"
+
+
+def _add_months(when, months):
+    index = when.year * 12 + when.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+# Incremental maintenance
+
+def _buckets(enrollment, category=None):
+    """(grain, dimension, key, bucket) of every rollup that counts an enrollment"""
+    when = enrollment.get("enrollmentDate")
+    course_id = enrollment.get("courseId")
+    if when is None or course_id is None:
+        return []
+    keys = [("course", course_id), ("all", ALL)]
+    if category is not None:
+        keys.append(("category", category))
+    return [(grain, dimension, key, bucket_start(grain, when)) for grain in GRAINS for dimension, key in keys]
+
+
+def _update(grain, dimension, key, bucket, count, now):
+    from pymongo import UpdateOne
+
+    return UpdateOne(
+        {"_id": rollup_id(grain, dimension, key, bucket)},
+        {
+            "$inc": {"enrollmentCount": count},
+            "$set": {"updatedAt": now},
+            "$setOnInsert": {"grain": grain, "dimension": dimension, "key": key, "bucket": bucket}
+        },
+        upsert=True
+    )
+
+
+def rollup_updates(enrollment, sign=1, category=None):
+    """UpdateOne operations that count (sign=1) or uncount (sign=-1) an enrollment"""
+    now = datetime.now()
+    return [_update(*ident, sign, now) for ident in _buckets(enrollment, category)]
+
+
+def _record(enrollment, sign, db, cache):
+    if cache is None:
+        from .cache import reference_cache_for
+
+        cache = reference_cache_for(db)
+    course = cache.get_course(enrollment.get("courseId")) or {}
+    operations = rollup_updates(enrollment, sign, course.get("category"))
+    if operations:
+        resolve_db(db)[COLLECTION].bulk_write(operations, ordered=False)
+
+
+def record_insert(enrollment, db=None, cache=None):
+    """Count a new enrollment in its day and month buckets"""
+    _record(enrollment, 1, db, cache)
+
+
+def record_delete(enrollment, db=None, cache=None):
+    """Uncount a deleted enrollment"""
+    _record(enrollment, -1, db, cache)
+
+
+def record_inserts(enrollments, db=None, cache=None):
+    """Count a batch of new enrollments with one upsert per affected bucket"""
+    if cache is None:
+        from .cache import reference_cache_for
+
+        cache = reference_cache_for(db)
+    counts = {}
+    for enrollment in enrollments:
+        course = cache.get_course(enrollment.get("courseId")) or {}
+        for ident in _buckets(enrollment, course.get("category")):
+            counts[ident] = counts.get(ident, 0) + 1
+    now = datetime.now()
+    operations = [_update(*ident, count, now) for ident, count in counts.items()]
+    if operations:
+        resolve_db(db)[COLLECTION].bulk_write(operations, ordered=False)
+
+
+# Backfill
+
+def _bucket_expr(grain, date_field):
+    parts = {"year": {"$year": date_field}, "month": {"$month": date_field}}
+    if grain == "day":
+        parts["day"] = {"$dayOfMonth": date_field}
+    return {"$dateFromParts": parts}
+
+
+def _write_stages(grain, dimension, started):
+    """Shape grouped {_id: {key, bucket}, enrollmentCount} rows into rollups and $merge them"""
+    return [
+        {
+            "$project": {
+                "_id": {"$concat": [
+                    f"{grain}|{dimension}|", "$_id.key", "|",
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id.bucket"}}
+                ]},
+                "grain": grain,
+                "dimension": dimension,
+                "key": "$_id.key",
+                "bucket": "$_id.bucket",
+                "enrollmentCount": 1,
+                "updatedAt": {"$literal": started},
+                "backfilledAt": {"$literal": started}
+            }
+        },
+        {"$merge": {"into": COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+
+def backfill_pipelines(start, end, started):
+    """(source collection, pipeline) pairs, run in order, that rebuild [start, end)"""
+    # Steps 2-4 read only the day docs step 1 just wrote (or that were
+    # incremented meanwhile): stale ones are deleted after the pipelines run
+    day_range = {
+        "bucket": {"$gte": start, "$lt": end},
+        "$or": [{"backfilledAt": started}, {"updatedAt": {"$gte": started}}]
+    }
+    pipelines = [
+        # 1. enrollments -> day/course
+        ("enrollments", [
+            {"$match": {"enrollmentDate": {"$gte": start, "$lt": end}, "courseId": {"$type": "string"}}},
+            {
+                "$group": {
+                    "_id": {"key": "$courseId", "bucket": _bucket_expr("day", "$enrollmentDate")},
+                    "enrollmentCount": {"$sum": 1}
+                }
+            },
+        ] + _write_stages("day", "course", started)),
+        # 2. day/course -> day/category, joining only the grouped rows with courses
+        (COLLECTION, [
+            {"$match": dict(day_range, grain="day", dimension="course")},
+            {
+                "$lookup": {
+                    "from": "courses",
+                    "localField": "key",
+                    "foreignField": "courseId",
+                    "as": "course"
+                }
+            },
+            {"$unwind": "$course"},
+            {"$match": {"course.category": {"$type": "string"}}},
+            {
+                "$group": {
+                    "_id": {"key": "$course.category", "bucket": "$bucket"},
+                    "enrollmentCount": {"$sum": "$enrollmentCount"}
+                }
+            },
+        ] + _write_stages("day", "category", started)),
+        # 3. day/course -> day/all
+        (COLLECTION, [
+            {"$match": dict(day_range, grain="day", dimension="course")},
+            {"$group": {"_id": {"key": ALL, "bucket": "$bucket"}, "enrollmentCount": {"$sum": "$enrollmentCount"}}},
+        ] + _write_stages("day", "all", started)),
+    ]
+    # 4. day/* -> month/*
+    for dimension in DIMENSIONS:
+        pipelines.append((COLLECTION, [
+            {"$match": dict(day_range, grain="day", dimension=dimension)},
+            {
+                "$group": {
+                    "_id": {"key": "$key", "bucket": _bucket_expr("month", "$bucket")},
+                    "enrollmentCount": {"$sum": "$enrollmentCount"}
+                }
+            },
+        ] + _write_stages("month", dimension, started)))
+    return pipelines
+
+
+def backfill(start=None, end=None, db=None):
+    """Rebuild every rollup between the months containing start and end
+
+    start defaults to the earliest enrollment and end to now. The range is
+    widened to whole months so day and month buckets stay consistent.
+    Increments that land while the backfill runs can be overwritten; run it
+    again over the same range to repair them.
+    """
+    db = resolve_db(db)
+    if start is None:
+        first = db.enrollments.find_one({"enrollmentDate": {"$ne": None}}, {"enrollmentDate": 1}, sort=[("enrollmentDate", 1)])
+        if first is None:
+            return {"documents": 0, "removed": 0}
+        start = first["enrollmentDate"]
+    start = bucket_start("month", start)
+    end = _add_months(bucket_start("month", end or datetime.now()), 1)
+    # BSON dates have millisecond precision
+    now = datetime.now()
+    started = now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+    for collection, pipeline in backfill_pipelines(start, end, started):
+        db[collection].aggregate(pipeline)
+    # Buckets that no longer have enrollments and were not incremented meanwhile
+    stale = db[COLLECTION].delete_many({
+        "bucket": {"$gte": start, "$lt": end},
+        "updatedAt": {"$lt": started},
+        "$or": [{"backfilledAt": {"$lt": started}}, {"backfilledAt": {"$exists": False}}]
+    })
+    return {
+        "start": start,
+        "end": end,
+        "documents": db[COLLECTION].count_documents({"backfilledAt": started}),
+        "removed": stale.deleted_count,
+    }
+
+
+# Reads
+
+def read_range(grain, dimension, start, end, key=None, db=None):
+    """Rollup documents of one grain and dimension with bucket in [start, end)"""
+    query = {"grain": grain, "dimension": dimension, "bucket": {"$gte": start, "$lt": end}}
+    if key is not None:
+        query["key"] = key
+    projection = {"_id": 0, "key": 1, "bucket": 1, "enrollmentCount": 1}
+    return list(resolve_db(db)[COLLECTION].find(query, projection).sort([("bucket", 1), ("key", 1)]))
+
+
+def monthly_trends(start=None, end=None, db=None):
+    """Enrollment counts per calendar month, shaped like analytics.monthly_trends"""
+    start = start or datetime(1970, 1, 1)
+    end = end or _add_months(bucket_start("month", datetime.now()), 1)
+    return [
+        {
+            "_id": {"year": row["bucket"].year, "month": row["bucket"].month},
+            "period": f"{row['bucket'].year}-{row['bucket'].month}",
+            "enrollmentCount": row["enrollmentCount"],
+        }
+        for row in read_range("month", "all", start, end, ALL, db)
+        if row["enrollmentCount"]
+    ]
+
+
+def monthly_trends_by_category(months=12, now=None, db=None):
+    """{category: [(month start, count), ...]} for the last number of months"""
+    end = _add_months(bucket_start("month", now or datetime.now()), 1)
+    trends = {}
+    for row in read_range("month", "category", _add_months(end, -months), end, db=db):
+        if row["enrollmentCount"]:
+            trends.setdefault(row["key"], []).append((row["bucket"], row["enrollmentCount"]))
+    return trends
@@ -0,0 +1,209 @@
+"""Collection names, document schemas and validators (Tasks 1.2 and 6.1)"""
+
+EMAIL_PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+
+COLLECTIONS = ["users", "courses", "enrollments", "lessons", "assignments", "submissions"]
+
+
+#TASK 1.1: COLLECTION VALIDATORS
+
+users_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["userId", "email", "firstName", "lastName", "role"],
+        "properties": {
+            "userId": {"bsonType": "string"},
+            "email": {"bsonType": "string", "pattern": EMAIL_PATTERN},
+            "firstName": {"bsonType": "string"},
+            "lastName": {"bsonType": "string"},
+            "role": {"bsonType": "string", "enum": ["student", "instructor"]},
+            "dateJoined": {"bsonType": "date"},
+            "isActive": {"bsonType": "bool"}
+        }
+    }
+}
+
+courses_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["courseId", "title", "instructorId", "level"],
+        "properties": {
+            "courseId": {"bsonType": "string"},
+            "title": {"bsonType": "string"},
+            "instructorId": {"bsonType": "string"},
+            "level": {"bsonType": "string", "enum": ["beginner", "intermediate", "advanced"]},
+            "price": {"bsonType": "number", "minimum": 0},
+            "isPublished": {"bsonType": "bool"}
+        }
+    }
+}
+
+COLLECTION_VALIDATORS = {
+    "users": users_validator,
+    "courses": courses_validator,
+    "enrollments": None,
+    "lessons": None,
+    "assignments": None,
+    "submissions": None,
+}
+
+
+def create_collections_with_validation(db=None):
+    """Create missing collections and bring their validators up to date (see eduhub.migrations)"""
+    from . import migrations
+
+    spec = {"collections": migrations.SPEC["collections"], "indexes": []}
+    return migrations.migrate(db, spec=spec)
+
+
+#TASK 1.2: DESIGN DOCUMENTS SCHEMAS
+
+user_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "userId": "string (unique)",
+    "email": "string (unique, required)",
+    "firstName": "string (required)",
+    "lastName": "string (required)",
+    "role": "string (enum: ['student', 'instructor'])",
+    "dateJoined": "datetime",
+    "profile": {
+        "bio": "string",
+        "avatar": "string",
+        "skills": ["string"]
+    },
+    "isActive": "boolean"
+}
+
+course_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "courseId": "string (unique)",
+    "title": "string (required)",
+    "description": "string",
+    "instructorId": "string (reference to users)",
+    "category": "string",
+    "level": "string (enum: ['beginner', 'intermediate', 'advanced'])",
+    "duration": "number (in hours)",
+    "price": "number",
+    "tags": ["string"],
+    "createdAt": "datetime",
+    "updatedAt": "datetime",
+    "isPublished": "boolean"
+}
+
+enrollment_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "enrollmentId": "string (unique)",
+    "studentId": "string (reference to users)",
+    "courseId": "string (reference to courses)",
+    "enrollmentDate": "datetime",
+    "progress": "number (0-100)",
+    "completionStatus": "string (enum: ['enrolled', 'in-progress', 'completed', 'dropped'])",
+    "completionDate": "datetime"
+}
+
+lesson_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "lessonId": "string (unique)",
+    "courseId": "string (reference to courses)",
+    "title": "string (required)",
+    "content": "string",
+    "videoUrl": "string",
+    "duration": "number (in minutes)",
+    "order": "number",
+    "createdAt": "datetime"
+}
+
+assignment_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "assignmentId": "string (unique)",
+    "courseId": "string (reference to courses)",
+    "title": "string (required)",
+    "description": "string",
+    "dueDate": "datetime",
+    "maxPoints": "number",
+    "createdAt": "datetime"
+}
+
+submission_schema = {
+    "_id": "ObjectId (auto-generated)",
+    "submissionId": "string (unique)",
+    "assignmentId": "string (reference to assignments)",
+    "studentId": "string (reference to users)",
+    "content": "string",
+    "submittedAt": "datetime",
+    "grade": "number",
+    "feedback": "string",
+    "status": "string (enum: ['submitted', 'graded', 'late'])"
+}
+
+
+#TASK 6.1: SCHEMA VALIDATION
+
+users_validated_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["userId", "email", "firstName", "lastName", "role"],
+        "properties": {
+            "userId": {
+                "bsonType": "string",
+                "description": "User ID must be a string and is required"
+            },
+            "email": {
+                "bsonType": "string",
+                "pattern": EMAIL_PATTERN,
+                "description": "Email must be a valid email format and is required"
+            },
+            "firstName": {
+                "bsonType": "string",
+                "description": "First name must be a string and is required"
+            },
+            "lastName": {
+                "bsonType": "string",
+                "description": "Last name must be a string and is required"
+            },
+            "role": {
+                "enum": ["student", "instructor"],
+                "description": "Role must be either student or instructor"
+            },
+            "isActive": {
+                "bsonType": "bool",
+                "description": "isActive must be a boolean"
+            }
+        }
+    }
+}
+
+courses_validated_validator = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["courseId", "title", "instructorId"],
+        "properties": {
+            "courseId": {
+                "bsonType": "string",
+                "description": "Course ID must be a string and is required"
+            },
+            "title": {
+                "bsonType": "string",
+                "minLength": 5,
+                "description": "Title must be a string with minimum 5 characters"
+            },
+            "instructorId": {
+                "bsonType": "string",
+                "description": "Instructor ID must be a string and is required"
+            },
+            "level": {
+                "enum": ["beginner", "intermediate", "advanced"],
+                "description": "Level must be beginner, intermediate, or advanced"
+            },
+            "price": {
+                "bsonType": "number",
+                "minimum": 0,
+                "description": "Price must be a non-negative number"
+            },
+            "isPublished": {
+                "bsonType": "bool",
+                "description": "isPublished must be a boolean"
+            }
+        }
+    }
+}
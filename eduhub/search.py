@@ -0,0 +1,298 @@
+"""Course search: $text with score ranking, or an in-process inverted index
+
+A case-insensitive, unanchored $regex on title cannot use an index and
+scans the whole catalog. There are two replacements:
+
+- text_search() runs a $text query against the title text index and
+  ranks by textScore. It matches whole words (with stemming) only.
+- CourseSearchIndex holds an inverted index of course titles in process.
+  Every query word matches as a whole word, as the start of a word, or
+  (3+ characters) anywhere inside a word through a trigram index of the
+  vocabulary. Category, level, price and isPublished filters are applied
+  while walking the postings.
+
+    index = get_search_index()
+    index.search("pyth data", category="Programming", max_price=100, limit=10)
+
+Postings are kept sorted by static rank (titles with fewer words first,
+then insertion order). A query walks the rarest word's postings in that
+order and stops as soon as limit courses passed every check, so the time
+depends on limit and filter selectivity, not on catalog size.
+
+The index follows the course_changed and resync hooks events, like the
+reference cache: a changed course is re-read and re-indexed, and an
+unknown change or a resync marks the index for a rebuild on the next
+search. Run an eduhub.changes consumer to also see writes from elsewhere.
+"""
+from bisect import bisect_left
+from bisect import insort
+import heapq
+import re
+import threading
+
+from . import hooks
+from .connection import resolve_db
+
+
+SEARCH_PROJECTION = {"_id": 0, "courseId": 1, "title": 1, "category": 1, "level": 1, "price": 1, "isPublished": 1}
+MAX_EXPANSIONS = 64
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _filters(category=None, level=None, min_price=None, max_price=None, published=None):
+    query = {}
+    if category is not None:
+        query["category"] = category
+    if level is not None:
+        query["level"] = level
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+    if published is not None:
+        query["isPublished"] = published
+    return query
+
+
+#  $text search
+
+def text_search_query(text, **filters):
+    return dict({"$text": {"$search": text}}, **_filters(**filters))
+
+
+def text_search(text, category=None, level=None, min_price=None, max_price=None, published=None,
+                limit=20, db=None):
+    """Courses matching the words of text, best textScore first (needs the title text index)"""
+    query = text_search_query(text, category=category, level=level, min_price=min_price,
+                              max_price=max_price, published=published)
+    projection = dict(SEARCH_PROJECTION, score={"$meta": "textScore"})
+    cursor = resolve_db(db).courses.find(query, projection).sort([("score", {"$meta": "textScore"})])
+    return list(cursor.limit(limit) if limit else cursor)
+
+
+#  In-process inverted index
+
+class CourseSearchIndex:
+    """Inverted index of course titles with prefix and trigram matching"""
+
+    def __init__(self, db=None):
+        self._db = db
+        self._lock = threading.RLock()
+        self._installed = False
+        self._clear()
+
+    def _clear(self):
+        # Courses are numbered densely in the order they were indexed
+        self.ids = {}
+        self.courses = []
+        self.tokens = []
+        # token -> sorted [rank << 32 | doc], rank = number of title words
+        self.postings = {}
+        self.vocabulary = []
+        self.trigram_tokens = {}
+        self.stale = True
+
+    @property
+    def db(self):
+        return resolve_db(self._db)
+
+    # Building and maintenance
+
+    def build(self, batch_size=10_000):
+        """Index the whole catalog, replacing what was indexed before"""
+        with self._lock:
+            self._clear()
+            for course in self.db.courses.find({}, SEARCH_PROJECTION, batch_size=batch_size):
+                self._add(course, bulk=True)
+            # Appended unsorted while loading: one sort per list instead of an insort per course
+            for postings in self.postings.values():
+                postings.sort()
+            self.vocabulary.sort()
+            self.stale = False
+        return self
+
+    def _add(self, course, bulk=False):
+        doc = len(self.courses)
+        tokens = tuple(dict.fromkeys(tokenize(course.get("title"))))
+        self.ids[course.get("courseId")] = doc
+        self.courses.append(course)
+        self.tokens.append(tokens)
+        entry = (len(tokens) << 32) | doc
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                self.postings[token] = [entry]
+                if bulk:
+                    self.vocabulary.append(token)
+                else:
+                    insort(self.vocabulary, token)
+                for trigram in trigrams(token):
+                    self.trigram_tokens.setdefault(trigram, set()).add(token)
+            elif bulk:
+                postings.append(entry)
+            else:
+                insort(postings, entry)
+
+    def _remove(self, course_id):
+        doc = self.ids.pop(course_id, None)
+        if doc is None:
+            return
+        tokens = self.tokens[doc]
+        entry = (len(tokens) << 32) | doc
+        for token in tokens:
+            postings = self.postings[token]
+            del postings[bisect_left(postings, entry)]
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+                for trigram in trigrams(token):
+                    self.trigram_tokens[trigram].discard(token)
+        # The slot stays allocated so the other doc numbers do not move
+        self.courses[doc] = None
+        self.tokens[doc] = ()
+
+    def upsert(self, course):
+        """Index a course document (SEARCH_PROJECTION fields), replacing its previous version"""
+        with self._lock:
+            self._remove(course.get("courseId"))
+            self._add(course)
+
+    def remove(self, course_id):
+        with self._lock:
+            self._remove(course_id)
+
+    def refresh(self, course_id):
+        """Re-read one course from the database and re-index it"""
+        course = self.db.courses.find_one({"courseId": course_id}, SEARCH_PROJECTION)
+        if course is None:
+            self.remove(course_id)
+        else:
+            self.upsert(course)
+
+    def install(self):
+        """Subscribe to the repository's change events"""
+        if not self._installed:
+            hooks.register("course_changed", self._on_course_changed)
+            hooks.register("resync", self._on_resync)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        hooks.unregister("course_changed", self._on_course_changed)
+        hooks.unregister("resync", self._on_resync)
+        self._installed = False
+
+    def _on_course_changed(self, course_id, **_):
+        if course_id is None:
+            self.stale = True
+        elif not self.stale:
+            self.refresh(course_id)
+
+    def _on_resync(self, collections, **_):
+        if "courses" in collections:
+            self.stale = True
+
+    # Querying
+
+    def _expand(self, term, prefix):
+        """Indexed tokens a query term matches: itself, words it starts, words containing it"""
+        matches = [term] if term in self.postings else []
+        if prefix:
+            start = bisect_left(self.vocabulary, term)
+            for token in self.vocabulary[start:start + MAX_EXPANSIONS + 1]:
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    matches.append(token)
+        if len(term) >= 3 and len(matches) < MAX_EXPANSIONS:
+            candidates = None
+            for trigram in trigrams(term):
+                tokens = self.trigram_tokens.get(trigram, set())
+                candidates = tokens if candidates is None else candidates & tokens
+                if not candidates:
+                    break
+            seen = set(matches)
+            matches.extend(sorted(t for t in candidates or () if term in t and t not in seen))
+        return matches[:MAX_EXPANSIONS]
+
+    def search(self, text, category=None, level=None, min_price=None, max_price=None, published=None,
+               limit=20, prefix=True):
+        """Courses whose title matches every word of text, shortest titles first
+
+        Returns the indexed course documents (SEARCH_PROJECTION fields);
+        limit=None returns every match.
+        """
+        if self.stale:
+            self.build()
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            return []
+        with self._lock:
+            expansions = []
+            for term in terms:
+                tokens = self._expand(term, prefix)
+                if not tokens:
+                    return []
+                expansions.append((sum(len(self.postings[t]) for t in tokens), tokens))
+            expansions.sort(key=lambda item: item[0])
+            # Walk the rarest term's postings, check the other terms per course
+            driver = expansions[0][1]
+            others = [set(tokens) for _, tokens in expansions[1:]]
+            walk = self.postings[driver[0]] if len(driver) == 1 else heapq.merge(*[self.postings[t] for t in driver])
+
+            results = []
+            last = None
+            for entry in walk:
+                if entry == last:
+                    continue
+                last = entry
+                doc = entry & 0xFFFFFFFF
+                words = self.tokens[doc]
+                if any(other.isdisjoint(words) for other in others):
+                    continue
+                course = self.courses[doc]
+                if category is not None and course.get("category") != category:
+                    continue
+                if level is not None and course.get("level") != level:
+                    continue
+                if published is not None and course.get("isPublished") != published:
+                    continue
+                if min_price is not None or max_price is not None:
+                    price = course.get("price")
+                    if not isinstance(price, (int, float)):
+                        continue
+                    if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                        continue
+                results.append(course)
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def __len__(self):
+        return len(self.ids)
+
+
+_search_indexes = {}
+_search_lock = threading.Lock()
+
+
+def get_search_index(db=None):
+    """Process-wide search index of db's catalog, subscribed to change events; built on first search"""
+    db = resolve_db(db)
+    index = _search_indexes.get(db.name)
+    if index is None:
+        with _search_lock:
+            index = _search_indexes.get(db.name)
+            if index is None:
+                index = _search_indexes[db.name] = CourseSearchIndex(db).install()
+    return index
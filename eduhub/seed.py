@@ -0,0 +1,305 @@
+"""Sample data population and relationship checks (Tasks 2.1 and 2.2)"""
+from datetime import datetime
+from datetime import timedelta
+import random
+
+from . import approximate
+from . import course_stats
+from . import grades
+from . import rollups
+from . import snapshots
+from .connection import resolve_db
+from .ids import new_id
+
+
+#TASK 2.1: INSERT SAMPLE DATA
+
+# Sample data generation functions
+def generate_user_id():
+    """Generate unique user ID"""
+    return new_id("USER_")
+
+def generate_course_id():
+    """Generate unique course ID"""
+    return new_id("COURSE_")
+
+def generate_enrollment_id():
+    """Generate unique enrollment ID"""
+    return new_id("ENROLL_")
+
+def generate_lesson_id():
+    """Generate unique lesson ID"""
+    return new_id("LESSON_")
+
+def generate_assignment_id():
+    """Generate unique assignment ID"""
+    return new_id("ASSIGN_")
+
+def generate_submission_id():
+    """Generate unique submission ID"""
+    return new_id("SUBMIT_")
+
+
+instructor_names = [
+    ("John", "Smith", "Programming expert with 10+ years experience"),
+    ("Sarah", "Johnson", "Data Science and Analytics specialist"),
+    ("Michael", "Brown", "Web Development and Design mentor"),
+    ("Emily", "Davis", "Business and Marketing strategist"),
+    ("David", "Wilson", "Cybersecurity and Network specialist")
+]
+
+student_first_names = ["Alice", "Bob", "Charlie", "Diana", "Eve", "Frank", "Grace", "Henry", "Iris", "Jack", "Kate", "Liam", "Mia", "Noah", "Olivia"]
+student_last_names = ["Anderson", "Baker", "Clark", "Edwards", "Fisher", "Garcia", "Harris", "Jackson", "King", "Lopez", "Miller", "Nelson", "Parker", "Quinn", "Roberts"]
+
+course_categories = ["Programming", "Data Science", "Web Development", "Business", "Design", "Marketing", "Cybersecurity", "Personal Development"]
+course_levels = ["beginner", "intermediate", "advanced"]
+
+course_titles = [
+    "Complete Python Bootcamp",
+    "Data Science with Python",
+    "Full Stack Web Development",
+    "Digital Marketing Mastery",
+    "UI/UX Design Fundamentals",
+    "Business Strategy Essentials",
+    "Cybersecurity Basics",
+    "Personal Productivity Hacks"
+]
+
+course_descriptions = [
+    "Learn Python from scratch with hands-on projects",
+    "Master data analysis and machine learning with Python",
+    "Build modern web applications with React and Node.js",
+    "Comprehensive guide to digital marketing strategies",
+    "Design beautiful and user-friendly interfaces",
+    "Strategic thinking for business success",
+    "Essential cybersecurity concepts and practices",
+    "Time management and productivity techniques"
+]
+
+enrollment_statuses = ["active", "completed", "dropped"]
+submission_statuses = ["submitted", "graded", "late"]
+
+assignment_titles = [
+    "Programming Project 1",
+    "Data Analysis Exercise",
+    "Web Development Task",
+    "Marketing Campaign Design",
+    "UI Design Challenge",
+    "Business Case Study",
+    "Security Assessment",
+    "Productivity Plan",
+    "Final Project",
+    "Peer Review Assignment"
+]
+
+
+def build_users():
+    """Build 20 users (5 instructors and 15 students)"""
+    users_data = []
+
+    for i, (first_name, last_name, bio) in enumerate(instructor_names):
+        users_data.append({
+            "userId": generate_user_id(),
+            "email": f"{first_name.lower()}.{last_name.lower()}@eduhub.com",
+            "firstName": first_name,
+            "lastName": last_name,
+            "role": "instructor",
+            "dateJoined": datetime.now() - timedelta(days=random.randint(30, 365)),
+            "profile": {
+                "bio": bio,
+                "avatar": f"instructor_{i+1}.jpg",
+                "skills": random.sample(["Python", "JavaScript", "Data Analysis", "Machine Learning", "Web Design", "Marketing", "Cybersecurity"], 3)
+            },
+            "isActive": True
+        })
+
+    for i in range(15):
+        users_data.append({
+            "userId": generate_user_id(),
+            "email": f"{student_first_names[i].lower()}.{student_last_names[i].lower()}@student.com",
+            "firstName": student_first_names[i],
+            "lastName": student_last_names[i],
+            "role": "student",
+            "dateJoined": datetime.now() - timedelta(days=random.randint(1, 180)),
+            "profile": {
+                "bio": "Passionate learner interested in technology and personal development",
+                "avatar": f"student_{i+1}.jpg",
+                "skills": random.sample(["HTML", "CSS", "Python", "Excel", "Communication", "Problem Solving"], 2)
+            },
+            "isActive": True
+        })
+    return users_data
+
+
+def build_courses(instructor_ids):
+    """Build 8 courses across different categories"""
+    courses_data = []
+    for i in range(8):
+        courses_data.append({
+            "courseId": generate_course_id(),
+            "title": course_titles[i],
+            "description": course_descriptions[i],
+            "instructorId": random.choice(instructor_ids),
+            "category": course_categories[i],
+            "level": random.choice(course_levels),
+            "duration": random.randint(10, 50),
+            "price": random.randint(50, 200),
+            "tags": random.sample(["online", "certificate", "practical", "beginner-friendly", "advanced", "hands-on"], 3),
+            "createdAt": datetime.now() - timedelta(days=random.randint(10, 100)),
+            "updatedAt": datetime.now() - timedelta(days=random.randint(1, 10)),
+            "isPublished": random.choice([True, True, True, False])  # Most courses are published
+        })
+    return courses_data
+
+
+def build_enrollments(student_ids, course_ids, count=15):
+    """Build random enrollments of students into courses"""
+    enrollments_data = []
+    for i in range(count):
+        enrollments_data.append({
+            "enrollmentId": generate_enrollment_id(),
+            "studentId": random.choice(student_ids),
+            "courseId": random.choice(course_ids),
+            "enrollmentDate": datetime.now() - timedelta(days=random.randint(1, 60)),
+            "progress": random.randint(0, 100),
+            "completionDate": datetime.now() - timedelta(days=random.randint(1, 30)) if random.choice([True, False]) else None,
+            "status": random.choice(enrollment_statuses)
+        })
+    return enrollments_data
+
+
+def build_lessons(courses):
+    """Build 3-4 lessons for each course"""
+    lessons_data = []
+    for course in courses:
+        num_lessons = random.randint(3, 4)
+        for lesson_order in range(1, num_lessons + 1):
+            lessons_data.append({
+                "lessonId": generate_lesson_id(),
+                "courseId": course["courseId"],
+                "title": f"Lesson {lesson_order}: {course['title']} - Part {lesson_order}",
+                "content": f"Detailed content for lesson {lesson_order} of {course['title']}",
+                "videoUrl": f"https://video.eduhub.com/{course['courseId']}/lesson{lesson_order}",
+                "duration": random.randint(15, 60),
+                "order": lesson_order,
+                "createdAt": datetime.now() - timedelta(days=random.randint(5, 50))
+            })
+    return lessons_data
+
+
+def build_assignments(course_ids):
+    """Build 10 assignments spread over the courses"""
+    assignments_data = []
+    for i in range(10):
+        assignments_data.append({
+            "assignmentId": generate_assignment_id(),
+            "courseId": random.choice(course_ids),
+            "title": assignment_titles[i],
+            "description": f"Complete the {assignment_titles[i]} following the course guidelines",
+            "dueDate": datetime.now() + timedelta(days=random.randint(7, 30)),
+            "maxPoints": random.randint(50, 100),
+            "createdAt": datetime.now() - timedelta(days=random.randint(1, 20))
+        })
+    return assignments_data
+
+
+def build_submissions(assignment_ids, student_ids, count=12):
+    """Build random assignment submissions"""
+    submissions_data = []
+    for i in range(count):
+        submissions_data.append({
+            "submissionId": generate_submission_id(),
+            "assignmentId": random.choice(assignment_ids),
+            "studentId": random.choice(student_ids),
+            "content": f"Student submission content for assignment {i+1}",
+            "submittedAt": datetime.now() - timedelta(days=random.randint(1, 15)),
+            "grade": random.randint(60, 100) if random.choice([True, False]) else None,
+            "feedback": f"Good work on assignment {i+1}" if random.choice([True, False]) else None,
+            "status": random.choice(submission_statuses)
+        })
+    return submissions_data
+
+
+def seed_sample_data(db=None, verbose=True):
+    """Insert the sample dataset and return the inserted documents by collection"""
+    db = resolve_db(db)
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    log("Inserting users...")
+    users_data = build_users()
+    result = db.users.insert_many(users_data)
+    log(f" Inserted {len(result.inserted_ids)} users")
+
+    instructor_ids = [u["userId"] for u in users_data if u["role"] == "instructor"]
+    student_ids = [u["userId"] for u in users_data if u["role"] == "student"]
+
+    log("Inserting courses...")
+    courses_data = build_courses(instructor_ids)
+    result = db.courses.insert_many(courses_data)
+    log(f" Inserted {len(result.inserted_ids)} courses")
+    course_ids = [c["courseId"] for c in courses_data]
+
+    log("Inserting enrollments...")
+    enrollments_data = build_enrollments(student_ids, course_ids)
+    result = db.enrollments.insert_many(enrollments_data)
+    log(f" Inserted {len(result.inserted_ids)} enrollments")
+
+    log("Inserting lessons...")
+    lessons_data = build_lessons(courses_data)
+    result = db.lessons.insert_many(lessons_data)
+    log(f" Inserted {len(result.inserted_ids)} lessons")
+
+    log("Inserting assignments...")
+    assignments_data = build_assignments(course_ids)
+    result = db.assignments.insert_many(assignments_data)
+    log(f" Inserted {len(result.inserted_ids)} assignments")
+    assignment_ids = [a["assignmentId"] for a in assignments_data]
+
+    log("Inserting submissions...")
+    submissions_data = build_submissions(assignment_ids, student_ids)
+    result = db.submissions.insert_many(submissions_data)
+    log(f" Inserted {len(result.inserted_ids)} submissions")
+
+    # insert_many bypasses the per-enrollment $inc, so rebuild the summary
+    course_stats.reconcile_course_stats(db)
+    rollups.backfill(db=db)
+    approximate.rebuild(db)
+    grades.rebuild(db)
+    log(" Rebuilt course_stats, enrollment_rollups, sketches and grade histograms")
+    if snapshots.enabled():
+        snapshots.backfill(db)
+        log(" Embedded course snapshots in enrollments")
+
+    return {
+        "users": users_data,
+        "courses": courses_data,
+        "enrollments": enrollments_data,
+        "lessons": lessons_data,
+        "assignments": assignments_data,
+        "submissions": submissions_data,
+    }
+
+
+#TASK 2.2: DATA RELATIONSHIPS VERIFICATION
+
+def verify_relationships(db=None):
+    """Count courses and enrollments whose references do not resolve"""
+    from . import integrity
+
+    db = resolve_db(db)
+    # Anti-joins over indexed cursors (eduhub.integrity) instead of $nin over
+    # every user and course ID, which outgrows the 16MB BSON limit
+    courses_with_invalid_instructors = sum(
+        1 for relation in integrity.relations_for(["courses"])
+        for _ in integrity.find_orphans(relation, db)
+    )
+
+    # An enrollment can fail both references; count it once
+    enrollments_with_invalid_refs = len({
+        _id for relation in integrity.relations_for(["enrollments"])
+        for _id, _ in integrity.find_orphans(relation, db)
+    })
+    return {
+        "courses_with_invalid_instructors": courses_with_invalid_instructors,
+        "enrollments_with_invalid_refs": enrollments_with_invalid_refs,
+    }
@@ -0,0 +1,186 @@
+"""Denormalized course snapshots embedded in enrollments
+
+In snapshot mode every enrollment carries the fields the reports read from
+its course:
+
+    {"enrollmentId": ..., "courseId": ..., "course": {"title": ..., "category": ..., "level": ...}}
+
+and the enrollment pipelines (enrollment_stats, completion_by_course,
+active_enrollments_by_category) read them instead of joining courses.
+Snapshot mode is off unless EDUHUB_COURSE_SNAPSHOTS=1 or enable() is called;
+fill the existing enrollments with backfill() before turning it on.
+
+SnapshotMaintainer keeps the snapshots in step with course edits: it listens
+for course_changed events (from the repository or an eduhub.changes
+consumer) and rewrites the affected enrollments with batched update_many.
+"""
+import os
+import threading
+
+from . import hooks
+from .connection import resolve_db
+
+
+SNAPSHOT_FIELDS = ["title", "category", "level"]
+
+_enabled = os.environ.get("EDUHUB_COURSE_SNAPSHOTS", "0") == "1"
+
+
+def enable(flag=True):
+    """Switch snapshot mode on or off for this process"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def enabled():
+    return _enabled
+
+
+def resolve(snapshots=None):
+    """The snapshots argument of a query, defaulting to the process-wide mode"""
+    return _enabled if snapshots is None else snapshots
+
+
+def course_snapshot(course):
+    """Compact copy of a course for embedding; always the same key order"""
+    return {field: course.get(field) for field in SNAPSHOT_FIELDS}
+
+
+def attach_snapshot(enrollment, db=None, cache=None):
+    """Embed the course snapshot in an enrollment about to be inserted"""
+    if cache is None:
+        from .cache import reference_cache_for
+
+        cache = reference_cache_for(db)
+    course = cache.get_course(enrollment.get("courseId"))
+    if course is not None:
+        enrollment["course"] = course_snapshot(course)
+    return enrollment
+
+
+def refresh_courses(course_ids, db=None):
+    """Rewrite the snapshots of the given courses; return the number of enrollments changed"""
+    from pymongo import UpdateMany
+
+    db = resolve_db(db)
+    projection = dict({"_id": 0, "courseId": 1}, **{field: 1 for field in SNAPSHOT_FIELDS})
+    operations = []
+    for course in db.courses.find({"courseId": {"$in": list(course_ids)}}, projection):
+        snapshot = course_snapshot(course)
+        operations.append(UpdateMany(
+            # Skips enrollments that are already current
+            {"courseId": course["courseId"], "course": {"$ne": snapshot}},
+            {"$set": {"course": snapshot}}
+        ))
+    if not operations:
+        return 0
+    return db.enrollments.bulk_write(operations, ordered=False).modified_count
+
+
+def backfill(db=None, batch_size=500):
+    """Embed or refresh the snapshot on every enrollment, course by course"""
+    db = resolve_db(db)
+    modified = 0
+    batch = []
+    for course in db.courses.find({}, {"_id": 0, "courseId": 1}):
+        batch.append(course["courseId"])
+        if len(batch) == batch_size:
+            modified += refresh_courses(batch, db)
+            batch = []
+    if batch:
+        modified += refresh_courses(batch, db)
+    return modified
+
+
+class SnapshotMaintainer:
+    """Propagate course edits to enrollment snapshots on a background thread
+
+    course_changed events are collected for flush_interval seconds so that a
+    burst of edits to one course costs a single update_many.
+    """
+
+    def __init__(self, db=None, batch_size=100, flush_interval=0.5):
+        self._db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"refreshes": 0, "enrollments": 0, "backfills": 0, "errors": 0}
+        self._pending = set()
+        self._full = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def install(self):
+        hooks.register("course_changed", self._on_course_changed)
+        hooks.register("resync", self._on_resync)
+        return self
+
+    def uninstall(self):
+        hooks.unregister("course_changed", self._on_course_changed)
+        hooks.unregister("resync", self._on_resync)
+
+    def start(self):
+        self.install()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="eduhub-snapshots", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Apply what is pending, then stop the thread"""
+        self.uninstall()
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _on_course_changed(self, course_id, **_):
+        with self._lock:
+            if course_id is None:
+                self._full = True
+            else:
+                self._pending.add(course_id)
+        self._wake.set()
+
+    def _on_resync(self, collections, **_):
+        if "courses" in collections or "enrollments" in collections:
+            with self._lock:
+                self._full = True
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            # Let a burst of edits collect before writing
+            self._stop.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Retry the kept work after a pause, e.g. once the primary is back
+                self._stop.wait(5.0)
+                self._wake.set()
+        self.flush()
+
+    def flush(self):
+        """Apply every pending course change now"""
+        with self._lock:
+            pending, self._pending = list(self._pending), set()
+            full, self._full = self._full, False
+        try:
+            if full:
+                self.stats["enrollments"] += backfill(resolve_db(self._db))
+                self.stats["backfills"] += 1
+                return
+            for i in range(0, len(pending), self.batch_size):
+                self.stats["enrollments"] += refresh_courses(pending[i:i + self.batch_size], resolve_db(self._db))
+                self.stats["refreshes"] += 1
+        except Exception:
+            # Keep the work for the next flush instead of losing it
+            self.stats["errors"] += 1
+            with self._lock:
+                self._pending.update(pending)
+                self._full = self._full or full
+            raise
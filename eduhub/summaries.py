@@ -0,0 +1,105 @@
+"""course_stats and enrollment_rollups maintained from change stream events
+
+The repository counts every enrollment write in course_stats and
+enrollment_rollups in the same call as the write, so writes made by other
+processes (or straight through the shell) only reach them through
+reconcile_course_stats() and rollups.backfill(). SummaryMaintainer applies
+the same record_* calls to the enrollment events of an eduhub.changes
+consumer instead, so that every write is counted wherever it came from:
+
+    EDUHUB_INLINE_SUMMARIES=0 python -m eduhub watch --summaries
+
+A write counted inline would then be counted again from its change event,
+so every process writing through the repository has to run with
+EDUHUB_INLINE_SUMMARIES=0 (or call set_inline(False)) while a maintainer
+is running.
+
+Events are applied on the consumer thread, before their resume token is
+saved; replayed events are recognised by their change id and skipped.
+Deletes and updates need the document before the change (pre-images,
+full_document_before_change="whenAvailable"); without it they are counted
+as missed and only the next reconcile and backfill repair them. A resync
+event runs both.
+"""
+import os
+
+from . import course_stats
+from . import hooks
+from . import rollups
+from .connection import resolve_db
+
+
+_inline = os.environ.get("EDUHUB_INLINE_SUMMARIES", "1") == "1"
+
+
+def set_inline(flag=True):
+    """Switch the repository's own course_stats and rollups updates on or off for this process"""
+    global _inline
+    _inline = bool(flag)
+
+
+def inline():
+    return _inline
+
+
+class SummaryMaintainer:
+    """Count the enrollment changes of a change stream consumer in course_stats and enrollment_rollups"""
+
+    def __init__(self, db=None):
+        self._db = db
+        self.stats = {"inserts": 0, "deletes": 0, "updates": 0, "missed": 0, "resyncs": 0, "skipped": 0}
+        self._filter = hooks.EventFilter(hooks.CHANGE_STREAM)
+
+    @property
+    def db(self):
+        return resolve_db(self._db)
+
+    def install(self):
+        hooks.register("enrollment_changed", self._on_enrollment_changed)
+        hooks.register("enrollment_updated", self._on_enrollment_updated)
+        hooks.register("resync", self._on_resync)
+        return self
+
+    def uninstall(self):
+        hooks.unregister("enrollment_changed", self._on_enrollment_changed)
+        hooks.unregister("enrollment_updated", self._on_enrollment_updated)
+        hooks.unregister("resync", self._on_resync)
+
+    def _accept(self, source, change_id):
+        accepted = self._filter.accept(source, change_id)
+        self.stats["skipped"] = self._filter.skipped
+        return accepted
+
+    def _on_enrollment_changed(self, delta=0, enrollment=None, source=None, change_id=None, **_):
+        if not delta or not self._accept(source, change_id):
+            return
+        if enrollment is None:
+            self.stats["missed"] += 1
+        elif delta > 0:
+            course_stats.record_insert(enrollment, self.db)
+            rollups.record_insert(enrollment, self.db)
+            self.stats["inserts"] += 1
+        else:
+            course_stats.record_delete(enrollment, self.db)
+            rollups.record_delete(enrollment, self.db)
+            self.stats["deletes"] += 1
+
+    def _on_enrollment_updated(self, before=None, after=None, source=None, change_id=None, **_):
+        if not self._accept(source, change_id):
+            return
+        if before is None or after is None:
+            self.stats["missed"] += 1
+            return
+        course_stats.record_update(before, after, self.db)
+        # The rollups only count courseId and enrollmentDate
+        if (before.get("courseId"), before.get("enrollmentDate")) != (after.get("courseId"), after.get("enrollmentDate")):
+            rollups.record_delete(before, self.db)
+            rollups.record_insert(after, self.db)
+        self.stats["updates"] += 1
+
+    def _on_resync(self, collections, source=None, **_):
+        if source != hooks.CHANGE_STREAM or not {"enrollments", "courses"} & set(collections):
+            return
+        course_stats.reconcile_course_stats(self.db)
+        rollups.backfill(db=self.db)
+        self.stats["resyncs"] += 1
@@ -0,0 +1,416 @@
+"""Typeahead: top-k completions of a prefix over course titles and tags
+
+Completions are course titles (one per course) and tags (one per distinct
+tag), ranked by enrollments: a title by its course's enrollment count, a
+tag by the total over the courses carrying it.
+
+    typeahead = get_typeahead()
+    typeahead.complete("pyth")
+    # [{"text": "Python for Data Science", "kind": "title", "courseId": ..., "enrollments": 5120}, ...]
+
+A title is found from the start of any of its words ("data" completes to
+"Python for Data Science"). The trie is kept as one sorted list of keys
+plus a parallel array of completion ids, so a prefix is a contiguous range
+found by two bisects. Ranges of up to CACHE_THRESHOLD keys are ranked on
+the fly; the ranking of every larger range (the short, popular prefixes)
+is cached per prefix, filled in bottom-up when the trie is built, so no
+keystroke ranks more than CACHE_THRESHOLD keys.
+
+Enrollment counts come from the course_stats collection (or are counted
+from enrollments when it is empty). The trie follows the course_changed,
+enrollment_changed and resync hooks events: a changed course is re-read, an
+enrollment moves the scores of its course's title and tags, and an unknown
+change or a resync marks the trie for a rebuild on the next lookup.
+An enrollment event re-reads its course's count from course_stats rather
+than adding the delta, so the same write seen twice (from the repository
+and from an eduhub.changes consumer, or replayed) is counted once.
+"""
+from array import array
+from bisect import bisect_left
+import threading
+
+from . import hooks
+from .connection import resolve_db
+
+
+TYPEAHEAD_PROJECTION = {"_id": 0, "courseId": 1, "title": 1, "tags": 1}
+CACHE_THRESHOLD = 256
+DEFAULT_K = 10
+
+TITLE = "title"
+TAG = "tag"
+
+
+def normalize(text):
+    """Lower-case with single spaces; a trailing space is kept, it ends a word"""
+    if not isinstance(text, str):
+        return ""
+    normalized = " ".join(text.lower().split())
+    return normalized + " " if normalized and text[-1:].isspace() else normalized
+
+
+def _successor(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def title_keys(title, word_starts=True):
+    """Keys a title is found under: the title, and the title from each later word on"""
+    key = normalize(title).strip()
+    if not key:
+        return []
+    if not word_starts:
+        return [key]
+    keys = [key]
+    for i, char in enumerate(key):
+        if char == " ":
+            keys.append(key[i + 1:])
+    return list(dict.fromkeys(keys))
+
+
+def enrollment_count(db, course_id):
+    """Enrollments of one course, from course_stats or counted when it has no entry"""
+    row = db.course_stats.find_one({"_id": course_id}, {"totalEnrollments": 1})
+    if row is not None:
+        return row.get("totalEnrollments", 0)
+    return db.enrollments.count_documents({"courseId": course_id})
+
+
+def enrollment_counts(db):
+    """{courseId: enrollments} from course_stats, or counted from enrollments when it is empty"""
+    counts = {row["_id"]: row.get("totalEnrollments", 0)
+              for row in db.course_stats.find({}, {"totalEnrollments": 1})}
+    if counts:
+        return counts
+    return {row["_id"]: row["count"]
+            for row in db.enrollments.aggregate([{"$group": {"_id": "$courseId", "count": {"$sum": 1}}}])}
+
+
+class Typeahead:
+    """Prefix completions of course titles and tags, ranked by enrollments"""
+
+    def __init__(self, db=None, k=DEFAULT_K, word_starts=True, published_only=True, threshold=CACHE_THRESHOLD):
+        self._db = db
+        self.k = k
+        self.word_starts = word_starts
+        self.published_only = published_only
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._installed = False
+        self._clear()
+
+    def _clear(self):
+        # Sorted keys and, at the same positions, the completion each belongs to
+        self.keys = []
+        self.refs = array("l")
+        # Completions by id: display text, kind, courseId (titles) or course count (tags)
+        self.texts = []
+        self.kinds = []
+        self.payloads = []
+        self.scores = []
+        self._free = []
+        self.course_entries = {}
+        self.tag_ids = {}
+        self.enrollments = {}
+        # prefix -> up to k completion ids, best first, for ranges over threshold keys
+        self.top = {}
+        self.stale = True
+
+    @property
+    def db(self):
+        return resolve_db(self._db)
+
+    def _course_filter(self):
+        return {"isPublished": True} if self.published_only else {}
+
+    # Completions
+
+    def _new_completion(self, text, kind, payload, score):
+        if self._free:
+            cid = self._free.pop()
+            self.texts[cid], self.kinds[cid], self.payloads[cid], self.scores[cid] = text, kind, payload, score
+        else:
+            cid = len(self.texts)
+            self.texts.append(text)
+            self.kinds.append(kind)
+            self.payloads.append(payload)
+            self.scores.append(score)
+        return cid
+
+    def _completion_keys(self, cid):
+        if self.kinds[cid] == TITLE:
+            return title_keys(self.texts[cid], self.word_starts)
+        return [normalize(self.texts[cid]).strip()]
+
+    def _rank(self, cid):
+        return (-self.scores[cid], cid)
+
+    def _best(self, ids, limit):
+        # Same order as _rank: the sort is stable, so equal scores keep ascending ids
+        return sorted(sorted(set(ids)), key=self.scores.__getitem__, reverse=True)[:limit]
+
+    # Building
+
+    def build(self, batch_size=10_000):
+        """Load the catalog and enrollment counts, replacing what was loaded before"""
+        with self._lock:
+            db = self.db
+            self._clear()
+            self.enrollments = enrollment_counts(db)
+            entries = []
+            for course in db.courses.find(self._course_filter(), TYPEAHEAD_PROJECTION, batch_size=batch_size):
+                self._index_course(course, entries)
+            entries.sort()
+            self.keys = [key for key, _ in entries]
+            self.refs = array("l", (cid for _, cid in entries))
+            if self.keys:
+                self._prime("", 0, len(self.keys))
+            self.stale = False
+        return self
+
+    def _index_course(self, course, entries):
+        """Create the course's completions; append their (key, id) pairs to entries"""
+        course_id = course.get("courseId")
+        count = self.enrollments.get(course_id, 0)
+        title = course.get("title")
+        title_id = None
+        if normalize(title).strip():
+            title_id = self._new_completion(title, TITLE, course_id, count)
+            entries.extend((key, title_id) for key in self._completion_keys(title_id))
+        tags = []
+        for tag in dict.fromkeys(course.get("tags") or ()):
+            key = normalize(tag).strip()
+            if not key or key in tags:
+                continue
+            tags.append(key)
+            cid = self.tag_ids.get(key)
+            if cid is None:
+                cid = self.tag_ids[key] = self._new_completion(tag, TAG, 0, 0)
+                entries.append((key, cid))
+            self.payloads[cid] += 1
+            self.scores[cid] += count
+        self.course_entries[course_id] = (title_id, tuple(tags))
+
+    def _prime(self, prefix, lo, hi):
+        """Ranking of keys[lo:hi] (all starting with prefix), cached for every range over threshold keys"""
+        depth = len(prefix)
+        candidates = []
+        i = lo
+        while i < hi:
+            key = self.keys[i]
+            if len(key) == depth:
+                candidates.append(self.refs[i])
+                i += 1
+                continue
+            child = key[:depth + 1]
+            j = bisect_left(self.keys, _successor(child), i, hi)
+            if j - i > self.threshold:
+                candidates.extend(self._prime(child, i, j))
+            else:
+                candidates.extend(self.refs[i:j])
+            i = j
+        top = self._best(candidates, self.k)
+        if hi - lo > self.threshold:
+            self.top[prefix] = top
+        return top
+
+    # Incremental maintenance
+
+    def _insert_keys(self, cid):
+        for key in self._completion_keys(cid):
+            i = bisect_left(self.keys, key)
+            self.keys.insert(i, key)
+            self.refs.insert(i, cid)
+        self._raised(cid)
+
+    def _delete_keys(self, cid):
+        for key in self._completion_keys(cid):
+            i = bisect_left(self.keys, key)
+            while i < len(self.keys) and self.keys[i] == key:
+                if self.refs[i] == cid:
+                    del self.keys[i]
+                    del self.refs[i]
+                    break
+                i += 1
+        self._lowered(cid)
+
+    def _prefixes(self, cid):
+        seen = set()
+        for key in self._completion_keys(cid):
+            for end in range(len(key) + 1):
+                prefix = key[:end]
+                if prefix not in seen and prefix in self.top:
+                    seen.add(prefix)
+                    yield prefix
+
+    def _raised(self, cid):
+        """cid was added or its score went up: move it into the cached rankings it now belongs in"""
+        for prefix in self._prefixes(cid):
+            top = self.top[prefix]
+            if cid not in top:
+                if len(top) >= self.k and self._rank(cid) >= self._rank(top[-1]):
+                    continue
+                top.append(cid)
+            top.sort(key=self._rank)
+            del top[self.k:]
+
+    def _lowered(self, cid):
+        """cid was removed or its score went down: rankings holding it are re-ranked on next use"""
+        for prefix in list(self._prefixes(cid)):
+            if cid in self.top[prefix]:
+                del self.top[prefix]
+
+    def _set_score(self, cid, score):
+        previous = self.scores[cid]
+        self.scores[cid] = score
+        if score > previous:
+            self._raised(cid)
+        elif score < previous:
+            self._lowered(cid)
+
+    def _remove_course(self, course_id):
+        title_id, tags = self.course_entries.pop(course_id, (None, ()))
+        count = self.enrollments.get(course_id, 0)
+        if title_id is not None:
+            self._delete_keys(title_id)
+            self.texts[title_id] = None
+            self._free.append(title_id)
+        for key in tags:
+            cid = self.tag_ids[key]
+            self.payloads[cid] -= 1
+            if self.payloads[cid]:
+                self._set_score(cid, self.scores[cid] - count)
+            else:
+                self._delete_keys(cid)
+                del self.tag_ids[key]
+                self.texts[cid] = None
+                self._free.append(cid)
+
+    def _add_course(self, course):
+        entries = []
+        before = set(self.tag_ids.values())
+        self._index_course(course, entries)
+        added = {cid for _, cid in entries}
+        for cid in added:
+            self._insert_keys(cid)
+        count = self.enrollments.get(course.get("courseId"), 0)
+        for key in self.course_entries[course.get("courseId")][1]:
+            cid = self.tag_ids[key]
+            if cid in before and count:
+                self._raised(cid)
+
+    def upsert(self, course):
+        """Index a course document (TYPEAHEAD_PROJECTION fields), replacing its previous version"""
+        with self._lock:
+            self._remove_course(course.get("courseId"))
+            self._add_course(course)
+
+    def remove(self, course_id):
+        with self._lock:
+            self._remove_course(course_id)
+
+    def refresh(self, course_id):
+        """Re-read one course from the database and re-index it"""
+        query = dict(self._course_filter(), courseId=course_id)
+        course = self.db.courses.find_one(query, TYPEAHEAD_PROJECTION)
+        if course is None:
+            self.remove(course_id)
+        else:
+            self.upsert(course)
+
+    def record_enrollments(self, course_id, delta):
+        """Add delta enrollments to a course: moves its title and its tags in the rankings"""
+        with self._lock:
+            self.enrollments[course_id] = self.enrollments.get(course_id, 0) + delta
+            title_id, tags = self.course_entries.get(course_id, (None, ()))
+            if title_id is not None:
+                self._set_score(title_id, self.scores[title_id] + delta)
+            for key in tags:
+                cid = self.tag_ids[key]
+                self._set_score(cid, self.scores[cid] + delta)
+
+    def set_enrollments(self, course_id, count):
+        """Set a course's enrollment count, moving its title and tags by the difference"""
+        with self._lock:
+            delta = count - self.enrollments.get(course_id, 0)
+            if delta:
+                self.record_enrollments(course_id, delta)
+
+    def install(self):
+        """Subscribe to the repository's change events"""
+        if not self._installed:
+            hooks.register("course_changed", self._on_course_changed)
+            hooks.register("enrollment_changed", self._on_enrollment_changed)
+            hooks.register("resync", self._on_resync)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        hooks.unregister("course_changed", self._on_course_changed)
+        hooks.unregister("enrollment_changed", self._on_enrollment_changed)
+        hooks.unregister("resync", self._on_resync)
+        self._installed = False
+
+    def _on_course_changed(self, course_id, **_):
+        if course_id is None:
+            self.stale = True
+        elif not self.stale:
+            self.refresh(course_id)
+
+    def _on_enrollment_changed(self, course_id, delta=0, **_):
+        if course_id is None or not delta:
+            self.stale = True
+        elif not self.stale:
+            self.set_enrollments(course_id, enrollment_count(self.db, course_id))
+
+    def _on_resync(self, collections, **_):
+        if {"courses", "enrollments"} & set(collections):
+            self.stale = True
+
+    # Lookup
+
+    def complete(self, prefix, limit=None):
+        """Up to limit (default k) completions of prefix, most enrollments first"""
+        if self.stale:
+            self.build()
+        limit = limit or self.k
+        prefix = normalize(prefix)
+        with self._lock:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, _successor(prefix), lo) if prefix else len(self.keys)
+            if hi - lo > self.threshold and limit <= self.k:
+                top = self.top.get(prefix)
+                if top is None:
+                    # Grown past the threshold, or re-ranked after a removal
+                    top = self.top[prefix] = self._best(self.refs[lo:hi], self.k)
+                ids = top[:limit]
+            else:
+                ids = self._best(self.refs[lo:hi], limit)
+            return [self._describe(cid) for cid in ids]
+
+    def _describe(self, cid):
+        completion = {"text": self.texts[cid], "kind": self.kinds[cid], "enrollments": self.scores[cid]}
+        if self.kinds[cid] == TITLE:
+            completion["courseId"] = self.payloads[cid]
+        else:
+            completion["courses"] = self.payloads[cid]
+        return completion
+
+    def __len__(self):
+        return len(self.texts) - len(self._free)
+
+
+_typeaheads = {}
+_typeahead_lock = threading.Lock()
+
+
+def get_typeahead(db=None):
+    """Process-wide typeahead over db's catalog, subscribed to change events; built on first lookup"""
+    db = resolve_db(db)
+    typeahead = _typeaheads.get(db.name)
+    if typeahead is None:
+        with _typeahead_lock:
+            typeahead = _typeaheads.get(db.name)
+            if typeahead is None:
+                typeahead = _typeaheads[db.name] = Typeahead(db).install()
+    return typeahead
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+
+
+def _bulk_write(self, requests, ordered=True, **_):
+    """Apply pymongo write operations one by one; mongomock's bulk API lags pymongo's"""
+    from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+    counts = {"inserted_count": 0, "matched_count": 0, "modified_count": 0, "deleted_count": 0, "upserted_count": 0}
+    errors = []
+    for index, request in enumerate(requests):
+        try:
+            if isinstance(request, InsertOne):
+                self.insert_one(request._doc)
+                counts["inserted_count"] += 1
+                continue
+            if isinstance(request, (DeleteOne, DeleteMany)):
+                delete = self.delete_one if isinstance(request, DeleteOne) else self.delete_many
+                counts["deleted_count"] += delete(request._filter).deleted_count
+                continue
+            write = {UpdateOne: self.update_one, UpdateMany: self.update_many, ReplaceOne: self.replace_one}[type(request)]
+            result = write(request._filter, request._doc, upsert=bool(request._upsert))
+        except DuplicateKeyError as e:
+            errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+            if ordered:
+                break
+            continue
+        counts["matched_count"] += result.matched_count
+        counts["modified_count"] += result.modified_count
+        counts["upserted_count"] += result.upserted_id is not None
+    if errors:
+        raise BulkWriteError({"writeErrors": errors, "nInserted": counts["inserted_count"]})
+    return SimpleNamespace(**counts)
+
+
+_parse = mongomock.aggregate._Parser.parse
+
+
+def _parse_round(self, expression):
+    """mongomock's expression parser plus $round, which the analytics pipelines use"""
+    if isinstance(expression, dict) and list(expression) == ["$round"]:
+        arguments = expression["$round"]
+        value, places = (list(arguments) + [0])[:2] if isinstance(arguments, list) else (arguments, 0)
+        value = self.parse(value)
+        return None if value is None else round(value, self.parse(places))
+    return _parse(self, expression)
+
+
+def _merge(documents, database, options):
+    """$merge into another collection, matched on _id (the form the eduhub pipelines use)"""
+    if isinstance(options, str):
+        options = {"into": options}
+    if options.get("on", "_id") != "_id":
+        raise NotImplementedError("$merge is only supported on _id")
+    target = database.get_collection(options["into"])
+    for document in documents:
+        existing = target.find_one({"_id": document["_id"]})
+        if existing is None:
+            if options.get("whenNotMatched", "insert") == "insert":
+                target.insert_one(document)
+        elif options.get("whenMatched", "merge") == "replace":
+            target.replace_one({"_id": document["_id"]}, document)
+        elif options.get("whenMatched", "merge") == "merge":
+            target.update_one({"_id": document["_id"]}, {"$set": document})
+    return []
+
+
+_lookup = mongomock.aggregate._handle_lookup_stage
+
+
+def _lookup_with_pipeline(documents, database, options):
+    """$lookup, plus the localField/foreignField form with a pipeline run on each match (MongoDB 5.0)"""
+    if "pipeline" not in options or "localField" not in options:
+        return _lookup(documents, database, options)
+    joined = _lookup(documents, database, {key: value for key, value in options.items() if key != "pipeline"})
+    for document in joined:
+        document[options["as"]] = list(mongomock.aggregate.process_pipeline(
+            document[options["as"]], database, options["pipeline"], None))
+    return joined
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """An empty in-memory database that is not the default EduHub database"""
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", _bulk_write)
+    monkeypatch.setattr(mongomock.aggregate._Parser, "parse", _parse_round)
+    monkeypatch.setitem(mongomock.aggregate._PIPELINE_HANDLERS, "$merge", _merge)
+    monkeypatch.setitem(mongomock.aggregate._PIPELINE_HANDLERS, "$lookup", _lookup_with_pipeline)
+    return mongomock.MongoClient()["eduhub_test"]
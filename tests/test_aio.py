@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+from eduhub import aio
+
+
+class _Cursor:
+    def __init__(self, documents, batch_size):
+        self._batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+        self.closed = False
+
+    async def to_list(self, length=None):
+        return self._batches.pop(0) if self._batches else []
+
+    async def close(self):
+        self.closed = True
+
+
+def test_stream_releases_its_slot_when_the_consumer_stops_early():
+    async def main():
+        repo = aio.AsyncRepository(db=object(), max_concurrency=1, batch_size=2)
+        cursor = _Cursor(list(range(10)), 2)
+        stream = repo._stream(cursor)
+        async for document in stream:
+            break
+        # Another request gets the only slot while the stream is still open
+        await asyncio.wait_for(repo.semaphore.acquire(), 1)
+        repo.semaphore.release()
+        await stream.aclose()
+        return cursor
+
+    assert asyncio.run(main()).closed
+
+
+def test_stream_yields_every_document():
+    async def main():
+        repo = aio.AsyncRepository(db=object(), max_concurrency=1, batch_size=3)
+        cursor = _Cursor(list(range(10)), 3)
+        return [document async for document in repo._stream(cursor)], cursor
+
+    documents, cursor = asyncio.run(main())
+    assert documents == list(range(10))
+    assert cursor.closed
+
+
+def test_clients_of_closed_loops_are_closed(monkeypatch):
+    import motor.motor_asyncio
+
+    class Client:
+        def __init__(self, uri, **options):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(motor.motor_asyncio, "AsyncIOMotorClient", Client)
+    monkeypatch.setattr(aio, "_clients", {})
+
+    async def client():
+        return aio.get_async_client()
+
+    first = asyncio.run(client())
+    second = asyncio.run(client())
+
+    assert first is not second
+    assert first.closed and not second.closed
+    assert list(aio._clients.values()) == [second]
+    aio.close_async_clients()
+    assert second.closed and not aio._clients
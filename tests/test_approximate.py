@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from eduhub import approximate, changes, hooks, repository
+
+
+def _enroll_and_replay(db, maintainer):
+    db.courses.insert_one({"courseId": "COURSE_1", "category": "Programming", "tags": ["python"]})
+    enrollment = {"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1",
+                  "enrollmentDate": datetime(2026, 3, 5), "status": "active", "progress": 10}
+    maintainer.install()
+    try:
+        repository.enroll_student(enrollment, db)
+        consumer = changes.ChangeStreamConsumer(db)
+        change = {"_id": {"_data": "8201"}, "operationType": "insert",
+                  "ns": {"db": db.name, "coll": "enrollments"}, "fullDocument": enrollment}
+        # Seen by the consumer, then replayed after a reconnect
+        consumer._dispatch(change)
+        consumer._dispatch(change)
+    finally:
+        maintainer.uninstall()
+    maintainer.flush()
+
+
+def test_maintainer_counts_repository_writes_once(db):
+    _enroll_and_replay(db, approximate.SketchMaintainer(db))
+
+    assert approximate.engagement_metrics(db)["totalEnrollments"] == 1
+    assert approximate.top_courses(db=db) == [{"_id": "COURSE_1", "enrollments": 1}]
+
+
+def test_maintainer_following_the_change_stream_skips_replays(db):
+    maintainer = approximate.SketchMaintainer(db, source=hooks.CHANGE_STREAM)
+    _enroll_and_replay(db, maintainer)
+
+    assert approximate.engagement_metrics(db)["totalEnrollments"] == 1
+    assert maintainer.stats["skipped"] == 1
@@ -0,0 +1,10 @@
+from eduhub import benchmark, repository
+
+
+def test_read_queries_are_the_repository_ones(db):
+    queries = {query.name: query for query in benchmark.QUERIES}
+    params = {"course_id": "COURSE_1"}
+
+    assert queries["course_with_instructor"].build(db, params) == repository.courses_with_instructor_pipeline()
+    assert queries["enrolled_students"].build(db, params) == repository.enrolled_students_pipeline("COURSE_1")
+    assert queries["active_students"].build(db, params) == repository.active_students_filter()
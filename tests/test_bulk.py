@@ -0,0 +1,72 @@
+import time
+
+from pymongo import InsertOne
+import pytest
+
+from eduhub import bulk, course_stats, hooks, rollups
+
+
+def test_retries_after_a_size_triggered_flush_are_written_without_another_write(db):
+    db.enrollments.insert_one({"_id": 1})
+
+    def retry(failure):
+        return InsertOne({"_id": 2})
+
+    writer = bulk.BulkWriter(db, batch_size=1, flush_interval=0.05, on_error=retry)
+    try:
+        writer.insert_one("enrollments", {"_id": 1})
+        deadline = time.monotonic() + 2
+        while db.enrollments.find_one({"_id": 2}) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert db.enrollments.find_one({"_id": 2}) is not None
+        assert writer.stats["retries"] == 1
+    finally:
+        writer.close()
+
+
+def test_flush_raises_once_the_background_thread_has_stopped(db):
+    writer = bulk.BulkWriter(db)
+    writer._queue.put((bulk._STOP, None, 0))
+    writer._thread.join()
+    with pytest.raises(RuntimeError):
+        writer.flush(timeout=1)
+
+
+def test_flush_times_out(db, monkeypatch):
+    writer = bulk.BulkWriter(db)
+    # A flush that never completes, as if the database hung
+    monkeypatch.setattr(writer, "_flush_all", lambda: time.sleep(1))
+    try:
+        with pytest.raises(TimeoutError):
+            writer.flush(timeout=0.2)
+    finally:
+        monkeypatch.undo()
+        writer.close()
+
+
+def test_inserted_enrollments_are_counted(db):
+    from datetime import datetime
+
+    db.courses.insert_one({"courseId": "COURSE_1", "category": "Programming"})
+    db.enrollments.insert_one({"_id": "taken"})
+    events = []
+
+    def handler(**payload):
+        events.append(payload)
+
+    hooks.register("enrollment_changed", handler)
+    try:
+        with bulk.BulkWriter(db) as writer:
+            for i in range(3):
+                writer.insert_one("enrollments", {"_id": "taken" if i == 2 else i, "courseId": "COURSE_1",
+                                                  "enrollmentDate": datetime(2026, 3, 5), "status": "active"})
+            writer.delete_one("enrollments", {"_id": 0})
+    finally:
+        hooks.unregister("enrollment_changed", handler)
+
+    assert db[course_stats.COLLECTION].find_one({"_id": "COURSE_1"})["totalEnrollments"] == 2
+    month = db[rollups.COLLECTION].find_one({"_id": rollups.rollup_id("month", "category", "Programming",
+                                                                      datetime(2026, 3, 1))})
+    assert month["enrollmentCount"] == 2
+    assert len(events) == 2
+    assert writer.stats["unaccounted"] == 1
@@ -0,0 +1,42 @@
+from eduhub import changes, hooks, repository
+
+
+def test_events_say_where_they_come_from(db):
+    events = []
+
+    def handler(**payload):
+        events.append(payload)
+
+    hooks.register("enrollment_changed", handler)
+    try:
+        db.courses.insert_one({"courseId": "COURSE_1", "category": "Programming"})
+        enrollment = {"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1"}
+        repository.enroll_student(enrollment, db)
+        consumer = changes.ChangeStreamConsumer(db)
+        consumer._dispatch({"_id": {"_data": "8201"}, "operationType": "insert",
+                            "ns": {"db": db.name, "coll": "enrollments"}, "fullDocument": enrollment})
+    finally:
+        hooks.unregister("enrollment_changed", handler)
+
+    assert [event["source"] for event in events] == [hooks.REPOSITORY, hooks.CHANGE_STREAM]
+    assert "change_id" not in events[0]
+    assert events[1]["change_id"] == {"_data": "8201"}
+
+
+def test_unexpected_operation_failures_are_retried(db):
+    from pymongo.errors import ConnectionFailure, OperationFailure
+
+    consumer = changes.ChangeStreamConsumer(db)
+    calls = []
+
+    def watch(token):
+        calls.append(token)
+        if len(calls) == 1:
+            raise OperationFailure("not primary", code=10107)
+        consumer.stop()
+        raise ConnectionFailure("closed")
+
+    consumer._watch = watch
+    assert consumer.run() == 0
+    assert len(calls) == 2
+    assert consumer.stats["errors"] == 1
@@ -0,0 +1,95 @@
+from datetime import datetime
+import random
+
+import pytest
+
+from eduhub import analytics
+
+np = pytest.importorskip("numpy")
+from eduhub.columnar import ColumnarStore  # noqa: E402
+
+
+def _load(db):
+    rng = random.Random(5)
+    users = [{"userId": f"USER_{i}", "firstName": f"First{i}", "lastName": f"Last{i}",
+              "role": "instructor" if i < 2 else "student"} for i in range(30)]
+    db.users.insert_many(users)
+    db.assignments.insert_many([{"assignmentId": f"ASSIGN_{i}", "courseId": f"COURSE_{i % 4}"} for i in range(12)])
+    db.submissions.insert_many([{
+        "submissionId": f"SUBMIT_{i}",
+        "studentId": f"USER_{rng.randrange(2, 30)}",
+        "assignmentId": f"ASSIGN_{rng.randrange(12)}",
+        "grade": rng.choice([None, rng.randint(40, 100), round(rng.uniform(40, 100), 1)]),
+        "status": rng.choice(["submitted", "graded", "late"]),
+        "submittedAt": datetime(2025, rng.randint(1, 12), rng.randint(1, 28)),
+    } for i in range(300)])
+    db.enrollments.insert_many([{
+        "enrollmentId": f"ENROLL_{i}",
+        "studentId": f"USER_{rng.randrange(2, 30)}",
+        "courseId": f"COURSE_{rng.randrange(4)}",
+        "progress": rng.choice([None, rng.randint(0, 100), round(rng.uniform(0, 100), 1)]),
+        "status": rng.choice(["active", "completed", "dropped"]),
+        "enrollmentDate": datetime(2025, rng.randint(1, 12), rng.randint(1, 28)),
+    } for i in range(120)])
+
+
+def _by_id(rows):
+    return {row["_id"]: row for row in rows}
+
+
+def assert_same_metrics(db, store):
+    assert _by_id(store.student_performance()) == _by_id(analytics.student_performance(db))
+    assert _by_id(store.top_students(5)) == _by_id(analytics.top_students(5, db=db))
+    assert store.engagement_metrics() == analytics.engagement_metrics(db)
+
+
+def _event(db, collection, operation, _id, before=None):
+    event = {"operationType": operation, "ns": {"db": db.name, "coll": collection}, "documentKey": {"_id": _id}}
+    if operation != "delete":
+        event["fullDocument"] = db[collection].find_one({"_id": _id})
+    if before is not None:
+        event["fullDocumentBeforeChange"] = before
+    return event
+
+
+def test_columns_match_the_pipelines(db):
+    _load(db)
+    assert_same_metrics(db, ColumnarStore.load(db))
+
+
+def test_columns_match_the_pipelines_after_apply_changes(db):
+    _load(db)
+    store = ColumnarStore.load(db)
+    events = []
+
+    user = db.users.insert_one({"userId": "USER_99", "firstName": "New", "lastName": "Student", "role": "student"})
+    events.append(_event(db, "users", "insert", user.inserted_id))
+    for grade in (97, 88.5):
+        inserted = db.submissions.insert_one({"submissionId": f"SUBMIT_NEW_{grade}", "studentId": "USER_99",
+                                              "assignmentId": "ASSIGN_0", "grade": grade, "status": "graded",
+                                              "submittedAt": datetime(2025, 6, 1)})
+        events.append(_event(db, "submissions", "insert", inserted.inserted_id))
+    regraded = db.submissions.find_one({"grade": None})
+    db.submissions.update_one({"_id": regraded["_id"]}, {"$set": {"grade": 71, "status": "graded"}})
+    events.append(_event(db, "submissions", "update", regraded["_id"]))
+    # Updated twice in one batch: only the last version counts
+    twice = db.submissions.find_one({"grade": {"$ne": None}, "studentId": {"$ne": "USER_99"}})
+    db.submissions.update_one({"_id": twice["_id"]}, {"$set": {"grade": 10}})
+    events.append(_event(db, "submissions", "update", twice["_id"]))
+    db.submissions.update_one({"_id": twice["_id"]}, {"$set": {"grade": 55}})
+    events.append(_event(db, "submissions", "update", twice["_id"]))
+    dropped = db.enrollments.find_one({"status": "active"})
+    db.enrollments.update_one({"_id": dropped["_id"]}, {"$set": {"status": "dropped"}})
+    events.append(_event(db, "enrollments", "update", dropped["_id"]))
+    deleted = db.enrollments.find_one({"status": "completed"})
+    db.enrollments.delete_one({"_id": deleted["_id"]})
+    events.append(_event(db, "enrollments", "delete", deleted["_id"]))
+    removed = db.submissions.find_one({"studentId": "USER_5"})
+    db.submissions.delete_one({"_id": removed["_id"]})
+    events.append(_event(db, "submissions", "delete", removed["_id"]))
+
+    assert store.apply_changes(events) == len(events)
+    assert_same_metrics(db, store)
+    # Replaying events already reflected changes nothing
+    store.apply_changes(events)
+    assert_same_metrics(db, store)
@@ -0,0 +1,49 @@
+import threading
+
+from eduhub import connection
+from eduhub.query_shapes import QueryShapeRecorder
+
+
+class _Client:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_adding_a_listener_leaves_the_running_client_open(monkeypatch):
+    client = _Client()
+    monkeypatch.setattr(connection, "_listeners", [])
+    monkeypatch.setattr(connection, "_retired", [])
+    monkeypatch.setattr(connection, "_client", client)
+    monkeypatch.setattr(connection, "_client_pid", connection.os.getpid())
+
+    connection.add_event_listener(object())
+    assert connection._client is None
+    assert not client.closed
+
+    connection.close_client()
+    assert client.closed
+
+
+def test_recorder_pending_commands_survive_concurrent_threads():
+    from types import SimpleNamespace
+
+    recorder = QueryShapeRecorder()
+
+    def run(thread):
+        for request in range(2000):
+            command = {"find": "courses", "filter": {"courseId": "COURSE_1"}}
+            recorder.started(SimpleNamespace(command_name="find", command=command,
+                                             connection_id=thread, request_id=request))
+            recorder.succeeded(SimpleNamespace(connection_id=thread, request_id=request, duration_micros=10))
+
+    threads = [threading.Thread(target=run, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(stats.count for _, stats in recorder.report()) == 16000
+    assert recorder._pending == {}
@@ -0,0 +1,45 @@
+from eduhub import connection, datagen, ids
+
+
+def test_worker_applies_the_settings_of_its_task(db, monkeypatch):
+    monkeypatch.setattr(connection, "_settings", dict(connection.DEFAULT_SETTINGS))
+    monkeypatch.setattr(connection, "get_db", lambda name=None: db)
+    settings = dict(connection.DEFAULT_SETTINGS, uri="mongodb://elsewhere:27017/", maxPoolSize=7)
+    dataset = datagen.SyntheticDataset(users=20, courses=4)
+    try:
+        counts = datagen._run_shard((dataset, (0, 20), (0, 4), 100, db.name, settings, 1234))
+        assert connection.get_settings() == settings
+        assert ids.get_generator().node == 1234
+    finally:
+        ids.set_generator(None)
+    assert counts["users"] == 20
+
+
+def test_generate_gives_every_worker_the_settings_and_its_own_node(db, monkeypatch):
+    tasks = []
+
+    class Pool:
+        def __init__(self, processes):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def map(self, function, items):
+            tasks.extend(items)
+            return [{} for _ in items]
+
+    monkeypatch.setattr(datagen, "get_context", lambda method: type("Context", (), {"Pool": Pool}))
+    monkeypatch.setattr(connection, "_settings", dict(connection.DEFAULT_SETTINGS, maxPoolSize=7))
+    # The derived collections are rebuilt with $merge, which mongomock lacks
+    for module, name in [(datagen.course_stats, "reconcile_course_stats"), (datagen.rollups, "backfill"),
+                         (datagen.approximate, "rebuild"), (datagen.grades, "rebuild")]:
+        monkeypatch.setattr(module, name, lambda *args, **kwargs: None)
+    dataset = datagen.SyntheticDataset(users=3 * datagen.BLOCK_SIZE, courses=3 * datagen.BLOCK_SIZE)
+    datagen.generate(dataset, db, workers=3, verbose=False)
+
+    assert [task[5] for task in tasks] == [connection.get_settings()] * 3
+    assert len({task[6] for task in tasks}) == 3
@@ -0,0 +1,35 @@
+import math
+import random
+
+from eduhub import grades, repository
+
+
+def test_percentiles_and_ranks_follow_grading(db):
+    rng = random.Random(3)
+    db.assignments.insert_many([{"assignmentId": f"ASSIGN_{i}", "courseId": "COURSE_1"} for i in range(3)])
+    submissions = [{"submissionId": f"SUBMIT_{i}", "assignmentId": f"ASSIGN_{i % 3}",
+                    "studentId": f"USER_{i % 40}", "grade": None} for i in range(400)]
+    db.submissions.insert_many([dict(submission) for submission in submissions])
+    final = {}
+    for submission in submissions + rng.sample(submissions, 100):
+        grade = rng.choice([rng.randint(0, 100), round(rng.uniform(40, 100), 1)])
+        assert repository.grade_submission(submission["submissionId"], grade, "", db)
+        final[submission["submissionId"]] = (submission, grade)
+    assert not repository.grade_submission("SUBMIT_MISSING", 50, "", db)
+
+    values = sorted(grade for submission, grade in final.values() if submission["assignmentId"] == "ASSIGN_0")
+    for p, grade in grades.percentiles(assignment_id="ASSIGN_0", db=db).items():
+        assert grade == values[max(1, math.ceil(p / 100 * len(values))) - 1]
+    rank = grades.percentile_rank(values[len(values) // 2], assignment_id="ASSIGN_0", db=db)
+    assert (rank["below"], rank["equal"], rank["count"]) == (
+        sum(v < values[len(values) // 2] for v in values), values.count(values[len(values) // 2]), len(values))
+    assert sum(row["count"] for row in grades.histogram(course_id="COURSE_1", width=10, db=db)) == len(final)
+
+    averages = {}
+    for submission, grade in final.values():
+        averages.setdefault(submission["studentId"], []).append(grade)
+    averages = {student: sum(gs) / len(gs) for student, gs in averages.items()}
+    for student, average in averages.items():
+        ranked = grades.student_rank(student, "COURSE_1", db)
+        assert ranked["students"] == len(averages)
+        assert ranked["rank"] == sum(other > average + 1e-9 for other in averages.values()) + 1
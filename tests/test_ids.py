@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+
+import pytest
+
+from eduhub import ids
+
+
+def _child_node(queue):
+    queue.put(ids.get_generator().node)
+
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="needs fork()")
+@pytest.mark.parametrize("created_before_fork", [True, False])
+def test_forked_children_do_not_share_a_fixed_node(monkeypatch, created_before_fork):
+    monkeypatch.setenv("EDUHUB_ID_NODE", "42")
+    ids.set_generator(ids.IdGenerator() if created_before_fork else None)
+    try:
+        parent = ids.IdGenerator().node
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        children = [context.Process(target=_child_node, args=(queue,)) for _ in range(3)]
+        for child in children:
+            child.start()
+        nodes = [queue.get(timeout=10) for _ in children]
+        for child in children:
+            child.join()
+    finally:
+        ids.set_generator(None)
+
+    assert parent == 42
+    assert len(set(nodes)) == 3 and 42 not in nodes
+
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="needs fork()")
+def test_forked_children_keep_an_explicit_node():
+    ids.set_generator(ids.IdGenerator(node=7))
+    try:
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        child = context.Process(target=_child_node, args=(queue,))
+        child.start()
+        node = queue.get(timeout=10)
+        child.join()
+    finally:
+        ids.set_generator(None)
+
+    assert node == 7
+
+
+def test_ids_increase_within_a_process():
+    generator = ids.IdGenerator(node=1)
+    generated = [generator.next_id("USER_") for _ in range(1000)] + generator.next_ids(1000, "USER_")
+    generated += [generator.next_id("USER_") for _ in range(1000)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+
+
+def test_next_ids_matches_next_id():
+    now = [1_700_000_000_000]
+    batched = ids.IdGenerator(node=5, clock=lambda: now[0]).next_ids(300, "COURSE_")
+    single = ids.IdGenerator(node=5, clock=lambda: now[0])
+
+    assert batched == [single.next_id("COURSE_") for _ in range(300)]
+    assert [ids.decode_id(text) for text in batched] == list(ids.IdGenerator(node=5, clock=lambda: now[0])
+                                                               .next_ints(300))
+    assert ids.id_timestamp_ms(batched[0]) == now[0]
+
+
+def test_clock_stepping_back_does_not_repeat_ids():
+    now = [1_700_000_000_000]
+    generator = ids.IdGenerator(node=3, clock=lambda: now[0])
+    first = generator.next_id()
+    now[0] -= 5000
+    assert generator.next_id() > first
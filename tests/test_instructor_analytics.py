@@ -0,0 +1,15 @@
+from eduhub import analytics, course_stats, instructor_analytics
+
+
+def test_both_entry_points_default_to_the_same_source(db):
+    db.users.insert_one({"userId": "USER_1", "firstName": "Ada", "lastName": "Lovelace", "role": "instructor"})
+    db.courses.insert_one({"courseId": "COURSE_1", "instructorId": "USER_1", "isPublished": True, "price": 10})
+    db.enrollments.insert_many([{"courseId": "COURSE_1", "studentId": f"USER_{i}"} for i in range(2, 5)])
+    course_stats.reconcile_course_stats(db)
+    # An enrollment course_stats has not counted yet
+    db.enrollments.insert_one({"courseId": "COURSE_1", "studentId": "USER_5"})
+
+    rows = analytics.instructor_analytics(db)
+
+    assert rows == instructor_analytics.instructor_analytics(db)
+    assert rows[0]["totalStudents"] == 3
@@ -0,0 +1,37 @@
+import pytest
+
+from eduhub import integrity
+
+RELATION = ("enrollments", "courseId", "courses", "courseId", {})
+
+
+@pytest.fixture
+def references(db):
+    db.courses.insert_many([{"courseId": "COURSE_1"}, {"courseId": "COURSE_2"}])
+    db.enrollments.insert_many([
+        {"_id": 1, "courseId": "COURSE_1"},
+        {"_id": 2, "courseId": "COURSE_9"},
+        {"_id": 3, "courseId": ["COURSE_9", "COURSE_2"]},
+        {"_id": 4, "courseId": ["COURSE_8"]},
+        {"_id": 5},
+    ])
+    return db
+
+
+def test_merge_checks_array_references_element_by_element(references):
+    orphans = sorted(_id for _id, _ in integrity.merge_orphans(RELATION, references))
+
+    assert orphans == [2, 4, 5]
+
+
+def test_lookup_rechecks_array_references(references, monkeypatch):
+    # mongomock cannot run let/$expr sub-pipelines: join by whole value, as $eq does
+    def aggregate(self, pipeline, **_):
+        for doc in self.find({}, {"courseId": 1}):
+            if references.courses.find_one({"courseId": doc.get("courseId", None)}) is None:
+                yield doc
+
+    monkeypatch.setattr(type(references.enrollments), "aggregate", aggregate)
+    orphans = sorted(_id for _id, _ in integrity.lookup_orphans(RELATION, references, workers=1, chunks=1))
+
+    assert orphans == [2, 4, 5]
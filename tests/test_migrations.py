@@ -0,0 +1,22 @@
+from eduhub import migrations
+
+
+def test_migrate_plans_after_taking_the_lock(db, monkeypatch):
+    calls = []
+    acquire = migrations._acquire_lock
+
+    def acquire_lock(db, owner):
+        calls.append("lock")
+        acquire(db, owner)
+
+    def plan(db, *args):
+        calls.append("plan")
+        # What a migration that held the lock until now left to do
+        return []
+
+    monkeypatch.setattr(migrations, "_acquire_lock", acquire_lock)
+    monkeypatch.setattr(migrations, "plan", plan)
+
+    assert migrations.migrate(db, verbose=False) is None
+    assert calls == ["lock", "plan"]
+    assert db[migrations.MIGRATIONS_COLLECTION].find_one({"_id": migrations.LOCK_ID}) is None
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from eduhub import course_stats, hooks, repository, rollups
+
+
+def test_enroll_student_reads_the_course_from_the_given_db(db):
+    db.courses.insert_one({"courseId": "COURSE_1", "title": "Python", "category": "Programming", "level": "beginner"})
+    events = []
+
+    def handler(**payload):
+        events.append(payload)
+
+    hooks.register("enrollment_changed", handler)
+    try:
+        repository.enroll_student({"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1",
+                                   "enrollmentDate": datetime(2026, 3, 5), "status": "active", "progress": 0}, db)
+    finally:
+        hooks.unregister("enrollment_changed", handler)
+
+    assert [event["course_id"] for event in events] == ["COURSE_1"]
+    assert db[course_stats.COLLECTION].find_one({"_id": "COURSE_1"})["totalEnrollments"] == 1
+    rollup = db[rollups.COLLECTION].find_one({"_id": rollups.rollup_id("month", "category", "Programming",
+                                                                         datetime(2026, 3, 1))})
+    assert rollup["enrollmentCount"] == 1
+
+
+def test_enroll_student_snapshots_the_course_of_the_given_db(db, monkeypatch):
+    from eduhub import snapshots
+
+    monkeypatch.setattr(snapshots, "_enabled", True)
+    db.courses.insert_one({"courseId": "COURSE_1", "title": "Python", "category": "Programming", "level": "beginner"})
+    repository.enroll_student({"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1",
+                               "enrollmentDate": datetime(2026, 3, 5), "status": "active", "progress": 0}, db)
+
+    enrollment = db.enrollments.find_one({"enrollmentId": "ENROLL_1"})
+    assert enrollment["course"] == {"title": "Python", "category": "Programming", "level": "beginner"}
+
+
+def test_delete_enrollment_uncounts_the_document_it_deleted(db, monkeypatch):
+    db.courses.insert_many([{"courseId": "COURSE_1", "category": "Programming"},
+                            {"courseId": "COURSE_2", "category": "Design"}])
+    repository.enroll_student({"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1",
+                               "enrollmentDate": datetime(2026, 3, 5), "status": "active", "progress": 0}, db)
+    # Moved to another course by a concurrent writer just before the delete
+    find_one_and_delete = type(db.enrollments).find_one_and_delete
+
+    def moved_then_deleted(self, filter, *args, **kwargs):
+        self.update_one(filter, {"$set": {"courseId": "COURSE_2"}})
+        return find_one_and_delete(self, filter, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.enrollments), "find_one_and_delete", moved_then_deleted)
+    result = repository.delete_enrollment("ENROLL_1", db)
+
+    assert result.deleted_count == 1
+    # The raw update above bypassed course_stats; the delete uncounts what it removed
+    assert db[course_stats.COLLECTION].find_one({"_id": "COURSE_1"})["totalEnrollments"] == 1
+    assert db[course_stats.COLLECTION].find_one({"_id": "COURSE_2"})["totalEnrollments"] == -1
+    assert repository.delete_enrollment("ENROLL_1", db).deleted_count == 0
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from eduhub import rollups
+
+
+def test_backfill_ignores_stale_day_documents(db):
+    db.courses.insert_many([
+        {"courseId": "COURSE_1", "category": "Programming"},
+        {"courseId": "COURSE_2", "category": "Programming"},
+    ])
+    db.enrollments.insert_many([
+        {"enrollmentId": f"ENROLL_{i}", "courseId": "COURSE_1", "enrollmentDate": datetime(2026, 3, 5 + i)}
+        for i in range(3)
+    ])
+    # COURSE_2 lost its only enrollment outside the repository
+    stale_bucket = datetime(2026, 3, 20)
+    db[rollups.COLLECTION].insert_one({
+        "_id": rollups.rollup_id("day", "course", "COURSE_2", stale_bucket), "grain": "day", "dimension": "course",
+        "key": "COURSE_2", "bucket": stale_bucket, "enrollmentCount": 4, "updatedAt": datetime(2026, 3, 20)
+    })
+
+    result = rollups.backfill(datetime(2026, 3, 1), datetime(2026, 3, 31), db=db)
+
+    def count(grain, dimension, key, bucket):
+        doc = db[rollups.COLLECTION].find_one({"_id": rollups.rollup_id(grain, dimension, key, bucket)})
+        return doc and doc["enrollmentCount"]
+
+    month = datetime(2026, 3, 1)
+    assert count("month", "all", rollups.ALL, month) == 3
+    assert count("month", "category", "Programming", month) == 3
+    assert count("month", "course", "COURSE_2", month) is None
+    assert count("day", "all", rollups.ALL, stale_bucket) is None
+    assert count("day", "category", "Programming", stale_bucket) is None
+    assert count("day", "course", "COURSE_2", stale_bucket) is None
+    assert result["removed"] == 1
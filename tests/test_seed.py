@@ -0,0 +1,24 @@
+import random
+
+from eduhub import grades, seed
+
+
+def test_seed_builds_the_grade_histograms(db):
+    random.seed(7)
+    data = seed.seed_sample_data(db, verbose=False)
+
+    graded = [s for s in data["submissions"] if s["grade"] is not None]
+    counted = sum(doc["count"] for doc in db[grades.BUCKETS_COLLECTION].find({"scope": "assignment"}))
+    assert graded and counted == len(graded)
+
+
+def test_seed_builds_the_sketches(db):
+    from eduhub import approximate
+
+    random.seed(7)
+    data = seed.seed_sample_data(db, verbose=False)
+
+    students = {enrollment["studentId"] for enrollment in data["enrollments"]}
+    # IDs are random, so two students can share a HyperLogLog register
+    assert abs(approximate.distinct_students(db=db) - len(students)) <= 1
+    assert approximate.top_courses(db=db)
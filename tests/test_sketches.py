@@ -0,0 +1,71 @@
+"""The error bounds approximate.py documents, at its default parameters"""
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import random
+
+import pytest
+
+from eduhub import approximate
+from eduhub.sketches import HyperLogLog, TDigest, TopK, load
+
+
+@pytest.mark.parametrize("n", [100, 5_000, 200_000])
+def test_hyperloglog_within_three_standard_errors(n):
+    sketch = HyperLogLog(approximate.PRECISION)
+    for i in range(n):
+        sketch.add(f"USER_{i}")
+        # Duplicates must not count
+        sketch.add(f"USER_{i // 2}")
+    assert abs(len(sketch) - n) / n <= 3 * sketch.error
+
+
+def test_hyperloglog_merge_is_the_union():
+    left, right, both = (HyperLogLog(approximate.PRECISION) for _ in range(3))
+    for i in range(60_000):
+        (left if i % 3 else right).add(i)
+        both.add(i)
+    left.merge(right)
+    assert len(left) == len(both)
+    assert len(load(left.to_bytes())) == len(left)
+
+
+def test_topk_never_low_and_within_its_bound():
+    rng = random.Random(7)
+    keys = [f"COURSE_{i}" for i in range(5_000)]
+    # Zipf-like popularity, as course enrollments are
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(keys))]
+    stream = rng.choices(keys, weights, k=200_000)
+    exact = Counter(stream)
+    sketch = TopK(approximate.TOP, approximate.WIDTH, approximate.DEPTH)
+    for key in stream:
+        sketch.add(key)
+
+    bound = sketch.counts.error * len(stream)
+    for key, count in exact.items():
+        estimate = sketch.estimate(key)
+        assert count <= estimate <= count + bound
+    assert [key for key, _ in sketch.top(10)] == [key for key, _ in exact.most_common(10)]
+    assert load(sketch.to_bytes()).top(10) == sketch.top(10)
+
+
+@pytest.mark.parametrize("distribution", ["gauss", "uniform", "skewed"])
+def test_tdigest_percentiles_within_rank_error(distribution):
+    rng = random.Random(11)
+    draw = {
+        "gauss": lambda: rng.gauss(75, 12),
+        "uniform": lambda: rng.uniform(0, 100),
+        "skewed": lambda: rng.expovariate(0.05),
+    }[distribution]
+    values = [draw() for _ in range(100_000)]
+    digest = TDigest(approximate.COMPRESSION)
+    for value in values:
+        digest.add(value)
+    values.sort()
+
+    for p in approximate.PERCENTILES:
+        q = p / 100
+        estimate = digest.quantile(q)
+        # Distance from q to the ranks the estimate occupies
+        low, high = bisect_left(values, estimate) / len(values), bisect_right(values, estimate) / len(values)
+        assert max(low - q, q - high, 0) <= approximate.RANK_ERROR
+    assert load(digest.to_bytes()).quantile(0.5) == pytest.approx(digest.quantile(0.5))
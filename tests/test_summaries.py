@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from eduhub import changes, course_stats, repository, rollups, summaries
+
+
+def _change(id, operation, **fields):
+    return dict({"_id": {"_data": id}, "operationType": operation, "ns": {"coll": "enrollments"}}, **fields)
+
+
+def test_change_stream_enrollments_are_counted_once(db, monkeypatch):
+    monkeypatch.setattr(summaries, "_inline", False)
+    db.courses.insert_one({"courseId": "COURSE_1", "category": "Programming"})
+    enrollment = {"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1",
+                  "enrollmentDate": datetime(2026, 3, 5), "status": "active", "progress": 10}
+    completed = dict(enrollment, status="completed", progress=100)
+    maintainer = summaries.SummaryMaintainer(db).install()
+    try:
+        repository.enroll_student(enrollment, db)
+        consumer = changes.ChangeStreamConsumer(db)
+        insert = _change("8201", "insert", fullDocument=enrollment)
+        consumer._dispatch(insert)
+        # Replayed after a reconnect
+        consumer._dispatch(insert)
+        consumer._dispatch(_change("8202", "update", fullDocument=completed, fullDocumentBeforeChange=enrollment))
+    finally:
+        maintainer.uninstall()
+
+    stats = db[course_stats.COLLECTION].find_one({"_id": "COURSE_1"})
+    assert (stats["totalEnrollments"], stats["activeEnrollments"], stats["completedEnrollments"]) == (1, 0, 1)
+    month = db[rollups.COLLECTION].find_one({"_id": rollups.rollup_id("month", "category", "Programming",
+                                                                      datetime(2026, 3, 1))})
+    assert month["enrollmentCount"] == 1
+    assert maintainer.stats["skipped"] == 1
+
+
+def test_deletes_without_pre_images_are_missed(db):
+    maintainer = summaries.SummaryMaintainer(db).install()
+    try:
+        changes.ChangeStreamConsumer(db)._dispatch(_change("8203", "delete"))
+    finally:
+        maintainer.uninstall()
+
+    assert maintainer.stats["missed"] == 1
+    assert db[course_stats.COLLECTION].count_documents({}) == 0
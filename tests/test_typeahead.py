@@ -0,0 +1,19 @@
+from eduhub import changes, repository, typeahead
+
+
+def test_an_enrollment_seen_from_both_sources_counts_once(db):
+    db.courses.insert_one({"courseId": "COURSE_1", "title": "Python Basics", "tags": ["python"], "isPublished": True})
+    completions = typeahead.Typeahead(db).install()
+    try:
+        completions.build()
+        enrollment = {"enrollmentId": "ENROLL_1", "studentId": "USER_1", "courseId": "COURSE_1"}
+        repository.enroll_student(enrollment, db)
+        # The same insert, as a change stream consumer in this process re-emits it
+        changes.ChangeStreamConsumer(db)._dispatch({"_id": {"_data": "8201"}, "operationType": "insert",
+                                                   "ns": {"db": db.name, "coll": "enrollments"},
+                                                   "fullDocument": enrollment})
+    finally:
+        completions.uninstall()
+
+    assert [(row["text"], row["enrollments"]) for row in completions.complete("pyth")] == [
+        ("Python Basics", 1), ("python", 1)]